@@ -0,0 +1,50 @@
+from __future__ import annotations
+import typing
+import random
+
+import utils
+from formals_lib.regex_automata import regex_to_automata
+from formals_lib.automata_match import compile_automata
+from formals_lib import automata_batch
+
+
+PATTERN: typing.Final[str] = "(a+b)*a(a+b)^4 + (ab+ba)*c"
+
+
+def main():
+    if automata_batch.np is None:
+        print("numpy is not available, skipping the batch matching benchmark\n")
+        return
+
+    aut = regex_to_automata(PATTERN)
+    matcher = compile_automata(aut)
+    batch_matcher = automata_batch.compile_batch_matcher(aut)
+
+    rand = random.Random(42)
+    rows = []
+
+    for letters, max_len in (("abc", 16), ("ab", 64)):
+        for words_cnt in (10 ** 4, 10 ** 5, 10 ** 6):
+            words: typing.List[str] = [
+                "".join(rand.choices(letters, k=rand.randint(0, max_len)))
+                for _ in range(words_cnt)
+            ]
+
+            t_single: float = utils.timeit(lambda: matcher.accepts_many(words), repeat=1)
+            t_batch: float = utils.timeit(lambda: batch_matcher.accepts_batch(words), repeat=1)
+
+            rows.append((
+                f"{letters}^0..{max_len}", words_cnt,
+                words_cnt / t_single, words_cnt / t_batch,
+                t_single / t_batch,
+            ))
+
+    utils.print_table(
+        f"Batch matching against {PATTERN!r}",
+        ("words", "count", "per-word, words/s", "batch, words/s", "speedup"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
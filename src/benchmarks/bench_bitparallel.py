@@ -0,0 +1,64 @@
+from __future__ import annotations
+import typing
+import random
+
+import utils
+from formals_lib.regex import Concat
+from formals_lib.regex_parser import parse_regex
+from formals_lib.regex_automata import regex_to_automata
+from formals_lib.automata_match import compile_automata
+from formals_lib.automata_nfa import compile_nfa
+from formals_lib.regex_bitparallel import compile_bitparallel
+
+
+# The minimal DFA for this has 2^(k+1) states, so it isn't built past that
+DFA_MAX_K: typing.Final[int] = 10
+
+
+def main():
+    rand = random.Random(42)
+    words: typing.List[str] = [
+        "".join(rand.choices("ab", k=rand.randint(10, 60)))
+        for _ in range(2000)
+    ]
+
+    rows = []
+
+    for k in (4, 8, 10, 30, 100, 300):
+        # Built by hand, as the parser only takes one-digit powers
+        regex = Concat(parse_regex("(a+b)*a"), *[parse_regex("a+b")] * k)
+
+        t_bits_compile: float = utils.timeit(lambda: compile_bitparallel(regex))
+        bits = compile_bitparallel(regex)
+        t_bits: float = utils.timeit(lambda: bits.accepts_many(words), repeat=1)
+
+        t_nfa_compile: float = utils.timeit(lambda: compile_nfa(regex_to_automata(regex)), repeat=1)
+        nfa = compile_nfa(regex_to_automata(regex))
+        t_nfa: float = utils.timeit(lambda: nfa.accepts_many(words), repeat=1)
+
+        t_dfa_compile: float | str = "-"
+        t_dfa: float | str = "-"
+        if k <= DFA_MAX_K:
+            t_dfa_compile = utils.timeit(lambda: compile_automata(regex_to_automata(regex)), repeat=1)
+            dfa = compile_automata(regex_to_automata(regex))
+            t_dfa = utils.timeit(lambda: dfa.accepts_many(words), repeat=1)
+
+        rows.append((
+            k, len(bits),
+            t_bits_compile, t_nfa_compile, t_dfa_compile,
+            t_bits, t_nfa, t_dfa,
+        ))
+
+    utils.print_table(
+        f"Matching {len(words)} words against (a+b)*a(a+b)^k",
+        (
+            "k", "positions",
+            "bits compile, s", "NFA compile, s", "DFA compile, s",
+            "bits match, s", "NFA match, s", "DFA match, s",
+        ),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
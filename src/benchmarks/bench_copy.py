@@ -0,0 +1,52 @@
+from __future__ import annotations
+import typing
+
+import utils
+from formals_lib.automata import *
+from formals_lib.automata_ops import aut_join
+from formals_lib.automata_determ import make_dfa
+
+
+def make_chain(size: int) -> Automata:
+    """
+    A deterministic automata over "ab" with size nodes in a cycle
+    """
+
+    aut = Automata("ab")
+
+    for i in range(1, size):
+        aut.make_node(term=(i % 2 == 0))
+
+    for i in range(size):
+        aut.link(i, (i + 1) % size, "a")
+        aut.link(i, (i * 7) % size, "b")
+
+    return aut
+
+
+def main():
+    rows = []
+
+    for size in (10 ** 3, 10 ** 4, 10 ** 5):
+        aut: Automata = make_chain(size)
+
+        t_build: float = utils.timeit(lambda: make_chain(size), repeat=1)
+        t_copy: float = utils.timeit(aut.copy)
+        t_join: float = utils.timeit(lambda: aut_join(aut, aut), repeat=1)
+        t_dfa: float = utils.timeit(lambda: make_dfa(aut), repeat=1)
+
+        rows.append((
+            size,
+            t_build, t_copy, t_join, t_dfa,
+            t_copy / size * 1e6,
+        ))
+
+    utils.print_table(
+        "Automata construction and copying",
+        ("states", "build, s", "copy, s", "aut_join, s", "make_dfa, s", "copy, us/state"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+import typing
+
+import utils
+from formals_lib.regex_parser import parse_regex
+from formals_lib.regex_automata import regex_to_automata
+from formals_lib.automata_determ import make_dfa
+from formals_lib.automata_minimize import minimize
+from formals_lib.regex_derivatives import BrzozowskiDFABuilder
+
+
+PATTERNS: typing.Final[typing.Tuple[str, ...]] = (
+    "(a+b)*a(a+b)^4",
+    "(a+b)*a(a+b)^8",
+    "((ab)*+c)*(1+d)(a+b+c+d)^5",
+    "(a*b*)*c(a+1)^9",
+    "(ab+ba)*(a+b)^7(ba)*",
+)
+
+
+def main():
+    rows = []
+
+    for pattern in PATTERNS:
+        regex = parse_regex(pattern)
+
+        t_chain: float = utils.timeit(lambda: minimize(make_dfa(regex_to_automata(regex))), repeat=1)
+        dfa_states: int = len(make_dfa(regex_to_automata(regex)))
+        min_states: int = len(minimize(make_dfa(regex_to_automata(regex))))
+
+        builder = BrzozowskiDFABuilder()
+        t_deriv: float = utils.timeit(lambda: BrzozowskiDFABuilder().apply(regex), repeat=1)
+        builder.apply(regex)
+
+        rows.append((
+            pattern, dfa_states, min_states, builder.stats.states,
+            t_chain, t_deriv, builder.stats.hit_rate,
+        ))
+
+    utils.print_table(
+        "Regex -> DFA: Thompson, make_dfa, minimize vs derivatives",
+        (
+            "pattern", "subset states", "minimal states", "derivative states",
+            "chain, s", "derivatives, s", "derivative cache hits",
+        ),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
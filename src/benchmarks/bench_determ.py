@@ -0,0 +1,51 @@
+from __future__ import annotations
+import typing
+
+import utils
+from formals_lib.automata import Automata
+from formals_lib.automata_compact import compact_automata
+from formals_lib.automata_determ import make_dfa
+from formals_lib.regex_automata import regex_to_automata
+
+from bench_memory import measure
+
+
+# The k-th letter from the end is an a: 2^(k+1) subsets for k + 1 letters of history
+PATTERNS: typing.Final[typing.Tuple[str, ...]] = tuple(
+    f"(a+b)*a(a+b)^{k}" for k in (6, 8, 10, 12)
+) + (
+    "(a+b+c+d)*a(a+b+c+d)^6",
+)
+
+
+def main():
+    rows = []
+
+    for pattern in PATTERNS:
+        aut: Automata = regex_to_automata(pattern)
+        compact = compact_automata(aut)
+
+        dfa, int_mem = measure(lambda: make_dfa(aut))
+        _, subset_mem = measure(lambda: make_dfa(aut, subset_keys=True))
+
+        rows.append((
+            pattern, len(aut), len(dfa),
+            utils.timeit(lambda: make_dfa(aut)),
+            utils.timeit(lambda: make_dfa(aut, subset_keys=True)),
+            utils.timeit(lambda: make_dfa(compact)),
+            int_mem / len(dfa), subset_mem / len(dfa),
+        ))
+
+    utils.print_table(
+        "Subset construction: int ids vs frozenset keys",
+        (
+            "regex", "NFA states", "DFA states",
+            "int keys, s", "subset keys, s", "compact, s",
+            "int keys, B/state", "subset keys, B/state",
+        ),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
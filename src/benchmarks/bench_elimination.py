@@ -0,0 +1,82 @@
+from __future__ import annotations
+import typing
+import random
+import time
+
+import utils
+from formals_lib.automata import Automata
+from formals_lib.regex_automata import (
+    AutomataToRegexConverter, EliminationOrder,
+    QueueOrder, MinDegreeOrder, MinWeightOrder, DelayHighFanOrder,
+)
+
+
+ORDERS: typing.Final[typing.Mapping[str, typing.Callable[[], EliminationOrder]]] = {
+    "queue": QueueOrder,
+    "min degree": MinDegreeOrder,
+    "min weight": MinWeightOrder,
+    "delay high fan": DelayHighFanOrder,
+}
+
+
+def random_automata(states: int, rand: random.Random, band: int | None = None) -> Automata:
+    """
+    A random automata over "ab": a chain through all the states, so they're
+    all reachable, and two more edges per state and letter.
+    With band, these only go to the states at most band away
+    """
+
+    result = Automata("ab")
+    nodes = [result.start] + [result.make_node() for _ in range(states - 1)]
+
+    for src, dst in zip(nodes, nodes[1:]):
+        result.link(src, dst, rand.choice("ab"))
+
+    for i, node in enumerate(nodes):
+        lo, hi = (0, states - 1) if band is None else (max(i - band, 0), min(i + band, states - 1))
+
+        for letter in "ab":
+            for _ in range(2):
+                result.link(node, nodes[rand.randint(lo, hi)], letter)
+
+    for node in rand.sample(nodes, max(states // 10, 1)):
+        node.is_term = True
+
+    return result
+
+
+def main():
+    rand = random.Random(0)
+
+    cases: typing.List[typing.Tuple[str, Automata]] = [
+        (f"banded, {states}", random_automata(states, rand, band=2))
+        for states in (10, 50, 100, 250, 500)
+    ]
+    cases.extend(
+        (f"random, {states}", random_automata(states, rand))
+        for states in (10, 20, 50, 100)
+    )
+
+    rows = []
+
+    for name, aut in cases:
+        row: typing.List[typing.Any] = [name]
+
+        for make_order in ORDERS.values():
+            started: float = time.perf_counter()
+            result = AutomataToRegexConverter(aut.copy(), order=make_order()).apply()
+
+            # Tree sizes are astronomical, and are only shown roughly
+            row.extend((float(result.size), time.perf_counter() - started))
+
+        rows.append(row)
+
+    header: typing.List[str] = ["automata"]
+    for name in ORDERS:
+        header.extend((f"{name}: size", "s"))
+
+    utils.print_table("Automata -> regex: state elimination orders", header, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+import typing
+import tracemalloc
+import gc
+
+import utils
+from formals_lib.automata import *
+from formals_lib.automata_compact import compact_automata
+from formals_lib.automata_determ import make_dfa
+
+from bench_copy import make_chain
+
+
+def measure(func: typing.Callable[[], typing.Any]) -> typing.Tuple[typing.Any, int]:
+    """
+    Calls func, returning its result and the memory the result still holds
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    gc.collect()
+    size: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return result, size
+
+
+def main():
+    rows = []
+
+    for size in (10 ** 3, 10 ** 4, 10 ** 5):
+        aut, aut_mem = measure(lambda: make_chain(size))
+        compact, compact_mem = measure(lambda: compact_automata(aut))
+        edges_cnt: int = len(aut.get_edges())
+
+        rows.append((
+            size, edges_cnt,
+            aut_mem / edges_cnt, compact_mem / edges_cnt,
+        ))
+
+        del aut, compact
+
+    utils.print_table(
+        "Memory per transition, bytes",
+        ("states", "edges", "Automata", "CompactAutomata"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
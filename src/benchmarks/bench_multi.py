@@ -0,0 +1,83 @@
+from __future__ import annotations
+import typing
+import random
+
+import utils
+from formals_lib.automata_match import compile_automata
+from formals_lib.automata_multi import compile_patterns
+from formals_lib.regex_automata import regex_to_automata
+
+
+LETTERS: typing.Final[str] = "abcd"
+
+
+def make_patterns(count: int, rand: random.Random) -> typing.List[str]:
+    """
+    Keyword-like patterns: literals, literals with a choice inside
+    and literal prefixes of anything
+    """
+
+    any_word: str = "(" + "+".join(LETTERS) + ")*"
+    patterns: typing.List[str] = []
+
+    for i in range(count):
+        word: str = "".join(rand.choices(LETTERS, k=rand.randint(4, 8)))
+
+        if i % 3 == 0:
+            patterns.append(word)
+        elif i % 3 == 1:
+            pos: int = rand.randrange(len(word))
+            patterns.append(f"{word[:pos]}({word[pos]}+{rand.choice(LETTERS)}){word[pos + 1:]}")
+        else:
+            patterns.append(word[:4] + any_word)
+
+    return patterns
+
+
+def main():
+    rand = random.Random(42)
+    rows = []
+
+    for patterns_cnt in (10 ** 3, 10 ** 4):
+        patterns: typing.List[str] = make_patterns(patterns_cnt, rand)
+        words: typing.List[str] = [
+            "".join(rand.choices(LETTERS, k=rand.randint(4, 10)))
+            for _ in range(2000)
+        ]
+
+        t_compile: float = utils.timeit(lambda: compile_patterns(patterns), repeat=1)
+        multi = compile_patterns(patterns)
+        t_multi: float = utils.timeit(lambda: multi.match_many(words), repeat=1)
+
+        t_compile_each: float = utils.timeit(
+            lambda: [compile_automata(regex_to_automata(pattern)) for pattern in patterns],
+            repeat=1,
+        )
+        singles = [compile_automata(regex_to_automata(pattern)) for pattern in patterns]
+        sample: typing.List[str] = words[:200]
+        t_each: float = utils.timeit(
+            lambda: [[i for i, single in enumerate(singles) if single.accepts(word)] for word in sample],
+            repeat=1,
+        ) * len(words) / len(sample)
+
+        rows.append((
+            patterns_cnt, len(multi),
+            t_compile, t_compile_each,
+            len(words) / t_multi, len(words) / t_each,
+            t_each / t_multi,
+        ))
+
+    utils.print_table(
+        "Matching words against many patterns",
+        (
+            "patterns", "DFA states",
+            "compile, s", "compile each, s",
+            "multi, words/s", "each, words/s",
+            "speedup",
+        ),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
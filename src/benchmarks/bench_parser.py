@@ -0,0 +1,58 @@
+from __future__ import annotations
+import typing
+import random
+
+import utils
+from formals_lib.regex_parser import parse_regex
+
+
+def flat(size: int, rand: random.Random) -> str:
+    return "+".join(
+        "".join(rand.choice("abc") for _ in range(rand.randint(1, 8))) + rand.choice(("", "*", "^3", "^{1,2}"))
+        for _ in range(size // 6)
+    )[:size]
+
+
+def nested(size: int, rand: random.Random) -> str:
+    # Just the parentheses, as deep as it gets
+    depth: int = (size - 1) // 2
+    return "(" * depth + "a" + ")" * depth
+
+
+def balanced(size: int, rand: random.Random) -> str:
+    if size <= 4:
+        return rand.choice("ab")
+
+    half: int = (size - 4) // 2
+    op: str = rand.choice(("+", ""))
+    return f"({balanced(half, rand)}{op}{balanced(half, rand)})*"
+
+
+SHAPES: typing.Final[typing.Mapping[str, typing.Callable[[int, random.Random], str]]] = {
+    "flat": flat,
+    "nested": nested,
+    "balanced": balanced,
+}
+
+
+def main():
+    rand = random.Random(42)
+    rows = []
+
+    for name, shape in SHAPES.items():
+        for size in (10 ** 4, 10 ** 5, 10 ** 6):
+            src: str = shape(size, rand)
+
+            t_parse: float = utils.timeit(lambda: parse_regex(src), repeat=1)
+
+            rows.append((name, len(src), t_parse, t_parse / len(src) * 1e9))
+
+    utils.print_table(
+        "Regex parsing",
+        ("shape", "chars", "parse, s", "ns/char"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
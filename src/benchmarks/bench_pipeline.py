@@ -0,0 +1,54 @@
+from __future__ import annotations
+import typing
+import tracemalloc
+
+import utils
+from formals_lib.automata import Automata
+from formals_lib.regex_automata import regex_to_automata
+from formals_lib.automata_determ import make_edges_1, make_full_dfa
+from formals_lib.automata_minimize import minimize
+
+
+PATTERNS: typing.Final[typing.Tuple[str, ...]] = (
+    "(a+b)*a(a+b)^8",
+    "((ab+ba)*(1+a+ba))^10",
+    "(a(ab+ba)*b(a+ba)*)*",
+)
+
+
+def pipeline(pattern: str, in_place: bool) -> Automata:
+    aut: Automata = regex_to_automata(pattern)
+    aut = make_edges_1(aut, in_place=in_place)
+    aut = make_full_dfa(aut, in_place=in_place)
+    return minimize(aut, in_place=in_place)
+
+
+def peak_memory(func: typing.Callable[[], typing.Any]) -> int:
+    tracemalloc.start()
+    func()
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    rows = []
+
+    for pattern in PATTERNS:
+        row: typing.List[typing.Any] = [pattern]
+
+        for in_place in (False, True):
+            row.append(utils.timeit(lambda: pipeline(pattern, in_place)))
+            row.append(peak_memory(lambda: pipeline(pattern, in_place)) / 1024)
+
+        rows.append(row)
+
+    utils.print_table(
+        "regex_to_automata -> make_edges_1 -> make_full_dfa -> minimize",
+        ("pattern", "copying, s", "copying, KiB", "in place, s", "in place, KiB"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+import typing
+import time
+
+import utils
+from formals_lib.regex import Regex
+from formals_lib.regex_parser import parse_regex
+from formals_lib.regex_automata import regex_to_automata, automata_to_regex
+from formals_lib.automata_determ import make_dfa
+from formals_lib.automata_minimize import minimize
+from formals_lib.regex_rewrite import RegexRewriter, DEFAULT_RULES
+
+
+# State elimination outputs, which is what the rewriter is mostly for
+ELIMINATED: typing.Final[typing.Tuple[str, ...]] = (
+    "(a+b)*a(a+b)^2",
+    "(a+b)*a(a+b)^3",
+    "(ab+ba)*(a+b)^3",
+    "a(b*a)^2*",
+    "((ab)*+c)*(1+d)",
+    "(a(ab+ba)*b(a+ba)*)*",
+)
+
+# Handwritten ones, with some slack in them
+HANDWRITTEN: typing.Final[typing.Tuple[str, ...]] = (
+    "((a*)*b*)*c",
+    "abc+abd+abe+b(a+1)*",
+    "(1+a)*(a+b)*a*",
+    "((a+b)^{0,2})*(ab+ab*)",
+)
+
+
+def corpus() -> typing.List[typing.Tuple[str, Regex]]:
+    result: typing.List[typing.Tuple[str, Regex]] = [
+        (f"a2r {pattern}", automata_to_regex(minimize(make_dfa(regex_to_automata(pattern)))))
+        for pattern in ELIMINATED
+    ]
+    result.extend((pattern, parse_regex(pattern)) for pattern in HANDWRITTEN)
+    return result
+
+
+def main():
+    regexes: typing.List[typing.Tuple[str, Regex]] = corpus()
+    rows = []
+
+    for name, regex in regexes:
+        rewriter = RegexRewriter()
+        started: float = time.perf_counter()
+        result: Regex = rewriter.apply(regex)
+        elapsed: float = time.perf_counter() - started
+
+        rows.append((
+            name, regex.size, result.size, rewriter.stats.reduction,
+            rewriter.stats.passes, sum(rewriter.stats.rewrites.values()), elapsed,
+        ))
+
+    utils.print_table(
+        "Regex rewriting: per regex",
+        ("regex", "size before", "size after", "reduction", "passes", "rewrites", "time, s"),
+        rows,
+    )
+
+    # The corpus as a whole, with every rule left out in turn, and under budgets
+    configs: typing.Dict[str, RegexRewriter] = {"all rules": RegexRewriter()}
+    for name in DEFAULT_RULES:
+        rules = {other: rule for other, rule in DEFAULT_RULES.items() if other != name}
+        configs[f"without {name}"] = RegexRewriter(rules=rules)
+    configs["100 rewrites"] = RegexRewriter(max_rewrites=100)
+    configs["1 ms"] = RegexRewriter(time_budget=1e-3)
+
+    rows = []
+
+    for name, rewriter in configs.items():
+        for _, regex in regexes:
+            rewriter.apply(regex)
+
+        stats = rewriter.stats
+        rows.append((
+            name, stats.size_before, stats.size_after, stats.reduction,
+            stats.out_of_budget, stats.seconds,
+        ))
+
+    utils.print_table(
+        "Regex rewriting: whole corpus",
+        ("rewriter", "size before", "size after", "reduction", "out of budget", "time, s"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
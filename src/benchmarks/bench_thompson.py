@@ -0,0 +1,92 @@
+from __future__ import annotations
+import typing
+import random
+
+import utils
+from formals_lib.regex import *
+from formals_lib.automata import Automata
+from formals_lib.automata_ops import aut_concat, aut_join, aut_star
+from formals_lib.regex_automata import regex_to_automata
+
+
+def flat_concat(leaves: int, rand: random.Random) -> Regex:
+    return Concat(*(Letter(rand.choice("ab")) for _ in range(leaves)))
+
+
+def starred_terms(leaves: int, rand: random.Random) -> Regex:
+    return Concat(*(Star(Either(Letter("a"), Letter("b"))) for _ in range(leaves // 2)))
+
+
+def balanced(leaves: int, rand: random.Random) -> Regex:
+    if leaves == 1:
+        return Letter(rand.choice("ab"))
+
+    half: int = leaves // 2
+    children = (balanced(half, rand), balanced(leaves - half, rand))
+
+    if rand.random() < 0.5:
+        return Concat(*children)
+    return Star(Either(*children))
+
+
+SHAPES: typing.Final[typing.Mapping[str, typing.Callable[[int, random.Random], Regex]]] = {
+    "flat concat": flat_concat,
+    "concat of (a+b)*": starred_terms,
+    "balanced": balanced,
+}
+
+
+def fold_convert(regex: Regex) -> Automata:
+    """
+    The previous construction, folding children with the binary operations
+    """
+
+    if isinstance(regex, Letter):
+        result = Automata(regex.letter)
+        result.link(result.start, result.make_node(term=True), regex.letter)
+        return result
+
+    if isinstance(regex, Star):
+        return aut_star(fold_convert(regex.get_children()[0]), in_place=True)
+
+    op = aut_concat if isinstance(regex, Concat) else aut_join
+    children = iter(regex.get_children())
+
+    result: Automata = fold_convert(next(children))
+    for child in children:
+        result = op(result, fold_convert(child))
+
+    return result
+
+
+def main():
+    rand = random.Random(42)
+    rows = []
+
+    for name, shape in SHAPES.items():
+        for leaves in (300, 10 ** 3, 10 ** 4, 3 * 10 ** 4, 10 ** 5):
+            regex: Regex = shape(leaves, rand)
+
+            t_single: float = utils.timeit(lambda: regex_to_automata(regex), repeat=1)
+            nodes: int = len(regex_to_automata(regex))
+
+            # Superlinear (about 3s already at 300 leaves), so only run on the smallest
+            t_fold: float | str = "-"
+            if leaves <= 300:
+                t_fold = utils.timeit(lambda: fold_convert(regex), repeat=1)
+
+            rows.append((
+                name, leaves, nodes,
+                t_single, t_single / leaves * 1e6,
+                t_fold,
+            ))
+
+    utils.print_table(
+        "Regex -> automata construction",
+        ("shape", "leaves", "nodes", "single pass, s", "us/leaf", "folding, s"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
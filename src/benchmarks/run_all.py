@@ -0,0 +1,20 @@
+from __future__ import annotations
+import typing
+import pathlib
+import importlib
+import sys
+
+import utils
+
+
+def main():
+    names: typing.List[str] = sys.argv[1:] or sorted(
+        path.stem for path in pathlib.Path(__file__).parent.glob("bench_*.py")
+    )
+
+    for name in names:
+        importlib.import_module(name).main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+from __future__ import annotations
+import typing
+import pathlib
+import sys
+import time
+
+
+# So that formals_lib can be imported by the benchmarks
+sys.path.append(str(pathlib.Path(__file__).parent.parent.absolute()))
+
+
+def timeit(func: typing.Callable[[], typing.Any], repeat: int = 3) -> float:
+    """
+    Best wall time of several runs, in seconds
+    """
+
+    best: float = float("inf")
+
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def print_table(title: str, header: typing.Sequence[str], rows: typing.Iterable[typing.Sequence[typing.Any]]) -> None:
+    def fmt(value: typing.Any) -> str:
+        if isinstance(value, float):
+            return f"{value:.4g}"
+        return str(value)
+
+    rows = [list(map(fmt, row)) for row in rows]
+    widths: typing.List[int] = [
+        max(len(cell) for cell in column)
+        for column in zip(header, *rows)
+    ]
+
+    print(f"== {title} ==")
+    for row in [list(header)] + rows:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+    print()
@@ -56,7 +56,8 @@ def dump(aut: formals.Automata, output_dir: pathlib.Path, task_id: typing.Iterab
 
 def dump_regex(re: formals.Regex, output_dir: pathlib.Path, task_id: typing.Iterable[typing.Any]) -> None:
     with open(_task_file_name(output_dir, task_id, "txt"), "w") as f:
-        print(formals.reconstruct_regex(re), file=f)
+        formals.write_regex(re, f)
+        f.write("\n")
 
 
 def solve_task_3_1(output_dir: pathlib.Path):
@@ -113,10 +114,8 @@ def solve_task_4_2(output_dir: pathlib.Path):
 
 
 def solve_task_4_3(output_dir: pathlib.Path):
-    # NOTE: The last ^+ is missing, becuse it's not supported!
-    re = formals.parse_regex("(a(ab+ba)*b(a+ba)*)")
+    re = formals.parse_regex("(a(ab+ba)*b(a+ba)*)^+")
     aut: formals.Automata = formals.regex_to_automata(re)
-    aut = formals.aut_pow_plus(aut)
     aut = formals.minimize(aut)
     
     dump(aut, output_dir, (4, 3))
@@ -163,8 +162,7 @@ def solve_task_4_4(output_dir: pathlib.Path):
 
 
 def solve_task_4_5(output_dir: pathlib.Path):
-    # NOTE: The last ^+ is missing, becuse it's not supported!
-    re = formals.parse_regex("(a(ab+ba)*b(a+ba)*)")
+    re = formals.parse_regex("(a(ab+ba)*b(a+ba)*)^+")
     aut: formals.Automata = formals.regex_to_automata(re)
     aut = formals.complement(aut)
     
@@ -2,5 +2,8 @@ from . import \
     itree, regex, regex_parser, automata, automata_dot, \
     automata_ops, automata_determ, regex_automata, \
     automata_complement, automata_minimize, regex_optimize, \
-    automata_cmp
+    automata_cmp, automata_compact, automata_match, automata_batch, \
+    automata_search, automata_nfa, automata_lazy, automata_multi, \
+    regex_bitparallel, regex_derivatives, regex_cache, regex_rewrite, \
+    regex_dag
 # TODO: automata_serialize, once implemented
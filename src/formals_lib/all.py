@@ -10,3 +10,15 @@ from .automata_complement import *
 from .automata_minimize import *
 from .regex_optimize import *
 from .automata_cmp import *
+from .automata_compact import *
+from .automata_match import *
+from .automata_batch import *
+from .automata_search import *
+from .automata_nfa import *
+from .automata_lazy import *
+from .automata_multi import *
+from .regex_bitparallel import *
+from .regex_derivatives import *
+from .regex_cache import *
+from .regex_rewrite import *
+from .regex_dag import *
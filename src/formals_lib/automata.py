@@ -1,17 +1,77 @@
 from __future__ import annotations
 import typing
 import dataclasses
+import contextlib
+import gc
+import sys
 from collections import deque
 
 
 KeyType = typing.Any
 
 
-@dataclasses.dataclass
+_NO_EDGES: typing.Final[typing.FrozenSet["Edge"]] = frozenset()
+
+
 class Node:
+    # Slotted, and every container is only allocated once it's needed,
+    # since large automatas consist of millions of these
+    __slots__ = ("key", "_out", "_inc", "_by_label", "_nondet_cnt", "_is_term", "_owner")
+
     key: KeyType
-    out: typing.Set["Edge"] = dataclasses.field(default_factory=set)
-    is_term: bool = False
+    # Out-edges, in-edges, out-edges by label and _nondet_cnt are
+    # maintained by Automata.link/unlink, never modify them directly
+    _out: typing.Set["Edge"] | None
+    _inc: typing.Set["Edge"] | None
+    # A label maps to its only edge, or to a set if there are several
+    _by_label: typing.Dict[str, "Edge" | typing.Set["Edge"]] | None
+    # Non-single-letter edges plus surplus edges sharing a label
+    _nondet_cnt: int
+    _is_term: bool
+    # The automata whose term set has to follow is_term
+    _owner: "Automata" | None
+
+
+    def __init__(self, key: KeyType, is_term: bool = False):
+        self.key = key
+        self._out = None
+        self._inc = None
+        self._by_label = None
+        self._nondet_cnt = 0
+        self._is_term = bool(is_term)
+        self._owner = None
+    
+    @property
+    def out(self) -> typing.AbstractSet["Edge"]:
+        return self._out if self._out is not None else _NO_EDGES
+    
+    @property
+    def inc(self) -> typing.AbstractSet["Edge"]:
+        return self._inc if self._inc is not None else _NO_EDGES
+    
+    @property
+    def is_term(self) -> bool:
+        return self._is_term
+    
+    @is_term.setter
+    def is_term(self, value: bool) -> None:
+        value = bool(value)
+        
+        if value == self._is_term:
+            return
+        
+        self._is_term = value
+        
+        if self._owner is None:
+            return
+        
+        if value:
+            self._owner._terms.add(self)
+        else:
+            self._owner._terms.discard(self)
+    
+    def __repr__(self) -> str:
+        return f"Node(key={self.key!r}, is_term={self.is_term!r})"
 
     # def get_edges(self, *,
     #               label_full:  str | None = None,
@@ -24,24 +84,90 @@ class Node:
     #                     or_none: bool = True) -> Edge | None:
     #     raise NotImplementedError()
     
+    def get_edges_by_label(self, label: str) -> typing.Iterable["Edge"]:
+        if self._by_label is None:
+            return ()
+        
+        edges: Edge | typing.Set[Edge] | None = self._by_label.get(label)
+        
+        if edges is None:
+            return ()
+        if isinstance(edges, Edge):
+            return (edges,)
+        return edges
+    
     def get_only_edge(self, label: str, *, or_none: bool = False) -> "Edge" | None:
-        result: Edge | None = None
+        edges: Edge | typing.Set[Edge] | None = None
+        if self._by_label is not None:
+            edges = self._by_label.get(label)
         
-        for edge in self.out:
-            if edge.label != label:
-                continue
-            if result is not None:
-                raise LookupError("Duplicate edge with fitting label")
-            
-            result = edge
+        if edges is None:
+            if not or_none:
+                raise LookupError("Edge not found")
+            return None
         
-        if result is None and not or_none:
-            raise LookupError("Edge not found")
+        if not isinstance(edges, Edge):
+            raise LookupError("Duplicate edge with fitting label")
         
-        return result
+        return edges
+    
+    def step(self, label: str, *, or_none: bool = False) -> "Node" | None:
+        """
+        The destination of the only edge labeled with label
+        """
+        
+        edge: Edge | None = self.get_only_edge(label, or_none=or_none)
+        
+        if edge is None:
+            return None
+        
+        return edge.dst
     
     def is_deterministic(self) -> bool:
-        return all(len(e) == 1 for e in self.out) and len(set(map(lambda x: x.label, self.out))) == len(self.out)
+        return self._nondet_cnt == 0
+    
+    def _add_edge(self, edge: "Edge") -> None:
+        if self._out is None:
+            self._out = set()
+            self._by_label = {}
+        elif edge in self._out:
+            return
+        
+        self._out.add(edge)
+        
+        same_label: Edge | typing.Set[Edge] | None = self._by_label.get(edge.label)
+        if same_label is None:
+            self._by_label[edge.label] = edge
+        elif isinstance(same_label, Edge):
+            self._by_label[edge.label] = {same_label, edge}
+        else:
+            same_label.add(edge)
+        
+        if not edge.is_letter() or same_label is not None:
+            self._nondet_cnt += 1
+    
+    def _remove_edge(self, edge: "Edge") -> None:
+        self._out.remove(edge)
+        
+        same_label: Edge | typing.Set[Edge] = self._by_label[edge.label]
+        shared: bool = not isinstance(same_label, Edge)
+        if not shared:
+            del self._by_label[edge.label]
+        else:
+            same_label.remove(edge)
+            if len(same_label) == 1:
+                self._by_label[edge.label] = next(iter(same_label))
+        
+        if not edge.is_letter() or shared:
+            self._nondet_cnt -= 1
+    
+    def _add_in_edge(self, edge: "Edge") -> None:
+        if self._inc is None:
+            self._inc = set()
+        self._inc.add(edge)
+    
+    def _remove_in_edge(self, edge: "Edge") -> None:
+        self._inc.discard(edge)
     
     def __hash__(self) -> int:
         # It's certainly fine here, since we never consider nodes 'equal'
@@ -51,20 +177,70 @@ class Node:
         return self is other
 
 
-# TODO: ?
-@dataclasses.dataclass(frozen=True)
 class Edge:
+    # Immutable and slotted. Labels are interned by Automata.link
+    __slots__ = ("label", "src", "dst")
+
     label: str
-    src: "Node"
-    dst: "Node"
+    src: Node
+    dst: Node
+
+
+    def __init__(self, label: str, src: Node, dst: Node):
+        object.__setattr__(self, "label", label)
+        object.__setattr__(self, "src", src)
+        object.__setattr__(self, "dst", dst)
+    
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        raise dataclasses.FrozenInstanceError(f"cannot assign to field {name!r}")
+    
+    def __delattr__(self, name: str) -> None:
+        raise dataclasses.FrozenInstanceError(f"cannot delete field {name!r}")
+    
+    def __eq__(self, other) -> bool:
+        if type(other) is not Edge:
+            return NotImplemented
+        return self.src is other.src and self.dst is other.dst and self.label == other.label
+    
+    def __hash__(self) -> int:
+        return hash((self.label, id(self.src), id(self.dst)))
+    
+    def __repr__(self) -> str:
+        return f"Edge(label={self.label!r}, src={self.src!r}, dst={self.dst!r})"
 
     def __len__(self) -> int:
         return len(self.label)
+    
+    def is_letter(self) -> bool:
+        # Labels aren't always strings, see AutomataToRegexConverter
+        return isinstance(self.label, str) and len(self.label) == 1
+
+
+@contextlib.contextmanager
+def bulk_build() -> typing.Generator[None, None, None]:
+    """
+    Suspends the cyclic garbage collector while building large automatas.
+    Nodes and edges reference each other, so every allocation would
+    otherwise count towards a (useless) collection pass.
+
+    The library never does this on its own, since the collector is
+    process-wide: wrap the building code in it explicitly, if that's fine
+    for the rest of the program (and its other threads)
+    """
+    
+    was_enabled: bool = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
 
 
 class Automata:
     alphabet: str
     _nodes: typing.Set[Node]
+    _terms: typing.Set[Node]
     _node_lookup: typing.Dict[KeyType, Node]
     _next_id: int
     _edges: typing.Set[Edge]
@@ -74,6 +250,7 @@ class Automata:
     def __init__(self, alphabet: str):
         self.alphabet = alphabet
         self._nodes = set()
+        self._terms = set()
         self._node_lookup = {}
         self._next_id = 0
         self._edges = set()
@@ -88,8 +265,11 @@ class Automata:
             key = self._get_next_id()
 
         node = Node(key, is_term=term)
+        node._owner = self
         
         self._nodes.add(node)
+        if node.is_term:
+            self._terms.add(node)
 
         self.change_key(node, key)
 
@@ -120,9 +300,13 @@ class Automata:
         if not isinstance(dst, Node):
             dst = self.node(dst)
         
+        if isinstance(label, str):
+            label = sys.intern(label)
+        
         edge: Edge = Edge(label, src, dst)
         self._edges.add(edge)
-        src.out.add(edge)
+        src._add_edge(edge)
+        dst._add_in_edge(edge)
         return edge
     
     def unlink(self, edge: Edge) -> Edge:
@@ -130,7 +314,8 @@ class Automata:
 
         self._edges.remove(edge)
 
-        edge.src.out.remove(edge)
+        edge.src._remove_edge(edge)
+        edge.dst._remove_in_edge(edge)
 
         return edge
     
@@ -143,28 +328,38 @@ class Automata:
         return Node
     
     def remove_nodes(self, nodes: typing.Iterable[Node | KeyType]) -> None:
-        nodes: typing.Set[Node] = set(nodes)
+        # Deduplicated, but still in order
+        nodes: typing.Iterable[Node] = dict.fromkeys(
+            node if isinstance(node, Node) else self.node(node)
+            for node in nodes
+        )
 
         for node in nodes:
-            if not isinstance(node, Node):
-                node = self.node(node)
             assert node in self._nodes
             assert node is not self.start, "Cannot remove the start node"
+        
+        for node in nodes:
+            # Copying to avoid messing up the iteration
+            self.unlink_many(list(node.out))
+            self.unlink_many(list(node.inc))
+            
             self._nodes.remove(node)
-
-        # Copying to avoid messing up the iteration
-        for edge in list(self.get_edges()):
-            if edge.src in nodes or edge.dst in nodes:
-                self.unlink(edge)
+            self._terms.discard(node)
+            node._owner = None
+    
+    def step(self, state: Node | KeyType, label: str, *, or_none: bool = False) -> Node | None:
+        if not isinstance(state, Node):
+            state = self.node(state)
+        
+        return state.step(label, or_none=or_none)
     
     def change_key(self, node: Node | KeyType | None, key: KeyType) -> None:
         if not isinstance(node, Node):
             node = self.node(node)
         
-        # Copying to avoid messing up the iteration
-        for k, v in list(self._node_lookup.items()):
-            if v is node:
-                self._node_lookup.pop(k)
+        # A fresh node from make_node isn't registered yet
+        if self._node_lookup.get(node.key) is node:
+            del self._node_lookup[node.key]
         
         if key is None:
             key = self._get_next_id()
@@ -175,6 +370,10 @@ class Automata:
         node.key = key
 
     def _get_next_id(self) -> int:
+        # Skipping the ids already taken by explicitly specified keys
+        while self._next_id in self._node_lookup:
+            self._next_id += 1
+        
         result: int = self._next_id
         self._next_id += 1
         return result
@@ -186,27 +385,63 @@ class Automata:
         return self._edges
     
     def get_terms(self) -> typing.Iterable[Node]:
-        return (node for node in self.get_nodes() if node.is_term)
+        # A snapshot, so that callers may freely toggle is_term while iterating
+        return tuple(self._terms)
+    
+    def get_in_edges(self, node: Node | KeyType) -> typing.Iterable[Edge]:
+        if not isinstance(node, Node):
+            node = self.node(node)
+        
+        return node.inc
     
     def is_deterministic(self) -> bool:
         return all(node.is_deterministic() for node in self.get_nodes())
     
+    def add_from(self, other: Automata,
+                 key_map: typing.Callable[[KeyType], KeyType] | None = None,
+                 *, terms: bool = True) -> typing.Dict[Node, Node]:
+        """
+        Bulk-copies all of other's nodes and edges into self, in linear time.
+        Keys are passed through key_map, if specified, and term markers
+        are only kept if terms is set. Returns the mapping from other's nodes
+        to their copies; other's start is copied as a regular node
+        """
+
+        mapping: typing.Dict[Node, Node] = {}
+
+        for node in other.get_nodes():
+            key: KeyType = node.key if key_map is None else key_map(node.key)
+            mapping[node] = self.make_node(key=key, term=terms and node.is_term)
+            
+        for edge in other.get_edges():
+            self.link(mapping[edge.src], mapping[edge.dst], edge.label)
+        
+        return mapping
+    
     def copy(self) -> Automata:
         result = Automata(self.alphabet)
 
+        # The placeholder start is replaced by a copy of ours
+        placeholder: Node = result.start
+        result.change_key(placeholder, object())
+        
+        mapping: typing.Dict[Node, Node] = result.add_from(self)
+        
+        result.set_start(mapping[self.start])
+        result.remove_node(placeholder)
         result._next_id = self._next_id
-        result.start.is_term = self.start.is_term
-        result.change_key(result.start, self.start.key)
+        
+        return result
 
-        for node in self.get_nodes():
-            if node is self.start:
-                continue
-            result.make_node(key=node.key, term=node.is_term)
+    def compile(self) -> "DFAMatcher":
+        """
+        Builds an immutable matcher for the language of this automata
+        """
         
-        for edge in self.get_edges():
-            result.link(edge.src.key, edge.dst.key, edge.label)
+        # Imported here, since the matcher relies on minimize()
+        from .automata_match import compile_automata
         
-        return result
+        return compile_automata(self)
 
     def __copy__(self) -> Automata:
         return self.copy()
@@ -304,5 +539,5 @@ class AutomataVisitor:
 
 
 __all__ = [
-    "KeyType", "Node", "Edge", "Automata", "AutomataVisitor",
+    "KeyType", "Node", "Edge", "Automata", "AutomataVisitor", "bulk_build",
 ]
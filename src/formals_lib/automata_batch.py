@@ -0,0 +1,132 @@
+from __future__ import annotations
+import typing
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from .automata import *
+from .automata_determ import make_full_dfa
+
+
+class BatchDFAMatcher:
+    """
+    Matches many words against a full DFA at once, advancing
+    every word's state in lockstep through fancy indexing
+    into a flat (states + 1) x (letters + 2) transition table.
+    The extra row is a sink, the extra columns are for unknown letters
+    and for padding (which keeps every state as it is).
+    Requires numpy
+    """
+
+    alphabet: str
+    start: int
+    sink: int
+    _width: int
+    _table: "np.ndarray"
+    _terms: "np.ndarray"
+    _columns: "np.ndarray"
+    chunk_size: int
+
+
+    def __init__(self, aut: Automata, chunk_size: int = 1 << 16):
+        if np is None:
+            raise ImportError("BatchDFAMatcher requires numpy")
+
+        dfa: Automata = make_full_dfa(aut)
+
+        nodes: typing.List[Node] = [dfa.start]
+        nodes.extend(node for node in dfa.get_nodes() if node is not dfa.start)
+        node_idx: typing.Dict[Node, int] = {node: i for i, node in enumerate(nodes)}
+
+        self.alphabet = "".join(dict.fromkeys(dfa.alphabet))
+        self.start = 0
+        self.sink = len(nodes)
+        self.chunk_size = chunk_size
+
+        self._width = len(self.alphabet) + 2
+        table = np.full((len(nodes) + 1, self._width), self.sink, dtype=np.int32)
+        for src_i, src in enumerate(nodes):
+            for col, letter in enumerate(self.alphabet):
+                table[src_i, col] = node_idx[src.step(letter)]
+        table[:, self.pad_column] = np.arange(len(nodes) + 1)
+        self._table = table.ravel()
+
+        self._terms = np.array([node.is_term for node in nodes] + [False], dtype=bool)
+
+        # Maps code points to columns. Anything past the end is unknown
+        max_code_point: int = max(map(ord, self.alphabet), default=-1)
+        self._columns = np.full(max_code_point + 2, self.unknown_column, dtype=np.int32)
+        for col, letter in enumerate(self.alphabet):
+            self._columns[ord(letter)] = col
+
+    @property
+    def unknown_column(self) -> int:
+        return len(self.alphabet)
+
+    @property
+    def pad_column(self) -> int:
+        return len(self.alphabet) + 1
+
+    def encode(self, words: typing.Sequence[str]) -> "np.ndarray":
+        """
+        Encodes words as a padded (len(words), max_len) array of columns.
+        The array is column-major, so that each step reads contiguous memory
+        """
+
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        max_len: int = int(lengths.max()) if len(words) else 0
+
+        text: str = "".join(words)
+        try:
+            code_points = np.frombuffer(text.encode("latin-1"), dtype=np.uint8)
+        except UnicodeEncodeError:
+            code_points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+        # Widened first, since the bound may not fit into uint8
+        columns = self._columns[np.minimum(code_points.astype(np.int64), len(self._columns) - 1)]
+
+        codes = np.full((len(words), max_len), self.pad_column, dtype=np.int32, order="F")
+        # The length mask picks the cells in the row-major order, which matches the joined text
+        codes[np.arange(max_len) < lengths[:, None]] = columns
+
+        return codes
+
+    def run_encoded(self, codes: "np.ndarray") -> "np.ndarray":
+        """
+        Final states for pre-encoded words
+        """
+
+        states = np.full(codes.shape[0], self.start, dtype=np.int32)
+        table = self._table
+        width: int = self._width
+
+        for t in range(codes.shape[1]):
+            states = table.take(states * width + codes[:, t])
+
+        return states
+
+    def accepts_batch(self, words: typing.Iterable[str]) -> "np.ndarray":
+        """
+        A boolean mask of the accepted words
+        """
+
+        words = list(words)
+        result = np.empty(len(words), dtype=bool)
+
+        for lo in range(0, len(words), self.chunk_size):
+            chunk: typing.List[str] = words[lo:lo + self.chunk_size]
+            states = self.run_encoded(self.encode(chunk))
+            result[lo:lo + len(chunk)] = self._terms[states]
+
+        return result
+
+
+def compile_batch_matcher(aut: Automata, chunk_size: int = 1 << 16) -> BatchDFAMatcher:
+    return BatchDFAMatcher(aut, chunk_size=chunk_size)
+
+
+__all__ = [
+    "BatchDFAMatcher", "compile_batch_matcher",
+]
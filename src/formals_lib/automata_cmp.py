@@ -4,6 +4,7 @@ from collections import deque
 
 from .automata import *
 from .automata_determ import make_full_dfa
+from .automata_compact import CompactAutomata, compact_compare
 
 
 class AutomataComparator:
@@ -31,14 +32,14 @@ class AutomataComparator:
                 return False
             
             for edge1 in node1.out:
-                edge2 = node2.get_only_edge(edge1.label)
-                
-                self._queue.append((edge1.dst, edge2.dst))
+                self._queue.append((edge1.dst, node2.step(edge1.label)))
         
         return True
 
 
-def compare_automatas(aut1: Automata, aut2: Automata) -> bool:
+def compare_automatas(aut1: Automata | CompactAutomata, aut2: Automata | CompactAutomata) -> bool:
+    if isinstance(aut1, CompactAutomata) or isinstance(aut2, CompactAutomata):
+        return compact_compare(aut1, aut2)
     return AutomataComparator(aut1, aut2).compare()
 
 
@@ -0,0 +1,527 @@
+from __future__ import annotations
+import typing
+from array import array
+from collections import deque
+
+from .automata import *
+
+
+# 4-byte indices are plenty: we're not going to see 2^31 states
+_INDEX_TYPECODE: typing.Final[str] = "i"
+
+# A stand-in for the implicit dead state of a partial DFA
+_NO_STATE: typing.Final[int] = -1
+
+
+def _index_array(data: typing.Iterable[int] = ()) -> array:
+    return array(_INDEX_TYPECODE, data)
+
+
+class CompactAutomata:
+    """
+    An array-backed counterpart of Automata.
+
+    States are dense ints, edge labels are interned into int symbol codes
+    (the alphabet's letters always get the first codes), and transitions
+    are stored CSR-style: the edges of state i occupy positions
+    offsets[i]:offsets[i + 1] of labels and targets.
+
+    Keys are only kept if explicitly provided, otherwise
+    a state's key is its index.
+    """
+
+    alphabet: str
+    symbols: typing.Tuple[str, ...]
+    start: int
+    terms: bytearray
+    offsets: array
+    labels: array
+    targets: array
+    keys: typing.Tuple[KeyType, ...] | None
+    next_id: int | None
+
+
+    def __init__(self, alphabet: str, symbols: typing.Sequence[str],
+                 start: int, terms: bytearray,
+                 offsets: array, labels: array, targets: array,
+                 keys: typing.Sequence[KeyType] | None = None,
+                 next_id: int | None = None):
+        assert len(offsets) == len(terms) + 1
+        assert len(labels) == len(targets) == offsets[-1]
+        assert keys is None or len(keys) == len(terms)
+
+        self.alphabet = alphabet
+        self.symbols = tuple(symbols)
+        self.start = start
+        self.terms = terms
+        self.offsets = offsets
+        self.labels = labels
+        self.targets = targets
+        self.keys = tuple(keys) if keys is not None else None
+        self.next_id = next_id
+
+    @classmethod
+    def from_edges(cls, alphabet: str, symbols: typing.Sequence[str],
+                   start: int, terms: bytearray,
+                   edges: typing.Iterable[typing.Tuple[int, int, int]],
+                   **kwargs) -> CompactAutomata:
+        """
+        Builds the CSR arrays from (src, symbol, dst) triples in any order
+        """
+
+        edges = list(edges)
+        states_cnt: int = len(terms)
+
+        # Counting sort by src
+        offsets: array = _index_array([0]) * (states_cnt + 1)
+        for src, _, _ in edges:
+            offsets[src + 1] += 1
+        for i in range(states_cnt):
+            offsets[i + 1] += offsets[i]
+
+        fill: array = offsets[:-1]
+        labels: array = _index_array([0]) * len(edges)
+        targets: array = _index_array([0]) * len(edges)
+        for src, sym, dst in edges:
+            pos: int = fill[src]
+            labels[pos] = sym
+            targets[pos] = dst
+            fill[src] = pos + 1
+
+        return cls(alphabet, symbols, start, terms, offsets, labels, targets, **kwargs)
+
+    @classmethod
+    def from_automata(cls, aut: Automata) -> CompactAutomata:
+        nodes: typing.List[Node] = [aut.start]
+        nodes.extend(node for node in aut.get_nodes() if node is not aut.start)
+        node_idx: typing.Dict[Node, int] = {node: i for i, node in enumerate(nodes)}
+
+        symbols: typing.List[str] = list(dict.fromkeys(aut.alphabet))
+        symbol_lookup: typing.Dict[str, int] = {sym: i for i, sym in enumerate(symbols)}
+
+        def intern(label: str) -> int:
+            code: int | None = symbol_lookup.get(label)
+            if code is None:
+                code = symbol_lookup[label] = len(symbols)
+                symbols.append(label)
+            return code
+
+        return cls.from_edges(
+            aut.alphabet,
+            symbols,
+            0,
+            bytearray(node.is_term for node in nodes),
+            (
+                (node_idx[edge.src], intern(edge.label), node_idx[edge.dst])
+                for edge in aut.get_edges()
+            ),
+            keys=[node.key for node in nodes],
+            next_id=aut._next_id,
+        )
+
+    def to_automata(self) -> Automata:
+        result = Automata(self.alphabet)
+
+        keys: typing.Sequence[KeyType] = self.keys if self.keys is not None else range(len(self))
+
+        result.change_key(result.start, keys[self.start])
+        result.start.is_term = bool(self.terms[self.start])
+
+        nodes: typing.List[Node] = []
+        symbols = self.symbols
+
+        for i, key in enumerate(keys):
+            if i == self.start:
+                nodes.append(result.start)
+                continue
+            nodes.append(result.make_node(key=key, term=bool(self.terms[i])))
+
+        for src in range(len(self)):
+            for pos in range(self.offsets[src], self.offsets[src + 1]):
+                result.link(nodes[src], nodes[self.targets[pos]], symbols[self.labels[pos]])
+
+        result._next_id = self.next_id if self.next_id is not None else len(self)
+
+        return result
+
+    def key(self, state: int) -> KeyType:
+        if self.keys is None:
+            return state
+        return self.keys[state]
+
+    def out(self, state: int) -> typing.Iterable[typing.Tuple[int, int]]:
+        """
+        (symbol, dst) pairs for the edges of state
+        """
+
+        lo: int = self.offsets[state]
+        hi: int = self.offsets[state + 1]
+        return zip(self.labels[lo:hi], self.targets[lo:hi])
+
+    def is_term(self, state: int) -> bool:
+        return bool(self.terms[state])
+
+    def edge_count(self) -> int:
+        return len(self.labels)
+
+    def is_deterministic(self) -> bool:
+        is_letter: typing.List[bool] = [len(sym) == 1 for sym in self.symbols]
+
+        for state in range(len(self)):
+            seen: typing.Set[int] = set()
+            for sym, _ in self.out(state):
+                if not is_letter[sym] or sym in seen:
+                    return False
+                seen.add(sym)
+
+        return True
+
+    def nbytes(self) -> int:
+        """
+        The memory taken by the transition arrays (not counting keys)
+        """
+
+        return sum(
+            arr.itemsize * len(arr)
+            for arr in (self.offsets, self.labels, self.targets)
+        ) + len(self.terms)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+
+class BaseCompactTransform:
+    aut: CompactAutomata
+
+
+    def __init__(self, aut: CompactAutomata):
+        self.aut = aut
+
+    def apply(self) -> CompactAutomata:
+        raise NotImplementedError()
+
+
+class CompactTrimmer(BaseCompactTransform):
+    def apply(self) -> CompactAutomata:
+        aut: CompactAutomata = self.aut
+
+        new_idx: typing.List[int] = [_NO_STATE] * len(aut)
+        order: typing.List[int] = [aut.start]
+        new_idx[aut.start] = 0
+
+        # order doubles as the BFS queue
+        for state in order:
+            for _, dst in aut.out(state):
+                if new_idx[dst] == _NO_STATE:
+                    new_idx[dst] = len(order)
+                    order.append(dst)
+
+        offsets: array = _index_array([0])
+        labels: array = _index_array()
+        targets: array = _index_array()
+        for state in order:
+            lo: int = aut.offsets[state]
+            hi: int = aut.offsets[state + 1]
+            labels.extend(aut.labels[lo:hi])
+            targets.extend(new_idx[dst] for dst in aut.targets[lo:hi])
+            offsets.append(len(labels))
+
+        return CompactAutomata(
+            aut.alphabet,
+            aut.symbols,
+            0,
+            bytearray(aut.terms[state] for state in order),
+            offsets,
+            labels,
+            targets,
+            keys=[aut.key(state) for state in order],
+            next_id=aut.next_id,
+        )
+
+
+class CompactDeterminizer(BaseCompactTransform):
+    """
+    Subset construction straight on the arrays.
+    Multi-letter labels are split and epsilon edges are
+    handled through closures, so any CompactAutomata is accepted.
+    The result has plain int keys and, unless full is set,
+    no dead state.
+    """
+
+    full: bool
+    _letters: typing.List[str]
+    _letter_codes: typing.Dict[str, int]
+    _succ: typing.List[typing.List[typing.Tuple[int, int]]]
+    _eps: typing.List[typing.List[int]]
+    _terms: bytearray
+    _closures: typing.Dict[int, typing.FrozenSet[int]]
+
+
+    def __init__(self, aut: CompactAutomata, full: bool = False):
+        super().__init__(aut)
+
+        self.full = full
+        self._closures = {}
+        self._split_labels()
+
+    def _split_labels(self) -> None:
+        """
+        Builds per-state adjacency lists where every edge
+        is either an epsilon or a single letter
+        """
+
+        aut: CompactAutomata = self.aut
+
+        self._letters = list(dict.fromkeys(aut.alphabet))
+        self._letter_codes = {letter: i for i, letter in enumerate(self._letters)}
+        self._succ = [[] for _ in range(len(aut))]
+        self._eps = [[] for _ in range(len(aut))]
+        self._terms = bytearray(aut.terms)
+
+        def letter_code(letter: str) -> int:
+            code: int | None = self._letter_codes.get(letter)
+            if code is None:
+                code = self._letter_codes[letter] = len(self._letters)
+                self._letters.append(letter)
+            return code
+
+        def new_state() -> int:
+            self._succ.append([])
+            self._eps.append([])
+            self._terms.append(0)
+            return len(self._succ) - 1
+
+        for src in range(len(aut)):
+            for sym, dst in aut.out(src):
+                label: str = aut.symbols[sym]
+
+                if not label:
+                    self._eps[src].append(dst)
+                    continue
+
+                prev: int = src
+                for letter in label[:-1]:
+                    cur: int = new_state()
+                    self._succ[prev].append((letter_code(letter), cur))
+                    prev = cur
+                self._succ[prev].append((letter_code(label[-1]), dst))
+
+    def closure(self, state: int) -> typing.FrozenSet[int]:
+        result: typing.FrozenSet[int] | None = self._closures.get(state)
+        if result is not None:
+            return result
+
+        seen: typing.Set[int] = {state}
+        stack: typing.List[int] = [state]
+        while stack:
+            for dst in self._eps[stack.pop()]:
+                if dst not in seen:
+                    seen.add(dst)
+                    stack.append(dst)
+
+        result = self._closures[state] = frozenset(seen)
+        return result
+
+    def apply(self) -> CompactAutomata:
+        letters_cnt: int = len(self._letters)
+
+        start_set: typing.FrozenSet[int] = self.closure(self.aut.start)
+        subset_ids: typing.Dict[typing.FrozenSet[int], int] = {start_set: 0}
+        subsets: typing.List[typing.FrozenSet[int]] = [start_set]
+        terms = bytearray()
+
+        offsets: array = _index_array([0])
+        labels: array = _index_array()
+        targets: array = _index_array()
+
+        dead: int = _NO_STATE
+
+        # subsets doubles as the BFS queue
+        for subset in subsets:
+            terms.append(any(self._terms[state] for state in subset))
+
+            moves: typing.Dict[int, typing.Set[int]] = {}
+            for state in subset:
+                for code, dst in self._succ[state]:
+                    moves.setdefault(code, set()).update(self.closure(dst))
+
+            for code in range(letters_cnt) if self.full else sorted(moves):
+                dst_set: typing.Set[int] | None = moves.get(code)
+
+                if dst_set is None:
+                    if dead == _NO_STATE:
+                        dead = len(subsets)
+                        subsets.append(frozenset())
+                        subset_ids[subsets[dead]] = dead
+                    dst_id: int = dead
+                else:
+                    dst_key = frozenset(dst_set)
+                    dst_id = subset_ids.get(dst_key, _NO_STATE)
+                    if dst_id == _NO_STATE:
+                        dst_id = subset_ids[dst_key] = len(subsets)
+                        subsets.append(dst_key)
+
+                labels.append(code)
+                targets.append(dst_id)
+
+            offsets.append(len(labels))
+
+        return CompactAutomata(
+            self.aut.alphabet,
+            self._letters,
+            0,
+            terms,
+            offsets,
+            labels,
+            targets,
+        )
+
+
+def _dfa_table(aut: CompactAutomata) -> array:
+    """
+    A dense len(aut) x len(aut.symbols) transition table,
+    with _NO_STATE for missing transitions
+    """
+
+    width: int = len(aut.symbols)
+    table: array = _index_array([_NO_STATE]) * (len(aut) * width)
+
+    for src in range(len(aut)):
+        for sym, dst in aut.out(src):
+            table[src * width + sym] = dst
+
+    return table
+
+
+class CompactMinimizer(BaseCompactTransform):
+    """
+    Moore's partition refinement, same as AutomataMinimizer,
+    but over a flat transition table
+    """
+
+    def __init__(self, aut: CompactAutomata):
+        super().__init__(CompactDeterminizer(aut, full=True).apply())
+
+    def apply(self) -> CompactAutomata:
+        aut: CompactAutomata = self.aut
+        width: int = len(aut.symbols)
+        states_cnt: int = len(aut)
+        table: array = _dfa_table(aut)
+
+        classes: typing.List[int] = list(aut.terms)
+        classes_cnt: int = len(set(classes))
+
+        while True:
+            mapper: typing.Dict[typing.Tuple[int, ...], int] = {}
+            new_classes: typing.List[int] = []
+
+            for i in range(states_cnt):
+                row = table[i * width:(i + 1) * width]
+                signature = (classes[i], *(classes[dst] for dst in row))
+                new_classes.append(mapper.setdefault(signature, len(mapper)))
+
+            classes = new_classes
+            if len(mapper) == classes_cnt:
+                break
+            classes_cnt = len(mapper)
+
+        terms = bytearray(classes_cnt)
+        edges: typing.Dict[typing.Tuple[int, int], int] = {}
+        for i in range(states_cnt):
+            terms[classes[i]] = aut.terms[i]
+            for sym, dst in aut.out(i):
+                edges[classes[i], sym] = classes[dst]
+
+        return CompactAutomata.from_edges(
+            aut.alphabet,
+            aut.symbols,
+            classes[aut.start],
+            terms,
+            ((src, sym, dst) for (src, sym), dst in edges.items()),
+        )
+
+
+class CompactComparator:
+    _auts: typing.Tuple[CompactAutomata, CompactAutomata]
+
+
+    def __init__(self, aut1: CompactAutomata, aut2: CompactAutomata):
+        self._auts = (
+            CompactDeterminizer(aut1).apply(),
+            CompactDeterminizer(aut2).apply(),
+        )
+
+    def compare(self) -> bool:
+        aut1, aut2 = self._auts
+
+        letters: typing.List[str] = list(dict.fromkeys(aut1.symbols + aut2.symbols))
+        columns: typing.List[typing.Tuple[int, int]] = [
+            (self._symbol_idx(aut1, letter), self._symbol_idx(aut2, letter))
+            for letter in letters
+        ]
+        table1: array = _dfa_table(aut1)
+        table2: array = _dfa_table(aut2)
+        width1: int = len(aut1.symbols)
+        width2: int = len(aut2.symbols)
+
+        start = (aut1.start, aut2.start)
+        visited: typing.Set[typing.Tuple[int, int]] = {start}
+        queue: typing.Deque[typing.Tuple[int, int]] = deque([start])
+
+        while queue:
+            state1, state2 = queue.popleft()
+
+            term1: bool = state1 != _NO_STATE and aut1.is_term(state1)
+            term2: bool = state2 != _NO_STATE and aut2.is_term(state2)
+            if term1 != term2:
+                return False
+
+            for col1, col2 in columns:
+                dst = (
+                    table1[state1 * width1 + col1] if state1 != _NO_STATE and col1 != _NO_STATE else _NO_STATE,
+                    table2[state2 * width2 + col2] if state2 != _NO_STATE and col2 != _NO_STATE else _NO_STATE,
+                )
+
+                if dst not in visited:
+                    visited.add(dst)
+                    queue.append(dst)
+
+        return True
+
+    @staticmethod
+    def _symbol_idx(aut: CompactAutomata, letter: str) -> int:
+        try:
+            return aut.symbols.index(letter)
+        except ValueError:
+            return _NO_STATE
+
+
+def compact_automata(aut: Automata) -> CompactAutomata:
+    return CompactAutomata.from_automata(aut)
+
+
+def compact_trim(aut: CompactAutomata) -> CompactAutomata:
+    return CompactTrimmer(aut).apply()
+
+
+def compact_make_dfa(aut: CompactAutomata, full: bool = False) -> CompactAutomata:
+    return CompactDeterminizer(aut, full=full).apply()
+
+
+def compact_minimize(aut: CompactAutomata) -> CompactAutomata:
+    return CompactMinimizer(aut).apply()
+
+
+def compact_compare(aut1: CompactAutomata | Automata, aut2: CompactAutomata | Automata) -> bool:
+    if isinstance(aut1, Automata):
+        aut1 = compact_automata(aut1)
+    if isinstance(aut2, Automata):
+        aut2 = compact_automata(aut2)
+
+    return CompactComparator(aut1, aut2).compare()
+
+
+__all__ = [
+    "CompactAutomata", "compact_automata",
+    "compact_trim", "compact_make_dfa", "compact_minimize", "compact_compare",
+]
@@ -15,8 +15,8 @@ class AutomataComplement(MakeFullDFA):
         return result
 
 
-def complement(aut: Automata) -> Automata:
-    return AutomataComplement(aut).apply()
+def complement(aut: Automata, in_place: bool = False) -> Automata:
+    return AutomataComplement(aut, in_place=in_place).apply()
 
 
 __all__ = [
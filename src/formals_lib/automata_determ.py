@@ -1,10 +1,10 @@
 from __future__ import annotations
 import typing
-import dataclasses
 from collections import deque
 
 from .automata import *
 from .automata_ops import *
+from .automata_compact import CompactAutomata, compact_make_dfa
 
 
 class MakeEdges01(BaseAutomataTransform):
@@ -59,13 +59,6 @@ class MakeEdges1(MakeEdges01):
     
     @staticmethod
     def propagate_terms(aut: Automata) -> None:
-        reverse_edges: typing.Dict[Node, typing.List[Node]] = {}
-
-        for edge in aut.get_edges():
-            if len(edge) > 0:
-                continue
-            reverse_edges.setdefault(edge.dst, []).append(edge.src)
-        
         queue: typing.Deque[Node] = deque()
         queue.extend(aut.get_terms())
 
@@ -74,10 +67,10 @@ class MakeEdges1(MakeEdges01):
 
             node.is_term = True
 
-            for child in reverse_edges.get(node, []):
-                if child.is_term:
+            for edge in node.inc:
+                if len(edge) > 0 or edge.src.is_term:
                     continue
-                queue.append(child)
+                queue.append(edge.src)
         
         return aut
     
@@ -126,105 +119,226 @@ class UnifyTerm(BaseAutomataTransform):
 
 
 class MakeDeterministic(BaseAutomataTransform):
-    @dataclasses.dataclass
-    class _NodeInfo:
-        members: typing.Set[Node] = dataclasses.field(default_factory=set)
-        is_term: bool = False
-
-        def frozen_members(self) -> typing.FrozenSet[Node]:
-            return frozenset(self.members)
-    
+    """
+    The subset construction. The prepared automata's states are numbered,
+    so a subset is an int with a bit per state, and its successors by
+    every letter are ORed together from per-state masks. Each distinct
+    subset is interned to a dense id: subsets[i] is the mask of the result's
+    node number i, and i is its key, unless subset_keys is set, in which case
+    the keys are the frozensets of the prepared automata's keys, as in members()
+    """
+
+    subset_keys: bool
+    # Bit -> prepared automata's key, and back
+    _keys: typing.List[KeyType]
+    _bits: typing.Dict[KeyType, int]
+    # Bit -> letter -> the mask of its successors by it
+    _succ: typing.List[typing.Dict[str, int]]
+    _terms_mask: int
+    # Id -> subset mask, and back
+    subsets: typing.List[int]
+    _ids: typing.Dict[int, int]
+    _nodes: typing.List[Node]
+
+
+    def __init__(self, aut: Automata, in_place: bool = False, subset_keys: bool = False):
+        super().__init__(aut, in_place=in_place)
+
+        self.subset_keys = subset_keys
+        self.subsets = []
+        self._ids = {}
+        self._nodes = []
 
     def apply(self) -> Automata:
+        self.subsets.clear()
+        self._ids.clear()
+        self._nodes.clear()
+
         if self.aut.is_deterministic():
-            return self.aut.copy()  # TODO: Maybe not copy?
+            return self.raw_copy()
 
-        # We'll use that for our guideline, not the result
-        self.aut = make_edges_1(self.aut)
-        self.aut = aut_trim(self.aut)
+        self.prepare()
 
         result = Automata(self.aut.alphabet)
-
-        result.change_key(result.start, frozenset([self.aut.start.key]))
-        result.start.is_term = self.aut.start.is_term
+        self._add_subset(result, self._bits[self.aut.start.key], result.start)
 
         return self.bfs(result)
     
+    def prepare(self) -> None:
+        """
+        Turns self.aut into an epsilon-free automata with single-letter edges,
+        and numbers its states.
+        We'll use that for our guideline, not the result
+        """
+
+        # Epsilon-free automatas with single-letter edges (such as the ones
+        # from regex_to_glushkov) already fit, so only trimming is left
+        if all(edge.is_letter() for edge in self.aut.get_edges()):
+            self.aut = aut_trim(self.aut, in_place=self.in_place)
+        else:
+            self.aut = make_edges_1(self.aut, in_place=self.in_place)
+            self.aut = aut_trim(self.aut, in_place=True)
+
+        # The start goes first, so that its subset is 1
+        nodes: typing.List[Node] = [self.aut.start]
+        nodes.extend(node for node in self.aut.get_nodes() if node is not self.aut.start)
+
+        self._keys = [node.key for node in nodes]
+        self._bits = {key: 1 << i for i, key in enumerate(self._keys)}
+        self._succ = []
+        self._terms_mask = 0
+
+        for i, node in enumerate(nodes):
+            masks: typing.Dict[str, int] = {}
+            for edge in node.out:
+                masks[edge.label] = masks.get(edge.label, 0) | self._bits[edge.dst.key]
+            self._succ.append(masks)
+
+            if node.is_term:
+                self._terms_mask |= 1 << i
+    
     def bfs(self, result: Automata) -> Automata:
-        queue: typing.Deque[Node] = deque()
-        queue.append(result.start)
+        queue: typing.Deque[int] = deque()
+        queue.append(0)
 
         while queue:
-            node: Node = queue.popleft()
+            src_id: int = queue.popleft()
+            src: Node = self._nodes[src_id]
+
+            for label, dst_mask in self.step(self.subsets[src_id]).items():
+                dst_id: int | None = self._ids.get(dst_mask)
+
+                if dst_id is None:
+                    dst_id = len(self.subsets)
+                    self._add_subset(result, dst_mask)
+                    queue.append(dst_id)
+
+                result.link(src, self._nodes[dst_id], label)
+
+        return result
 
-            edges = self.gather_edges(node)
+    def _add_subset(self, result: Automata, mask: int, node: Node | None = None) -> Node:
+        """
+        Interns mask under the next id, with node (or a new one) standing for it
+        """
 
-            for label, dst_info in edges.items():
-                label: str
-                dst_info: self._NodeInfo
+        key: KeyType = self.mask_members(mask) if self.subset_keys else len(self.subsets)
+        is_term: bool = self.is_term_mask(mask)
 
-                dst_key = dst_info.frozen_members()
+        if node is None:
+            node = result.make_node(key=key, term=is_term)
+        else:
+            if node.key != key:
+                result.change_key(node, key)
+            node.is_term = is_term
 
-                dst: Node
+        self._ids[mask] = len(self.subsets)
+        self.subsets.append(mask)
+        self._nodes.append(node)
 
-                if dst_key not in result:
-                    dst = result.make_node(key=dst_key, term=dst_info.is_term)
-                    queue.append(dst)
-                else:
-                    dst = result.node(dst_key)
-                
-                result.link(node, dst, label)
+        return node
+
+    def step(self, mask: int) -> typing.Dict[str, int]:
+        """
+        The successors of a subset of (prepared) self.aut's states, by label
+        """
+
+        result: typing.Dict[str, int] = {}
+        succ: typing.List[typing.Dict[str, int]] = self._succ
+
+        while mask:
+            low: int = mask & -mask
+            for label, dst_mask in succ[low.bit_length() - 1].items():
+                result[label] = result.get(label, 0) | dst_mask
+            mask ^= low
 
         return result
-    
-    def gather_edges(self, node: Node) -> typing.Dict[str, _NodeInfo]:
-        result: typing.Dict[str, self._NodeInfo] = {}
 
-        for subkey in node.key:
-            for edge in self.aut[subkey].out:
-                cur_node_info: self._NodeInfo = result.setdefault(edge.label, self._NodeInfo())
-                cur_node_info.members.add(edge.dst.key)
-                cur_node_info.is_term = cur_node_info.is_term or edge.dst.is_term
+    def step_letter(self, mask: int, letter: str) -> int:
+        result: int = 0
+        succ: typing.List[typing.Dict[str, int]] = self._succ
+
+        while mask:
+            low: int = mask & -mask
+            result |= succ[low.bit_length() - 1].get(letter, 0)
+            mask ^= low
 
         return result
 
+    def is_term_mask(self, mask: int) -> bool:
+        return mask & self._terms_mask != 0
+
+    def keys_mask(self, keys: typing.Iterable[KeyType]) -> int:
+        result: int = 0
+        for key in keys:
+            result |= self._bits[key]
+        return result
+
+    def mask_members(self, mask: int) -> typing.FrozenSet[KeyType]:
+        """
+        The (prepared) self.aut's keys in a subset
+        """
+
+        result: typing.List[KeyType] = []
+
+        while mask:
+            low: int = mask & -mask
+            result.append(self._keys[low.bit_length() - 1])
+            mask ^= low
+
+        return frozenset(result)
+
+    def members(self, key: KeyType) -> typing.FrozenSet[KeyType]:
+        """
+        The (prepared) self.aut's keys in the subset a node
+        of the last apply() result stands for. There are none if aut
+        was deterministic to begin with, since it's just copied then
+        """
+
+        if self.subset_keys:
+            return key
+        return self.mask_members(self.subsets[key])
+
 
 class MakeFullDFA(MakeDeterministic):
     def apply(self) -> Automata:
         result: Automata = super().apply()
 
-        end: Node = result.make_node()
+        # The empty subset, unless aut was deterministic to begin with
+        end: Node = self._add_subset(result, 0) if self._nodes else result.make_node()
 
         for node in result.get_nodes():
-            missing_alphabet: typing.Set[str] = set(result.alphabet)
-
-            for edge in node.out:
-                missing_alphabet.discard(edge.label)
-            
-            for letter in missing_alphabet:
-                result.link(node, end, letter)
+            for letter in result.alphabet:
+                if node.step(letter, or_none=True) is None:
+                    result.link(node, end, letter)
         
-        return aut_trim(result)
+        return aut_trim(result, in_place=True)
 
 
-def make_edges_01(aut: Automata) -> Automata:
-    return MakeEdges01(aut).apply()
+def make_edges_01(aut: Automata, in_place: bool = False) -> Automata:
+    return MakeEdges01(aut, in_place=in_place).apply()
 
 
-def make_edges_1(aut: Automata) -> Automata:
-    return MakeEdges1(aut).apply()
+def make_edges_1(aut: Automata, in_place: bool = False) -> Automata:
+    return MakeEdges1(aut, in_place=in_place).apply()
 
 
-def unify_term(aut: Automata) -> Automata:
-    return UnifyTerm(aut).apply()
+def unify_term(aut: Automata, in_place: bool = False) -> Automata:
+    return UnifyTerm(aut, in_place=in_place).apply()
 
 
-def make_dfa(aut: Automata) -> Automata:
-    return MakeDeterministic(aut).apply()
+def make_dfa(aut: Automata | CompactAutomata, in_place: bool = False,
+             subset_keys: bool = False) -> Automata | CompactAutomata:
+    if isinstance(aut, CompactAutomata):
+        return compact_make_dfa(aut)
+    return MakeDeterministic(aut, in_place=in_place, subset_keys=subset_keys).apply()
 
 
-def make_full_dfa(aut: Automata) -> Automata:
-    return MakeFullDFA(aut).apply()
+def make_full_dfa(aut: Automata | CompactAutomata, in_place: bool = False,
+                  subset_keys: bool = False) -> Automata | CompactAutomata:
+    if isinstance(aut, CompactAutomata):
+        return compact_make_dfa(aut, full=True)
+    return MakeFullDFA(aut, in_place=in_place, subset_keys=subset_keys).apply()
 
 
 __all__ = [
@@ -0,0 +1,160 @@
+from __future__ import annotations
+import typing
+import dataclasses
+import enum
+from collections import OrderedDict
+
+from .automata import *
+from .automata_determ import MakeDeterministic
+
+
+# A MakeDeterministic subset mask
+SubsetKey = int
+
+
+class EvictionPolicy(enum.Enum):
+    lru = enum.auto()
+    clear = enum.auto()
+
+
+@dataclasses.dataclass
+class LazyDFAStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    # Letters read through uncached NFA simulation, after the cache started thrashing
+    fallback_steps: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total: int = self.hits + self.misses
+        return self.hits / total if total else 0.
+
+
+@dataclasses.dataclass
+class _CachedState:
+    is_term: bool
+    # Letter -> destination subset. Keys rather than entries,
+    # so that evicting a state never leaves dangling references
+    trans: typing.Dict[str, SubsetKey]
+
+
+class LazyDFAMatcher:
+    """
+    A DFA built on the fly: subset states are computed with
+    MakeDeterministic.step only once the input reaches them,
+    and kept in a bounded cache. Once a word keeps missing and evicting,
+    its remaining letters are matched through plain NFA simulation instead
+    """
+
+    _determ: MakeDeterministic
+    _start: SubsetKey
+    _cache: typing.OrderedDict[SubsetKey, _CachedState]
+    max_states: int
+    policy: EvictionPolicy
+    thrash_ratio: float
+    stats: LazyDFAStats
+
+
+    def __init__(self, aut: Automata, max_states: int = 1024,
+                 policy: EvictionPolicy = EvictionPolicy.lru,
+                 thrash_ratio: float = 0.5):
+        """
+        thrash_ratio is the share of evicting misses among a word's letters
+        (checked once it's read max_states letters) beyond which
+        the matcher falls back to NFA simulation for the rest of the word
+        """
+
+        assert max_states > 0
+
+        self._determ = MakeDeterministic(aut)
+        self._determ.prepare()
+        self._start = self._determ.keys_mask([self._determ.aut.start.key])
+        self._cache = OrderedDict()
+        self.max_states = max_states
+        self.policy = policy
+        self.thrash_ratio = thrash_ratio
+        self.stats = LazyDFAStats()
+
+    @property
+    def alphabet(self) -> str:
+        return self._determ.aut.alphabet
+
+    def cached_states_cnt(self) -> int:
+        return len(self._cache)
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    def _lookup(self, subset: SubsetKey) -> typing.Tuple[_CachedState, bool]:
+        """
+        Returns the cache entry for subset, and whether something was evicted for it
+        """
+
+        state: _CachedState | None = self._cache.get(subset)
+
+        if state is not None:
+            self.stats.hits += 1
+            if self.policy == EvictionPolicy.lru:
+                self._cache.move_to_end(subset)
+            return state, False
+
+        self.stats.misses += 1
+
+        state = _CachedState(
+            is_term=self._determ.is_term_mask(subset),
+            trans=self._determ.step(subset),
+        )
+
+        evicted: bool = len(self._cache) >= self.max_states
+        if evicted:
+            if self.policy == EvictionPolicy.lru:
+                self._cache.popitem(last=False)
+                self.stats.evictions += 1
+            else:
+                self.stats.evictions += len(self._cache)
+                self._cache.clear()
+
+        self._cache[subset] = state
+        return state, evicted
+
+    def _simulate(self, subset: SubsetKey, word: str) -> bool:
+        for letter in word:
+            if not subset:
+                break
+
+            self.stats.fallback_steps += 1
+            subset = self._determ.step_letter(subset, letter)
+
+        return self._determ.is_term_mask(subset)
+
+    def accepts(self, word: str) -> bool:
+        subset: SubsetKey = self._start
+        state, _ = self._lookup(subset)
+        evicting_misses: int = 0
+
+        for i, letter in enumerate(word):
+            subset = state.trans.get(letter)
+            if subset is None:
+                return False
+
+            state, evicted = self._lookup(subset)
+            evicting_misses += evicted
+
+            if i >= self.max_states and evicting_misses > self.thrash_ratio * i:
+                return self._simulate(subset, word[i + 1:])
+
+        return state.is_term
+
+    def accepts_many(self, words: typing.Iterable[str]) -> typing.List[bool]:
+        return [self.accepts(word) for word in words]
+
+
+def compile_lazy_dfa(aut: Automata, max_states: int = 1024,
+                     policy: EvictionPolicy = EvictionPolicy.lru) -> LazyDFAMatcher:
+    return LazyDFAMatcher(aut, max_states=max_states, policy=policy)
+
+
+__all__ = [
+    "EvictionPolicy", "LazyDFAStats", "LazyDFAMatcher", "compile_lazy_dfa",
+]
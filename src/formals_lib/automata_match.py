@@ -0,0 +1,140 @@
+from __future__ import annotations
+import typing
+import dataclasses
+
+from .automata import *
+from .automata_minimize import minimize
+
+
+class TableMatcher:
+    """
+    An immutable DFA in a flat transition table, indexed by
+    state * width + column, so walking it is a tight per-character loop.
+    Every state carries a label: the states with falsy labels that
+    only lead to themselves are dead, and the first of them is the sink.
+    Letters outside the alphabet lead to the sink, which always exists.
+    Instances hold no mutable state and are safe to share between threads
+    """
+
+    __slots__ = ("alphabet", "start", "sink", "_columns", "_width", "_table", "_labels")
+
+    alphabet: str
+    start: int
+    sink: int
+    _columns: typing.Mapping[str, int]
+    _width: int
+    _table: typing.Tuple[int, ...]
+    _labels: typing.Tuple[typing.Any, ...]
+
+
+    def __init__(self, dfa: Automata, label: typing.Callable[[Node], typing.Any], empty: typing.Any):
+        """
+        dfa must be full and deterministic. empty is the sink's label,
+        in case there is no dead state and we have to make one up
+        """
+
+        nodes: typing.List[Node] = [dfa.start]
+        nodes.extend(node for node in dfa.get_nodes() if node is not dfa.start)
+        node_idx: typing.Dict[Node, int] = {node: i for i, node in enumerate(nodes)}
+
+        letters: str = "".join(dict.fromkeys(dfa.alphabet))
+        width: int = len(letters)
+
+        labels: typing.List[typing.Any] = [label(node) for node in nodes]
+
+        # A minimal full DFA is either all live or has exactly one dead state
+        sink: int = next(
+            (
+                i for i, node in enumerate(nodes)
+                if not labels[i] and all(node.step(letter) is node for letter in letters)
+            ),
+            len(nodes)
+        )
+
+        table: typing.List[int] = [sink] * (width * max(len(nodes), sink + 1))
+        for src_i, src in enumerate(nodes):
+            for col, letter in enumerate(letters):
+                table[src_i * width + col] = node_idx[src.step(letter)]
+
+        if sink == len(nodes):
+            labels.append(empty)
+
+        self._init("alphabet", letters)
+        self._init("start", 0)
+        self._init("sink", sink)
+        self._init("_columns", {letter: col for col, letter in enumerate(letters)})
+        self._init("_width", width)
+        self._init("_table", tuple(table))
+        self._init("_labels", tuple(labels))
+
+    def _init(self, name: str, value: typing.Any) -> None:
+        object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        raise dataclasses.FrozenInstanceError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self, name: str) -> None:
+        raise dataclasses.FrozenInstanceError(f"cannot delete field {name!r}")
+
+    def prefix_state(self, word: str, state: int | None = None) -> int:
+        """
+        The state reached after reading word, starting from state
+        (the start state by default). Can be used to resume matching later
+        """
+
+        if state is None:
+            state = self.start
+
+        table = self._table
+        columns = self._columns
+        width: int = self._width
+        sink: int = self.sink
+
+        for ch in word:
+            col: int | None = columns.get(ch)
+            if col is None:
+                return sink
+            state = table[state * width + col]
+            if state == sink:
+                return sink
+
+        return state
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+
+class DFAMatcher(TableMatcher):
+    """
+    A TableMatcher over the minimal full DFA of an automata,
+    labelled by whether the states are terminal
+    """
+
+    __slots__ = ()
+
+
+    def __init__(self, aut: Automata, minimal: bool = False):
+        """
+        With minimal set, aut is taken to be a minimal full DFA
+        already, and isn't minimized again
+        """
+
+        super().__init__(aut if minimal else minimize(aut), lambda node: node.is_term, False)
+
+    def is_accepting(self, state: int) -> bool:
+        return self._labels[state]
+
+    def accepts(self, word: str, state: int | None = None) -> bool:
+        return self._labels[self.prefix_state(word, state)]
+
+    def accepts_many(self, words: typing.Iterable[str]) -> typing.List[bool]:
+        return [self.accepts(word) for word in words]
+
+
+def compile_automata(aut: Automata) -> DFAMatcher:
+    return DFAMatcher(aut)
+
+
+__all__ = [
+    "TableMatcher", "DFAMatcher", "compile_automata",
+]
@@ -6,6 +6,7 @@ from collections import UserDict, deque
 from .automata import *
 from .automata_ops import *
 from .automata_determ import *
+from .automata_compact import CompactAutomata, compact_minimize
 
 
 class _ClassMapper(UserDict):
@@ -35,16 +36,16 @@ class AutomataMinimizer(BaseAutomataTransform):
     _node_idx_lookup: typing.Final[typing.Mapping[Node, int]]
     _transitions: typing.Final[typing.Mapping[typing.Tuple[int, str], int]]
     
-    def __init__(self, aut: Automata):
-        super().__init__(make_full_dfa(aut))
+    def __init__(self, aut: Automata, in_place: bool = False):
+        super().__init__(make_full_dfa(aut, in_place=in_place), in_place=True)
         del aut  # To avoid using it accidentally
         
+        self._aut_nodes = list(self.aut.get_nodes())
         self._class_table = [
-            [int(node.is_term) for node in self.aut.get_nodes()],
+            self._initial_classes(),
             [None] * len(self.aut)
         ]
         self._step_idx = 0
-        self._aut_nodes = list(self.aut.get_nodes())
         self._node_idx_lookup = {
             node: i for i, node in enumerate(self._aut_nodes)
         }
@@ -57,19 +58,26 @@ class AutomataMinimizer(BaseAutomataTransform):
         return self.make_automata()
             
 
+    def initial_class(self, node: Node) -> typing.Hashable:
+        """
+        The nodes are first split by this. Override to keep apart
+        terminal nodes that accept in different ways
+        """
+        
+        return node.is_term
+    
+    def _initial_classes(self) -> typing.List[int]:
+        mapper = _ClassMapper()
+        return [mapper[self.initial_class(node)] for node in self._aut_nodes]
+    
     def _bake_transitions(self) -> typing.Mapping[typing.Tuple[int, str], int]:
         transitions: typing.Dict[typing.Tuple[int, str], int] = {}
         
         for src_i, src in enumerate(self._aut_nodes):
-            for edge in src.out:
-                state = (src_i, edge.label)
-                assert len(edge.label) == 1
-                assert state not in transitions, "Duplicate edge!"
-                
-                dst = edge.dst
-                dst_i = self.node_idx(dst)
-                
-                transitions[state] = dst_i
+            assert src.is_deterministic(), "Duplicate edge!"
+            
+            for letter in self.aut.alphabet:
+                transitions[src_i, letter] = self.node_idx(src.step(letter))
         
         return transitions
     
@@ -142,8 +150,10 @@ class AutomataMinimizer(BaseAutomataTransform):
         return result
 
 
-def minimize(aut: Automata) -> Automata:
-    return AutomataMinimizer(aut).apply()
+def minimize(aut: Automata | CompactAutomata, in_place: bool = False) -> Automata | CompactAutomata:
+    if isinstance(aut, CompactAutomata):
+        return compact_minimize(aut)
+    return AutomataMinimizer(aut, in_place=in_place).apply()
 
 
 __all__ = [
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import typing
+from collections import deque
+
+from .automata import *
+from .automata_determ import MakeFullDFA
+from .automata_minimize import AutomataMinimizer
+from .automata_match import TableMatcher
+from .regex import Regex
+from .regex_automata import regex_to_automata
+
+
+PatternIds = typing.FrozenSet[int]
+
+PatternType = typing.Union[Regex, str, Automata]
+
+
+_NO_PATTERNS: PatternIds = frozenset()
+
+
+class _TaggedMinimizer(AutomataMinimizer):
+    """
+    Minimizes the determinized union, keeping apart the states
+    that accept different sets of patterns
+    """
+
+    # Result key -> the patterns accepted in its subset
+    _node_tags: typing.Dict[KeyType, PatternIds]
+
+
+    def __init__(self, union: Automata, tags: typing.Mapping[KeyType, PatternIds]):
+        determ = MakeFullDFA(union, in_place=True)
+        dfa: Automata = determ.apply()
+
+        # The tags are needed by initial_class, which the base constructor calls.
+        # Without patterns, the union is deterministic and just copied
+        self._node_tags = {node.key: _NO_PATTERNS for node in dfa.get_nodes()}
+        if determ.subsets:
+            self._tag_subsets(determ, dfa, tags)
+
+        super().__init__(dfa, in_place=True)
+
+    def _tag_subsets(self, determ: MakeFullDFA, dfa: Automata, tags: typing.Mapping[KeyType, PatternIds]) -> None:
+        # A mask per pattern, of the prepared union's states it terminates in
+        pattern_masks: typing.Dict[int, int] = {}
+        for node in determ.aut.get_nodes():
+            mask: int = determ.keys_mask([node.key])
+            for i in tags.get(node.key, _NO_PATTERNS):
+                pattern_masks[i] = pattern_masks.get(i, 0) | mask
+
+        interned: typing.Dict[PatternIds, PatternIds] = {}
+        for node in dfa.get_nodes():
+            subset: int = determ.subsets[node.key]
+            result: PatternIds = frozenset(i for i, mask in pattern_masks.items() if subset & mask)
+            self._node_tags[node.key] = interned.setdefault(result, result)
+
+    def initial_class(self, node: Node) -> typing.Hashable:
+        return self._node_tags[node.key]
+
+    def class_tags(self) -> typing.Dict[int, PatternIds]:
+        """
+        The patterns accepted in each class of the last make_automata() result
+        """
+
+        return {
+            class_i: self._node_tags[node.key]
+            for node, class_i in zip(self._aut_nodes, self.cur_table)
+        }
+
+
+class MultiPatternMatcher(TableMatcher):
+    """
+    Matches words against many patterns at once.
+
+    The patterns' automata are joined under a common start, with every
+    epsilon-closure remembering which patterns it accepts. Determinization
+    and minimization then carry these sets along, so a single pass over
+    the word with the resulting DFA yields the ids of all matching patterns.
+    A pattern's id is its index in the input.
+    The states are labelled by these sets (see TableMatcher)
+    """
+
+    __slots__ = ("patterns_cnt",)
+
+    patterns_cnt: int
+
+
+    def __init__(self, patterns: typing.Iterable[PatternType]):
+        auts: typing.List[Automata] = [
+            pattern if isinstance(pattern, Automata) else regex_to_automata(pattern)
+            for pattern in patterns
+        ]
+
+        union, tags = self._tagged_union(auts)
+
+        minimizer = _TaggedMinimizer(union, tags)
+        dfa: Automata = minimizer.apply()
+        class_tags: typing.Dict[int, PatternIds] = minimizer.class_tags()
+
+        super().__init__(dfa, lambda node: class_tags[node.key], _NO_PATTERNS)
+        self._init("patterns_cnt", len(auts))
+
+    @staticmethod
+    def _tagged_union(auts: typing.Sequence[Automata]) -> typing.Tuple[Automata, typing.Dict[KeyType, PatternIds]]:
+        """
+        Joins auts like AutomataJoin does, but keeps the terminal nodes
+        of every automata. The keys are (aut.id, node.key), as in raw_merge.
+        Also returns, for each key, the ids of the patterns terminating
+        in its epsilon-closure
+        """
+
+        result = Automata("".join(dict.fromkeys("".join(aut.alphabet for aut in auts))))
+
+        for i, aut in enumerate(auts):
+            result.add_from(aut, lambda key, i=i: (i, key))
+            result.link(result.start, (i, aut.start.key), "")
+
+        tags: typing.Dict[KeyType, typing.Set[int]] = {}
+
+        for i, aut in enumerate(auts):
+            queue: typing.Deque[Node] = deque(result.node((i, node.key)) for node in aut.get_terms())
+            seen: typing.Set[Node] = set(queue)
+
+            while queue:
+                node: Node = queue.popleft()
+                tags.setdefault(node.key, set()).add(i)
+
+                for edge in node.inc:
+                    if len(edge) > 0 or edge.src in seen:
+                        continue
+                    seen.add(edge.src)
+                    queue.append(edge.src)
+
+        return result, {key: frozenset(ids) for key, ids in tags.items()}
+
+    def matching(self, state: int) -> PatternIds:
+        return self._labels[state]
+
+    def match(self, word: str) -> PatternIds:
+        """
+        The ids of all patterns accepting word
+        """
+
+        return self._labels[self.prefix_state(word)]
+
+    def match_many(self, words: typing.Iterable[str]) -> typing.List[PatternIds]:
+        return [self.match(word) for word in words]
+
+
+def compile_patterns(patterns: typing.Iterable[PatternType]) -> MultiPatternMatcher:
+    return MultiPatternMatcher(patterns)
+
+
+__all__ = [
+    "MultiPatternMatcher", "compile_patterns",
+]
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import typing
+
+from .automata import *
+
+
+StateSet = typing.FrozenSet[int]
+
+
+class NFAMatcher:
+    """
+    Matches words by simulating the automata directly, without determinization.
+
+    Every multi-letter edge is split into a chain of internal states.
+    Matching keeps a frontier of current states: each letter moves it along
+    the letter edges, and then takes the epsilon closure of the result.
+    A state is only entered once per step, which is tracked by stamping it
+    with the step's generation, so a step costs O(|Q| + |E|)
+    and a word O(|w| * (|Q| + |E|)), however large the equivalent DFA would be.
+
+    The stamps make a matcher unsafe to share between threads
+    """
+
+    alphabet: str
+    _start: StateSet
+    _terms: typing.FrozenSet[int]
+    # _trans[state][letter] are the letter-successors of state, before the closure
+    _trans: typing.List[typing.Dict[str, typing.List[int]]]
+    _eps: typing.List[typing.List[int]]
+    # _visited[state] is the last generation that entered state
+    _visited: typing.List[int]
+    _generation: int
+    _states_cnt: int
+
+
+    def __init__(self, aut: Automata):
+        self.alphabet = aut.alphabet
+
+        node_idx: typing.Dict[Node, int] = {node: i for i, node in enumerate(aut.get_nodes())}
+        self._trans = [{} for _ in node_idx]
+        self._eps = [[] for _ in node_idx]
+
+        def new_state() -> int:
+            self._trans.append({})
+            self._eps.append([])
+            return len(self._trans) - 1
+
+        for edge in aut.get_edges():
+            src: int = node_idx[edge.src]
+            dst: int = node_idx[edge.dst]
+
+            if not edge.label:
+                self._eps[src].append(dst)
+                continue
+
+            for letter in edge.label[:-1]:
+                cur: int = new_state()
+                self._trans[src].setdefault(letter, []).append(cur)
+                src = cur
+            self._trans[src].setdefault(edge.label[-1], []).append(dst)
+
+        self._states_cnt = len(self._trans)
+        self._visited = [0] * self._states_cnt
+        self._generation = 0
+
+        self._start = frozenset(self._close([node_idx[aut.start]]))
+        self._terms = frozenset(node_idx[node] for node in aut.get_terms())
+
+    def _close(self, states: typing.Iterable[int]) -> typing.List[int]:
+        """
+        The epsilon closure of states, each listed once
+        """
+
+        self._generation += 1
+        generation: int = self._generation
+        visited: typing.List[int] = self._visited
+        eps: typing.List[typing.List[int]] = self._eps
+
+        result: typing.List[int] = []
+        for state in states:
+            if visited[state] != generation:
+                visited[state] = generation
+                result.append(state)
+
+        # result doubles as the stack: everything past i is yet to be expanded
+        i: int = 0
+        while i < len(result):
+            for dst in eps[result[i]]:
+                if visited[dst] != generation:
+                    visited[dst] = generation
+                    result.append(dst)
+            i += 1
+
+        return result
+
+    def _advance(self, states: typing.Iterable[int], letter: str) -> typing.List[int]:
+        trans = self._trans
+
+        return self._close(
+            dst
+            for state in states
+            for dst in trans[state].get(letter, ())
+        )
+
+    def initial_states(self) -> StateSet:
+        return self._start
+
+    def step(self, states: typing.AbstractSet[int], letter: str) -> StateSet:
+        return frozenset(self._advance(states, letter))
+
+    def prefix_states(self, word: str, states: typing.AbstractSet[int] | None = None) -> StateSet:
+        """
+        The frontier after reading word, starting from states
+        (the initial frontier by default). An empty result means rejection
+        """
+
+        if states is None:
+            states = self._start
+
+        frontier: typing.Iterable[int] = states
+
+        for letter in word:
+            frontier = self._advance(frontier, letter)
+            if not frontier:
+                break
+
+        return frozenset(frontier)
+
+    def is_accepting(self, states: typing.AbstractSet[int]) -> bool:
+        return not self._terms.isdisjoint(states)
+
+    def accepts(self, word: str) -> bool:
+        return self.is_accepting(self.prefix_states(word))
+
+    def accepts_many(self, words: typing.Iterable[str]) -> typing.List[bool]:
+        return [self.accepts(word) for word in words]
+
+    def __len__(self) -> int:
+        return self._states_cnt
+
+
+def compile_nfa(aut: Automata) -> NFAMatcher:
+    return NFAMatcher(aut)
+
+
+__all__ = [
+    "NFAMatcher", "compile_nfa",
+]
@@ -2,6 +2,7 @@ from __future__ import annotations
 import typing
 
 from .automata import *
+from .automata_compact import CompactAutomata, compact_trim
 
 
 class BaseAutomataBinOp:
@@ -34,15 +35,7 @@ class BaseAutomataBinOp:
         result = Automata(self.common_alphabet())
         
         for i in range(2):
-            for node in self.auts[i].get_nodes():
-                result.make_node(key=(i, node.key))
-
-            for edge in self.auts[i].get_edges():
-                result.link(
-                    (i, edge.src.key),
-                    (i, edge.dst.key),
-                    edge.label
-                )
+            result.add_from(self.auts[i], lambda key, i=i: (i, key), terms=False)
         
         return result
     
@@ -86,19 +79,30 @@ class BaseAutomataBinOp:
 
 class BaseAutomataTransform:
     aut: Automata
+    in_place: bool
 
 
-    def __init__(self, aut: Automata):
+    def __init__(self, aut: Automata, in_place: bool = False):
+        """
+        With in_place set, aut is transformed directly instead of being copied.
+        This is meant for callers that own aut: it may end up modified
+        in an arbitrary way and shouldn't be used afterwards
+        """
+
         self.aut = aut
+        self.in_place = in_place
     
     def apply(self) -> Automata:
         raise NotImplementedError()
     
     def raw_copy(self) -> Automata:
         """
-        Just copies the automata
+        Just copies the automata, unless working in place
         """
 
+        if self.in_place:
+            return self.aut
+
         return self.aut.copy()
 
 
@@ -177,6 +181,27 @@ class AutomataPlusPow(BaseAutomataTransform):
         return result
 
 
+class AutomataReverse(BaseAutomataTransform):
+    def apply(self) -> Automata:
+        """
+        The keys are created as tuples of (0, node.key), the new start's key is 0
+        """
+
+        result = Automata(self.aut.alphabet)
+
+        mapping: typing.Dict[Node, Node] = {}
+        for node in self.aut.get_nodes():
+            mapping[node] = result.make_node(key=(0, node.key), term=(node is self.aut.start))
+        
+        for edge in self.aut.get_edges():
+            result.link(mapping[edge.dst], mapping[edge.src], edge.label[::-1])
+        
+        for node in self.aut.get_terms():
+            result.link(result.start, mapping[node], "")
+        
+        return result
+
+
 class AutomataTrimmer(BaseAutomataTransform):
     def apply(self) -> Automata:
         result: Automata = self.raw_copy()
@@ -206,16 +231,22 @@ def aut_intersect(aut1: Automata, aut2: Automata) -> Automata:
     return AutomataIntersect(aut1, aut2).apply()
 
 
-def aut_star(aut: Automata) -> Automata:
-    return AutomataStar(aut).apply()
+def aut_star(aut: Automata, in_place: bool = False) -> Automata:
+    return AutomataStar(aut, in_place=in_place).apply()
+
+
+def aut_pow_plus(aut: Automata, in_place: bool = False) -> Automata:
+    return AutomataPlusPow(aut, in_place=in_place).apply()
 
 
-def aut_pow_plus(aut: Automata) -> Automata:
-    return AutomataPlusPow(aut).apply()
+def aut_reverse(aut: Automata) -> Automata:
+    return AutomataReverse(aut).apply()
 
 
-def aut_trim(aut: Automata) -> Automata:
-    return AutomataTrimmer(aut).apply()
+def aut_trim(aut: Automata | CompactAutomata, in_place: bool = False) -> Automata | CompactAutomata:
+    if isinstance(aut, CompactAutomata):
+        return compact_trim(aut)
+    return AutomataTrimmer(aut, in_place=in_place).apply()
 
 
 # AutomataComplement and complement() are implemented in a separate file, since they rely on make_full_dfa()
@@ -223,5 +254,5 @@ def aut_trim(aut: Automata) -> Automata:
 
 __all__ = [
     "BaseAutomataBinOp", "BaseAutomataTransform",
-    "aut_concat", "aut_join", "aut_intersect", "aut_star", "aut_pow_plus", "aut_trim",
+    "aut_concat", "aut_join", "aut_intersect", "aut_star", "aut_pow_plus", "aut_reverse", "aut_trim",
 ]
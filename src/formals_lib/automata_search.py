@@ -0,0 +1,204 @@
+from __future__ import annotations
+import typing
+import mmap
+import pathlib
+
+from .automata import *
+from .automata_ops import aut_concat, aut_reverse
+from .automata_match import DFAMatcher
+from .regex import Regex
+from .regex_automata import regex_to_automata
+
+
+Span = typing.Tuple[int, int]
+
+BufferType = typing.Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+class _ByteDFA:
+    """
+    A DFA over raw bytes: trans[state << 8 | byte] is the next state
+    """
+
+    trans: typing.List[int]
+    terms: typing.Tuple[bool, ...]
+    start: int
+    sink: int
+
+
+    def __init__(self, aut: Automata, other: str | None = None):
+        """
+        Bytes are read as latin-1 letters. Those outside aut's alphabet
+        lead to the sink, or are read as other, if it's specified
+        """
+
+        matcher: DFAMatcher = DFAMatcher(aut)
+        letters: typing.Set[str] = set(matcher.alphabet)
+
+        byte_letters: typing.List[str] = [
+            chr(byte) if chr(byte) in letters or other is None else other
+            for byte in range(256)
+        ]
+
+        self.trans = [
+            matcher.prefix_state(letter, state)
+            for state in range(len(matcher))
+            for letter in byte_letters
+        ]
+        self.terms = tuple(matcher.is_accepting(state) for state in range(len(matcher)))
+        self.start = matcher.start
+        self.sink = matcher.sink
+
+
+class AutomataSearcher:
+    """
+    Finds all leftmost-longest occurrences of a language in a byte buffer.
+
+    Three DFAs are used:
+    - the prefix DFA for Sigma*L finds the earliest end of any match;
+    - the reverse DFA for L^R, read backwards from that end, finds
+      the leftmost start of the matches ending there;
+    - the anchored DFA for L then runs from every candidate start up to that,
+      keeping only the earliest start per state, to find the actual
+      leftmost-longest match.
+    Memory use is bounded by the DFA sizes and the buffer is never copied.
+    Letters are matched against bytes as latin-1
+    """
+
+    _prefix: _ByteDFA
+    _reverse: _ByteDFA
+    _anchored: _ByteDFA
+
+
+    def __init__(self, pattern: Regex | str | Automata):
+        aut: Automata = pattern if isinstance(pattern, Automata) else regex_to_automata(pattern)
+
+        if any(ord(letter) > 0xff for letter in aut.alphabet):
+            raise ValueError("Only single-byte (latin-1) letters can be searched for")
+
+        # Any non-latin-1 letter is fine for the bytes outside the alphabet
+        other: str = chr(0x100)
+        sigma_star = Automata(aut.alphabet + other)
+        sigma_star.start.is_term = True
+        for letter in sigma_star.alphabet:
+            sigma_star.link(sigma_star.start, sigma_star.start, letter)
+
+        self._prefix = _ByteDFA(aut_concat(sigma_star, aut), other=other)
+        self._reverse = _ByteDFA(aut_reverse(aut))
+        self._anchored = _ByteDFA(aut)
+
+    def finditer(self, buffer: BufferType, start: int = 0, end: int | None = None) -> typing.Generator[Span, None, None]:
+        """
+        Lazily yields the (start, end) spans of non-overlapping
+        leftmost-longest matches. After an empty match,
+        the search resumes one byte further
+        """
+
+        view = memoryview(buffer).cast("B")
+        if end is None:
+            end = len(view)
+
+        pos: int = start
+        while pos <= end:
+            match_end: int = self._first_end(view, pos, end)
+            if match_end < 0:
+                return
+
+            last_start: int = self._leftmost_start(view, pos, match_end)
+            span: Span = self._leftmost_longest(view, pos, last_start, end)
+            yield span
+
+            pos = span[1] if span[1] > span[0] else span[1] + 1
+
+    def search(self, buffer: BufferType, start: int = 0, end: int | None = None) -> Span | None:
+        return next(self.finditer(buffer, start, end), None)
+
+    def finditer_file(self, path: pathlib.Path | str) -> typing.Generator[Span, None, None]:
+        """
+        Same as finditer, but over a memory-mapped file
+        """
+
+        with open(path, "rb") as f:
+            # mmap can't map empty files
+            if f.seek(0, 2) == 0:
+                yield from self.finditer(b"")
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield from self.finditer(buffer)
+
+    def _first_end(self, view: memoryview, pos: int, end: int) -> int:
+        trans, terms = self._prefix.trans, self._prefix.terms
+        state: int = self._prefix.start
+
+        for i in range(pos, end):
+            if terms[state]:
+                return i
+            state = trans[state << 8 | view[i]]
+
+        return end if terms[state] else -1
+
+    def _leftmost_start(self, view: memoryview, pos: int, match_end: int) -> int:
+        trans, terms, sink = self._reverse.trans, self._reverse.terms, self._reverse.sink
+        state: int = self._reverse.start
+        result: int = match_end if terms[state] else -1
+
+        for i in range(match_end - 1, pos - 1, -1):
+            state = trans[state << 8 | view[i]]
+            if state == sink:
+                break
+            if terms[state]:
+                result = i
+
+        assert result >= 0, "The prefix DFA reported a match, so there must be one"
+        return result
+
+    def _leftmost_longest(self, view: memoryview, pos: int, last_start: int, end: int) -> Span:
+        trans, terms, sink = self._anchored.trans, self._anchored.terms, self._anchored.sink
+        start_state: int = self._anchored.start
+
+        best: Span | None = None
+        # State -> the earliest start that reached it. A later start
+        # in the same state has the same future, so it can't win
+        threads: typing.Dict[int, int] = {}
+
+        i: int = pos
+        while True:
+            if best is None and i <= last_start and start_state not in threads:
+                threads[start_state] = i
+
+            for state, thread_start in threads.items():
+                if terms[state] and (best is None or thread_start <= best[0]):
+                    best = (thread_start, i)
+
+            if best is not None:
+                threads = {state: s for state, s in threads.items() if s <= best[0]}
+
+            if i >= end or (not threads and (best is not None or i >= last_start)):
+                break
+
+            byte: int = view[i]
+            next_threads: typing.Dict[int, int] = {}
+            for state, thread_start in threads.items():
+                state = trans[state << 8 | byte]
+                if state != sink and next_threads.get(state, end + 1) > thread_start:
+                    next_threads[state] = thread_start
+
+            threads = next_threads
+            i += 1
+
+        assert best is not None
+        return best
+
+
+def find_all(pattern: Regex | str | Automata, buffer: BufferType) -> typing.Generator[Span, None, None]:
+    return AutomataSearcher(pattern).finditer(buffer)
+
+
+def find_all_in_file(pattern: Regex | str | Automata, path: pathlib.Path | str) -> typing.Generator[Span, None, None]:
+    return AutomataSearcher(pattern).finditer_file(path)
+
+
+__all__ = [
+    "AutomataSearcher", "find_all", "find_all_in_file",
+]
@@ -8,16 +8,37 @@ T = typing.TypeVar("T", bound="ITree")
 
 
 class ITree(abc.ABC, typing.Generic[T]):
+    __slots__ = ()
+
     @abc.abstractmethod
     def get_children(self) -> typing.Iterable[T]:
         pass
 
 
 class TreeVisitor(typing.Generic[T]):
+    """
+    Dispatches nodes to the handlers registered for their types
+    (or their closest base). The handler for a node type is resolved once
+    per visitor class and cached.
+
+    By default, handlers are called as handler(node), and visit their
+    children themselves. In the post_order mode, the tree is walked with
+    an explicit stack instead, so its depth doesn't matter: handlers are
+    called as handler(node, results), with the results of the children
+    already computed, and pre_visit(node) is called before a node's
+    children are. Override children() to skip some of them. With memoize on top of that, the results are also
+    reused for repeated (shared) subtrees within one visit() call,
+    which only makes sense for visitors without side effects.
+    Override memo_table() to keep (or seed) the results across calls
+    """
+
     warn_on_generic: typing.ClassVar[bool] = False
+    post_order: typing.ClassVar[bool] = False
+    memoize: typing.ClassVar[bool] = False
 
     _lookup: typing.ClassVar[typing.Mapping[typing.Type[T], typing.Callable[["TreeVisitor", T]]]]
-    
+    _dispatch: typing.ClassVar[typing.Dict[typing.Type[T], typing.Callable[["TreeVisitor", T]]]]
+
     @staticmethod
     def handler(node_type: typing.Type[T]):
         assert issubclass(node_type, ITree), "Handlers can only be specified for node types"
@@ -31,36 +52,112 @@ class TreeVisitor(typing.Generic[T]):
             method._visits_.add(node_type)
             return method
         return wrap
-    
+
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
-        
-        cls._lookup = {}
-        
+
+        # Handlers are inherited, but may be overridden
+        cls._lookup = dict(getattr(cls, "_lookup", {}))
+        cls._dispatch = {}
+
+        own: typing.Set[typing.Type[T]] = set()
+
         for member in cls.__dict__.values():
             if not hasattr(member, "_visits_"):
                 continue
             assert callable(member)
-            
+
             for node_type in member._visits_:
-                assert node_type not in cls._lookup, f"Duplicate handler for {node_type.__name__}"
+                assert node_type not in own, f"Duplicate handler for {node_type.__name__}"
+                own.add(node_type)
                 cls._lookup[node_type] = member
-    
+
     def __init__(self):
         pass
 
+    @classmethod
+    def _resolve(cls, node_type: typing.Type[T]) -> typing.Callable[["TreeVisitor", T]]:
+        result = cls._dispatch.get(node_type)
+        if result is not None:
+            return result
+
+        for base in node_type.__mro__:
+            if base in cls._lookup:
+                result = cls._lookup[base]
+                break
+        else:
+            if cls.warn_on_generic:
+                warnings.warn(f"Handler for {node_type.__qualname__} not specified, defaulting to iterating over children")
+                assert False, "Comment this out if you don't want to be THIS pedantic"
+
+            result = cls.generic_visit
+
+        cls._dispatch[node_type] = result
+        return result
+
     def visit(self, node: T) -> typing.Any:
-        for base in type(node).__mro__:
-            if base in self._lookup:
-                return self._lookup[base](self, node)
-        
-        if self.warn_on_generic:
-            warnings.warn(f"Handler for {type(node).__qualname__} not specified, defaulting to iterating over children")
-            assert False, "Comment this out if you don't want to be THIS pedantic"
-
-        return self.generic_visit(node)
-    
-    def generic_visit(self, node: T) -> None:
+        if self.post_order:
+            return self._visit_post_order(node)
+
+        return self._resolve(type(node))(self, node)
+
+    def _visit_post_order(self, root: T) -> typing.Any:
+        resolve = self._resolve
+        memo: typing.MutableMapping[T, typing.Any] | None = self.memo_table() if self.memoize else None
+
+        results: typing.List[typing.Any] = []
+        # (node, None) is yet to be expanded, (node, children) is ready to be handled
+        stack: typing.List[typing.Tuple[T, typing.Sequence[T] | None]] = [(root, None)]
+
+        while stack:
+            node, children = stack.pop()
+
+            if children is None:
+                if memo is not None and node in memo:
+                    results.append(memo[node])
+                    continue
+
+                children = tuple(self.children(node))
+                self.pre_visit(node)
+                stack.append((node, children))
+                stack.extend((child, None) for child in reversed(children))
+                continue
+
+            args: typing.List[typing.Any] = []
+            if children:
+                args = results[-len(children):]
+                del results[-len(children):]
+
+            result = resolve(type(node))(self, node, args)
+            if memo is not None:
+                memo[node] = result
+            results.append(result)
+
+        assert len(results) == 1
+        return results[0]
+
+    def memo_table(self) -> typing.MutableMapping[T, typing.Any]:
+        """
+        The results table for a single visit() call in the memoize mode
+        """
+
+        return {}
+
+    def children(self, node: T) -> typing.Iterable[T]:
+        """
+        The children of node to visit in the post_order mode,
+        whose results its handler gets
+        """
+
+        return node.get_children()
+
+    def pre_visit(self, node: T) -> None:
+        pass
+
+    def generic_visit(self, node: T, results: typing.Sequence[typing.Any] | None = None) -> None:
+        if self.post_order:
+            return
+
         for child in node.get_children():
             self.visit(child)
 
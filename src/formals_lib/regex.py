@@ -1,14 +1,68 @@
 from __future__ import annotations
 import typing
 import enum
-import contextlib
 import dataclasses
+import weakref
 
 from . import itree
 
 
-@dataclasses.dataclass(frozen=True)
 class Regex(itree.ITree["Regex"]):
+    """
+    Regexes are hash-consed: a node is built at most once per distinct
+    structure, so constructing a structurally equal regex returns the very
+    same object. Equality is thus identity, and the hash and the tree size
+    are computed once, at construction
+    """
+    
+    # Only the nodes alive elsewhere are kept in the tables
+    __slots__ = ("_hash", "_size", "__weakref__")
+    
+    _hash: int
+    _size: int
+    
+    _table: typing.ClassVar[weakref.WeakValueDictionary]
+    
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        
+        cls._table = weakref.WeakValueDictionary()
+    
+    @classmethod
+    def _intern(cls, key: typing.Hashable, children: typing.Tuple[Regex, ...], **fields: typing.Any) -> Regex:
+        result: Regex | None = cls._table.get(key)
+        if result is not None:
+            return result
+        
+        result = object.__new__(cls)
+        object.__setattr__(result, "_hash", hash((cls, key)))
+        object.__setattr__(result, "_size", 1 + sum(child._size for child in children))
+        for name, value in fields.items():
+            object.__setattr__(result, name, value)
+        
+        return cls._table.setdefault(key, result)
+    
+    @property
+    def size(self) -> int:
+        """
+        The number of nodes in the regex, as a tree
+        """
+        
+        return self._size
+    
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        raise dataclasses.FrozenInstanceError(f"cannot assign to field {name!r}")
+    
+    def __delattr__(self, name: str) -> None:
+        raise dataclasses.FrozenInstanceError(f"cannot delete field {name!r}")
+    
+    def __reduce__(self):
+        return type(self), tuple(self.get_children())
+    
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(map(repr, self.get_children()))})"
+    
     def __add__(self, other):
         if not isinstance(other, Regex):
             return NotImplemented
@@ -34,7 +88,7 @@ class Regex(itree.ITree["Regex"]):
         return other.__mul__(self)
     
     def repeat(self, n: int) -> Regex:
-        return Concat(*([self] * n))
+        return Repeat(self, n, n)
     
     def __pow__(self, power):
         if isinstance(power, int):
@@ -42,83 +96,123 @@ class Regex(itree.ITree["Regex"]):
         return NotImplemented
     
     def __eq__(self, other) -> bool:
-        if type(self) != type(other):
-            return False
-        
-        for child1, child2 in zip(self.get_children(), other.get_children()):
-            if child1 != child2:
-                return False
-        
-        return True
+        return self is other
+    
+    def __hash__(self) -> int:
+        return self._hash
 
 
-@dataclasses.dataclass(frozen=True)
 class Letter(Regex):
+    __slots__ = ("letter",)
+    
     letter: str
     
-    def __init__(self, letter: str):
+    def __new__(cls, letter: str):
         assert len(letter) == 1
         
-        object.__setattr__(self, "letter", letter)
+        return cls._intern(letter, (), letter=letter)
     
     def get_children(self) -> typing.Iterable[Regex]:
         return ()
     
-    def __eq__(self, other) -> bool:
-        return super().__eq__(other) and self.letter == other.letter
+    def __reduce__(self):
+        return type(self), (self.letter,)
+    
+    def __repr__(self) -> str:
+        return f"Letter({self.letter!r})"
 
 
 class Zero(Regex):
+    __slots__ = ()
+    
+    def __new__(cls):
+        return cls._intern((), ())
+    
     def get_children(self) -> typing.Iterable[Regex]:
         return ()
 
 
 class One(Regex):
+    __slots__ = ()
+    
+    def __new__(cls):
+        return cls._intern((), ())
+    
     def get_children(self) -> typing.Iterable[Regex]:
         return ()
 
 
-@dataclasses.dataclass(frozen=True)
 class Concat(Regex):
-    _children: typing.List[Regex]
+    __slots__ = ("_children",)
     
-    def __init__(self, *children: Regex):
-        object.__setattr__(self, "_children", children)
+    _children: typing.Tuple[Regex, ...]
+    
+    def __new__(cls, *children: Regex):
+        return cls._intern(children, children, _children=children)
     
     def get_children(self) -> typing.Iterable[Regex]:
-        return tuple(self._children)
-
-
-# TODO: Maybe smart Repeat for optimization?
+        return self._children
 
 
-@dataclasses.dataclass(frozen=True)
 class Star(Regex):
+    __slots__ = ("_child",)
+    
     _child: Regex
     
-    def __init__(self, child: Regex):
-        object.__setattr__(self, "_child", child)
+    def __new__(cls, child: Regex):
+        return cls._intern(child, (child,), _child=child)
     
     def get_children(self) -> typing.Iterable[Regex]:
         return (self._child,)
 
 
-# TODO: Plus (as power)?
+class Repeat(Regex):
+    """
+    The child repeated from min_count to max_count times, or at least
+    min_count times if max_count is None. Stored as a single node,
+    so r^1000 costs no more than r^2 until something has to expand it
+    """
+    
+    __slots__ = ("_child", "min_count", "max_count")
+    
+    _child: Regex
+    min_count: int
+    max_count: int | None
+    
+    def __new__(cls, child: Regex, min_count: int, max_count: int | None):
+        assert min_count >= 0
+        assert max_count is None or max_count >= min_count
+        
+        return cls._intern(
+            (child, min_count, max_count), (child,),
+            _child=child, min_count=min_count, max_count=max_count,
+        )
+    
+    def get_children(self) -> typing.Iterable[Regex]:
+        return (self._child,)
+    
+    def __reduce__(self):
+        return type(self), (self._child, self.min_count, self.max_count)
+    
+    def __repr__(self) -> str:
+        return f"Repeat({self._child!r}, {self.min_count!r}, {self.max_count!r})"
 
 
-@dataclasses.dataclass(frozen=True)
 class Either(Regex):
-    _children: typing.List[Regex]
+    __slots__ = ("_children",)
     
-    def __init__(self, *children: Regex):
-        object.__setattr__(self, "_children", children)
+    _children: typing.Tuple[Regex, ...]
+    
+    def __new__(cls, *children: Regex):
+        return cls._intern(children, children, _children=children)
     
     def get_children(self) -> typing.Iterable[Regex]:
-        return tuple(self._children)
+        return self._children
 
 
 class Reconstructor(itree.TreeVisitor[Regex]):
     warn_on_generic: typing.ClassVar[bool] = True
+    post_order: typing.ClassVar[bool] = True
     
     
     class ParLevel(enum.IntEnum):
@@ -126,66 +220,63 @@ class Reconstructor(itree.TreeVisitor[Regex]):
         either = 1
         concat = 2
     
-
-    _par_level: ParLevel
-
-
-    def __init__(self):
-        super().__init__()
-
-        self._par_level = self.ParLevel.none
     
-    @contextlib.contextmanager
-    def _set_par_level(self, level: ParLevel):
-        old_level: self.ParLevel = self._par_level
-        self._par_level = level
-        yield
-        self._par_level = old_level
+    @classmethod
+    def needs_parens(cls, child: Regex, level: ParLevel) -> bool:
+        """
+        Whether a child's operator binds weaker than level
+        """
+        
+        return isinstance(child, Concat) and level >= cls.ParLevel.concat \
+            or isinstance(child, Either) and level >= cls.ParLevel.either
+    
+    def _wrap(self, child: Regex, text: str, level: ParLevel) -> str:
+        if self.needs_parens(child, level):
+            return f"({text})"
+        
+        return text
+    
+    def _wrap_all(self, node: Regex, results: typing.Sequence[str], level: ParLevel) -> typing.List[str]:
+        return [
+            self._wrap(child, text, level)
+            for child, text in zip(node.get_children(), results)
+        ]
+    
+    @staticmethod
+    def repeat_suffix(node: Repeat) -> str:
+        if node.max_count is None:
+            return "*" if node.min_count == 0 else "^+" if node.min_count == 1 else f"^{{{node.min_count},}}"
+        if node.min_count == node.max_count:
+            return f"^{{{node.min_count}}}"
+        return f"^{{{node.min_count},{node.max_count}}}"
 
     @itree.TreeVisitor.handler(Letter)
-    def visit_letter(self, node: Letter) -> str:
+    def visit_letter(self, node: Letter, results: typing.Sequence[str]) -> str:
         return node.letter
     
     @itree.TreeVisitor.handler(Zero)
-    def visit_zero(self, node: Zero) -> str:
+    def visit_zero(self, node: Zero, results: typing.Sequence[str]) -> str:
         return "0"
     
     @itree.TreeVisitor.handler(One)
-    def visit_one(self, node: One) -> str:
+    def visit_one(self, node: One, results: typing.Sequence[str]) -> str:
         return "1"
     
     @itree.TreeVisitor.handler(Concat)
-    def visit_concat(self, node: Concat) -> str:
-        result: typing.List[str] = []
-
-        with self._set_par_level(self.ParLevel.either):
-            for child in node.get_children():
-                result.append(self.visit(child))
-        
-        result: str = "".join(result)
-        if self._par_level >= self.ParLevel.concat:
-            result = f"({result})"
-        
-        return result
+    def visit_concat(self, node: Concat, results: typing.Sequence[str]) -> str:
+        return "".join(self._wrap_all(node, results, self.ParLevel.either))
 
     @itree.TreeVisitor.handler(Star)
-    def visit_star(self, node: Star) -> str:
-        with self._set_par_level(self.ParLevel.concat):
-            return self.visit(node.get_children()[0]) + "*"
+    def visit_star(self, node: Star, results: typing.Sequence[str]) -> str:
+        return self._wrap_all(node, results, self.ParLevel.concat)[0] + "*"
 
-    @itree.TreeVisitor.handler(Either)
-    def visit_either(self, node: Either) -> str:
-        result: typing.List[str] = []
+    @itree.TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat, results: typing.Sequence[str]) -> str:
+        return self._wrap_all(node, results, self.ParLevel.concat)[0] + self.repeat_suffix(node)
 
-        with self._set_par_level(self.ParLevel.none):
-            for child in node.get_children():
-                result.append(self.visit(child))
-        
-        result: str = "+".join(result)
-        if self._par_level >= self.ParLevel.either:
-            result = f"({result})"
-        
-        return result
+    @itree.TreeVisitor.handler(Either)
+    def visit_either(self, node: Either, results: typing.Sequence[str]) -> str:
+        return "+".join(self._wrap_all(node, results, self.ParLevel.none))
     
 
 def reconstruct_regex(regex: Regex) -> str:
@@ -193,6 +284,6 @@ def reconstruct_regex(regex: Regex) -> str:
 
 
 __all__ = [
-    "Regex", "Letter", "Zero", "One", "Concat", "Star", "Either",
+    "Regex", "Letter", "Zero", "One", "Concat", "Star", "Repeat", "Either",
     "reconstruct_regex",
 ]
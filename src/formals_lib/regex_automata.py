@@ -3,6 +3,8 @@ import typing
 import dataclasses
 from collections import deque
 import itertools
+import heapq
+import abc
 
 from .automata import *
 from .automata_ops import *
@@ -10,22 +12,49 @@ from .regex import *
 from .itree import TreeVisitor
 from .automata_determ import make_edges_1, unify_term
 from .regex_optimize import optimize_regex
+from .regex_rewrite import RegexRewriter
+from .regex_dag import LetRegex, share_regex
 from .regex_parser import parse_regex
+from .regex_bitparallel import GlushkovBuilder, iter_bits
 
 
 class RegexToAutomataConverter(TreeVisitor[Regex]):
+    """
+    Thompson's construction in a single pass: every node of the regex
+    emits its states and edges straight into one shared automata,
+    and the visitors only return the (entry, exit) fragments to link.
+    No automata is ever copied or merged, so this is linear
+    in the regex size, and all the keys are plain ints
+    """
+    
     warn_on_generic: typing.ClassVar[bool] = True
+    post_order: typing.ClassVar[bool] = True
+    
+    Fragment = typing.Tuple[Node, Node]
     
     _alphabet: str | None
+    _result: Automata | None
+    _letters: typing.Dict[str, None]
     
     
     def __init__(self, alphabet: str | None = None):
         super().__init__()
         
         self._alphabet = alphabet
+        self._result = None
+        self._letters = {}
     
     def apply(self, regex: Regex) -> Automata:
-        result: Automata = self.visit(regex)
+        result = Automata("")
+        self._result = result
+        self._letters = {}
+        
+        entry, exit = self.visit(regex)
+        result.link(result.start, entry, "")
+        exit.is_term = True
+        
+        self._result = None
+        result.alphabet = "".join(self._letters)
         
         if self._alphabet is not None:
             assert set(result.alphabet).issubset(set(self._alphabet)), "Unspecified alphabet used!"
@@ -34,87 +63,334 @@ class RegexToAutomataConverter(TreeVisitor[Regex]):
         
         return result
     
+    def children(self, node: Regex) -> typing.Iterable[Regex]:
+        # r^{0,0} is just 1, so r's states would only be left unreachable
+        if isinstance(node, Repeat) and node.max_count == 0:
+            return ()
+        
+        return node.get_children()
+    
     @TreeVisitor.handler(Letter)
-    def visit_letter(self, node: Letter) -> Automata:
-        result = Automata(node.letter)
+    def visit_letter(self, node: Letter, results: typing.Sequence[Fragment]) -> Fragment:
+        entry: Node = self._result.make_node()
+        exit: Node = self._result.make_node()
         
-        result.link(result.start, result.make_node(term=True), node.letter)
+        self._letters[node.letter] = None
+        self._result.link(entry, exit, node.letter)
         
-        return result
+        return entry, exit
     
     @TreeVisitor.handler(Zero)
-    def visit_zero(self, node: Zero) -> Automata:
-        result = Automata("")
-        
-        return result
+    def visit_zero(self, node: Zero, results: typing.Sequence[Fragment]) -> Fragment:
+        return self._result.make_node(), self._result.make_node()
     
     @TreeVisitor.handler(One)
-    def visit_one(self, node: One) -> Automata:
-        result = Automata("")
+    def visit_one(self, node: One, results: typing.Sequence[Fragment]) -> Fragment:
+        entry: Node = self._result.make_node()
         
-        result.start.is_term = True
-        
-        return result
+        return entry, entry
     
     @TreeVisitor.handler(Concat)
-    def visit_concat(self, node: Concat) -> Automata:
-        children: typing.Iterable[Regex] = node.get_children()
-        
-        if len(children) == 0:
-            return self.visit(One())
+    def visit_concat(self, node: Concat, results: typing.Sequence[Fragment]) -> Fragment:
+        if len(results) == 0:
+            return self.visit_one(One(), ())
         
-        children: typing.Iterator[Regex] = iter(children)
+        entry, exit = results[0]
+        for child_entry, child_exit in results[1:]:
+            self._result.link(exit, child_entry, "")
+            exit = child_exit
         
-        result: Automata = self.visit(next(children))
-        for child in children:
-            result = aut_concat(result, self.visit(child))
-        
-        return result
+        return entry, exit
 
     @TreeVisitor.handler(Star)
-    def visit_star(self, node: Star) -> Automata:
-        return aut_star(self.visit(node.get_children()[0]))
+    def visit_star(self, node: Star, results: typing.Sequence[Fragment]) -> Fragment:
+        # The child is only entered and left through the hub,
+        # so it's both our entry and exit
+        hub: Node = self._result.make_node()
+        
+        child_entry, child_exit = results[0]
+        self._result.link(hub, child_entry, "")
+        self._result.link(child_exit, hub, "")
+        
+        return hub, hub
+    
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat, results: typing.Sequence[Fragment]) -> Fragment:
+        """
+        r^{m,n} is r^m (1+r)^(n-m), and r^{m,} is r^(m-1) r^+.
+        The child is only visited once: the other iterations are stamped
+        out of its fragment, which is much cheaper than walking the regex again
+        """
+        
+        count: int = node.max_count if node.max_count is not None else max(node.min_count, 1)
+        
+        if count == 0:
+            # The child isn't even visited (see children)
+            return self.visit_one(One(), ())
+        
+        copies: typing.List[RegexToAutomataConverter.Fragment] = [results[0]]
+        if count > 1:
+            nodes: typing.List[Node] = self._fragment_nodes(*results[0])
+            copies.extend(self._replicate(nodes, *results[0]) for _ in range(count - 1))
+        
+        if node.max_count is None:
+            loop_entry, loop_exit = copies[-1]
+            if node.min_count == 0:
+                hub: Node = self._result.make_node()
+                self._result.link(hub, loop_entry, "")
+                self._result.link(loop_exit, hub, "")
+                return hub, hub
+            if loop_entry is not loop_exit:
+                self._result.link(loop_exit, loop_entry, "")
+        
+        mandatory = copies[:node.min_count]
+        optional = copies[node.min_count:]
+        
+        if mandatory:
+            entry, exit = mandatory[0]
+        else:
+            entry = exit = self._result.make_node()
+        
+        for child_entry, child_exit in mandatory[1:]:
+            self._result.link(exit, child_entry, "")
+            exit = child_exit
+        
+        if not optional:
+            return entry, exit
+        
+        final: Node = self._result.make_node()
+        for child_entry, child_exit in optional:
+            self._result.link(exit, final, "")
+            self._result.link(exit, child_entry, "")
+            exit = child_exit
+        self._result.link(exit, final, "")
+        
+        return entry, final
+    
+    @staticmethod
+    def _fragment_nodes(entry: Node, exit: Node) -> typing.List[Node]:
+        """
+        The states of a fragment that nothing outside links to yet,
+        so all of its edges are its own. Unreachable ones are of no use
+        """
+        
+        result: typing.Dict[Node, None] = {entry: None, exit: None}
+        # The exit may have edges of its own, such as a star's hub
+        stack: typing.List[Node] = [entry, exit]
+        
+        while stack:
+            for edge in stack.pop().out:
+                if edge.dst not in result:
+                    result[edge.dst] = None
+                    stack.append(edge.dst)
+        
+        return list(result)
+    
+    def _replicate(self, nodes: typing.Sequence[Node], entry: Node, exit: Node) -> Fragment:
+        """
+        Copies a fragment's states (see _fragment_nodes), along with the edges between them
+        """
+        
+        result: Automata = self._result
+        mapping: typing.Dict[Node, Node] = {node: result.make_node() for node in nodes}
+        
+        for node, copy in mapping.items():
+            for edge in node.out:
+                result.link(copy, mapping[edge.dst], edge.label)
+        
+        return mapping[entry], mapping[exit]
 
     @TreeVisitor.handler(Either)
-    def visit_either(self, node: Either) -> Automata:
-        children: typing.Iterable[Regex] = node.get_children()
+    def visit_either(self, node: Either, results: typing.Sequence[Fragment]) -> Fragment:
+        if len(results) == 0:
+            return self.visit_zero(Zero(), ())
         
-        if len(children) == 0:
-            return self.visit(Zero())
+        if len(results) == 1:
+            return results[0]
         
-        children: typing.Iterator[Regex] = iter(children)
+        entry: Node = self._result.make_node()
+        exit: Node = self._result.make_node()
         
-        result: Automata = self.visit(next(children))
-        for child in children:
-            result = aut_join(result, self.visit(child))
+        for child_entry, child_exit in results:
+            self._result.link(entry, child_entry, "")
+            self._result.link(child_exit, exit, "")
+        
+        return entry, exit
+
+
+class RegexToGlushkovConverter:
+    """
+    The position (Glushkov) automata of a regex: one state per Letter
+    occurrence plus the start, and a transition into a position is labeled
+    with that position's letter. Built from the first/last/follow sets
+    computed on the regex tree, so the result never has epsilon edges,
+    and make_dfa can determinize it right away
+    """
+    
+    _alphabet: str | None
+    
+    
+    def __init__(self, alphabet: str | None = None):
+        self._alphabet = alphabet
+    
+    def apply(self, regex: Regex) -> Automata:
+        builder = GlushkovBuilder()
+        info = builder.apply(regex)
+        
+        letters: typing.List[str] = builder.letters
+        
+        result = Automata("".join(dict.fromkeys(letters[1:])))
+        
+        # The start is created with key 0, which is just the initial position
+        for pos in range(1, len(letters)):
+            result.make_node(key=pos)
+            
+        for pos, follow in enumerate(builder.follow):
+            src: Node = result.node(pos)
+            
+            for dst in iter_bits(follow):
+                result.link(src, result.node(dst), letters[dst])
+            
+        for pos in iter_bits(info.last):
+            result.node(pos).is_term = True
+        
+        if self._alphabet is not None:
+            assert set(result.alphabet).issubset(set(self._alphabet)), "Unspecified alphabet used!"
+            
+            result.alphabet = self._alphabet
         
         return result
 
 
+def _split_edges(node: Node) -> typing.Tuple[typing.List[Edge], typing.List[Edge], Edge | None]:
+    """
+    A state's incoming and outgoing edges, other than its loop, and the loop
+    """
+    
+    edges_in: typing.List[Edge] = [e for e in node.inc if e.src is not node]
+    edges_out: typing.List[Edge] = [e for e in node.out if e.dst is not node]
+    loop: Edge | None = next((e for e in node.out if e.dst is node), None)
+    
+    return edges_in, edges_out, loop
+
+
+class EliminationOrder(abc.ABC):
+    """
+    Decides which state AutomataToRegexConverter eliminates next:
+    the one with the smallest priority. A state's priority is recomputed
+    whenever its neighbours change, so it should only depend on its own edges
+    """
+    
+    @abc.abstractmethod
+    def priority(self, node: Node) -> typing.Any:
+        pass
+
+
+class QueueOrder(EliminationOrder):
+    """
+    No heuristic: the states go in the order they were (re)queued in
+    """
+    
+    def priority(self, node: Node) -> typing.Any:
+        return 0
+
+
+class MinDegreeOrder(EliminationOrder):
+    """
+    The state creating the fewest new edges, in * out, goes first
+    """
+    
+    def priority(self, node: Node) -> typing.Any:
+        edges_in, edges_out, _ = _split_edges(node)
+        return len(edges_in) * len(edges_out)
+
+
+class MinWeightOrder(EliminationOrder):
+    """
+    The state whose elimination grows the total size of the labels
+    the least goes first: every incoming label gets copied once
+    per outgoing one, and vice versa, and the loop once per pair
+    """
+    
+    def priority(self, node: Node) -> typing.Any:
+        edges_in, edges_out, loop = _split_edges(node)
+        
+        in_size: int = sum(edge.label.size for edge in edges_in)
+        out_size: int = sum(edge.label.size for edge in edges_out)
+        loop_size: int = loop.label.size if loop is not None else 0
+        pairs: int = len(edges_in) * len(edges_out)
+        
+        return in_size * (len(edges_out) - 1) + out_size * (len(edges_in) - 1) + loop_size * (pairs - 1)
+
+
+class DelayHighFanOrder(EliminationOrder):
+    """
+    Wraps another order, but leaves the states with more than max_fan
+    incoming or outgoing edges for last: these tend to connect many others,
+    and eliminating them early makes the rest of the automata dense
+    """
+    
+    inner: EliminationOrder
+    max_fan: int
+    
+    def __init__(self, inner: EliminationOrder | None = None, max_fan: int = 4):
+        self.inner = inner if inner is not None else MinWeightOrder()
+        self.max_fan = max_fan
+    
+    def priority(self, node: Node) -> typing.Any:
+        edges_in, edges_out, _ = _split_edges(node)
+        return max(len(edges_in), len(edges_out)) > self.max_fan, self.inner.priority(node)
+
+
 class AutomataToRegexConverter:
     aut: Automata
+    rewriter: RegexRewriter | None
+    order: EliminationOrder
+    # Heap entries are (priority, entry id, node): only the last one pushed
+    # for a node is live, the rest get skipped once popped
+    _queue: typing.List[typing.Tuple[typing.Any, int, Node]]
+    _live: typing.Dict[Node, int]
+    _entry_ids: typing.Iterator[int]
     
-    def __init__(self, aut: Automata):
+    def __init__(self, aut: Automata, rewriter: RegexRewriter | None = None,
+                 order: EliminationOrder | None = None):
+        """
+        The result is only optimized by default. With a rewriter,
+        it's also shrunk by the rewriter's rules.
+        The states are eliminated in the order of MinWeightOrder by default
+        """
+        
         self.aut = aut
+        self.rewriter = rewriter
+        self.order = order if order is not None else MinWeightOrder()
+        self._queue = []
+        self._live = {}
+        self._entry_ids = itertools.count()
     
     def apply(self) -> Regex:
         self._prepare()
         
         self._merge_parallel_edges()
         
-        while len(self.aut) > 2:
-            self._step()
+        for node in self.aut.get_nodes():
+            self._enqueue(node)
         
-        if self.aut.start.is_term and len(self.aut) == 2:
+        # Only the start and the terminal are left in the end
+        while self._live:
             self._step()
         
         # return self._finalize()
-        return optimize_regex(self._finalize())
+        result: Regex = optimize_regex(self._finalize())
+        
+        if self.rewriter is not None:
+            result = self.rewriter.apply(result)
+        
+        return result
     
     def _prepare(self) -> None:
         self.aut = make_edges_1(self.aut)
-        self.aut = unify_term(self.aut)
-        self.aut = aut_trim(self.aut)
+        self.aut = unify_term(self.aut, in_place=True)
+        self.aut = aut_trim(self.aut, in_place=True)
         
         self._convert_to_re_automata()
     
@@ -142,10 +418,7 @@ class AutomataToRegexConverter:
         self.aut.link(node, node, Zero())
     
     def _get_loop(self, node: Node) -> Edge:
-        return next(
-            e for e in self.aut.get_edges()
-            if e.dst is node and e.src is node
-        )
+        return next(e for e in node.out if e.dst is node)
     
     def _step(self) -> None:
         target: Node = self._find_target()
@@ -154,16 +427,11 @@ class AutomataToRegexConverter:
         # print(f"    {len(self.aut)} nodes left")
         
         # Copying to avoid messing up the iteration
-        edges_in: typing.Iterable[Edge] = [
-            e for e in self.aut.get_edges()
-            if e.dst is target and e.src is not target
-        ]
-        
-        edges_out: typing.Iterable[Edge] = target.out
+        edges_in, edges_out, loop = _split_edges(target)
         
         # print(f"    {len(edges_in) * len(edges_out)} edge pairs to handle")
         
-        loop_regex: Regex = Star(self._get_loop(target).label)
+        loop_regex: Regex = Star(loop.label)
         
         to_link: typing.List[typing.Tuple[Node, Node, Regex]] = []
         
@@ -178,22 +446,41 @@ class AutomataToRegexConverter:
                 Concat(edge_in.label, loop_regex, edge_out.label)
             ))
         
-        # TODO: This, apparently, may include target as src or dst!
         for src, dst, label in to_link:
             self.aut.link(src, dst, label)
         
         self.aut.remove_node(target)
         
-        self._merge_parallel_edges()
+        # Only the predecessors could have gained parallel edges
+        self._merge_parallel_edges(set(src for src, _, _ in to_link))
+        
+        # And only the neighbours' edges have changed
+        for node in dict.fromkeys(itertools.chain(
+            (edge.src for edge in edges_in), (edge.dst for edge in edges_out),
+        )):
+            self._enqueue(node)
+    
+    def _enqueue(self, node: Node) -> None:
+        if node is self.aut.start or node.is_term:
+            return
+        
+        entry_id: int = next(self._entry_ids)
+        self._live[node] = entry_id
+        heapq.heappush(self._queue, (self.order.priority(node), entry_id, node))
     
     def _find_target(self) -> Node:
-        # Will raise StopIteration if no targets are available,
-        # but that shouldn't occur during normal operation
-        return next(n for n in self.aut.get_nodes()
-                    if n is not self.aut.start and not n.is_term)
+        while True:
+            _, entry_id, node = heapq.heappop(self._queue)
+            
+            if self._live.get(node) == entry_id:
+                del self._live[node]
+                return node
     
-    def _merge_parallel_edges(self) -> None:
-        for src in self.aut.get_nodes():
+    def _merge_parallel_edges(self, srcs: typing.Iterable[Node] | None = None) -> None:
+        if srcs is None:
+            srcs = self.aut.get_nodes()
+        
+        for src in srcs:
             outs: typing.Dict[Node, typing.Set[Edge]] = {}
             
             for edge in src.out:
@@ -243,10 +530,28 @@ def regex_to_automata(regex: Regex | str, alphabet: str | None = None) -> Automa
     return RegexToAutomataConverter(alphabet=alphabet).apply(regex)
 
 
-def automata_to_regex(aut: Automata) -> Regex:
-    return AutomataToRegexConverter(aut).apply()
+def regex_to_glushkov(regex: Regex | str, alphabet: str | None = None) -> Automata:
+    if isinstance(regex, str):
+        regex = parse_regex(regex)
+    return RegexToGlushkovConverter(alphabet=alphabet).apply(regex)
+
+
+def automata_to_regex(aut: Automata, rewriter: RegexRewriter | None = None,
+                      order: EliminationOrder | None = None) -> Regex:
+    return AutomataToRegexConverter(aut, rewriter=rewriter, order=order).apply()
+
+
+def automata_to_let_regex(aut: Automata, rewriter: RegexRewriter | None = None,
+                          order: EliminationOrder | None = None, min_size: int = 4) -> LetRegex:
+    """
+    automata_to_regex, with the subexpressions that state elimination
+    shares let-bound, see share_regex
+    """
+    
+    return share_regex(automata_to_regex(aut, rewriter=rewriter, order=order), min_size=min_size)
 
 
 __all__ = [
-    "regex_to_automata", "automata_to_regex",
+    "regex_to_automata", "regex_to_glushkov", "automata_to_regex", "automata_to_let_regex",
+    "EliminationOrder", "QueueOrder", "MinDegreeOrder", "MinWeightOrder", "DelayHighFanOrder",
 ]
@@ -0,0 +1,267 @@
+from __future__ import annotations
+import typing
+import dataclasses
+
+from .regex import *
+from .itree import TreeVisitor
+from .regex_parser import parse_regex
+
+
+# Bits of the state handled by one follow table
+_CHUNK_BITS: typing.Final[int] = 8
+_CHUNK_MASK: typing.Final[int] = (1 << _CHUNK_BITS) - 1
+
+
+def iter_bits(mask: int) -> typing.Generator[int, None, None]:
+    """
+    The positions of mask's set bits, lowest first
+    """
+
+    while mask:
+        low: int = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+@dataclasses.dataclass(frozen=True)
+class _PositionInfo:
+    nullable: bool
+    first: int
+    last: int
+
+
+class GlushkovBuilder(TreeVisitor[Regex]):
+    """
+    Computes the Glushkov position sets of a regex, as bitmasks.
+    Bit 0 stands for the initial position, every Letter occurrence
+    gets a bit of its own after that
+    """
+
+    warn_on_generic: typing.ClassVar[bool] = True
+    post_order: typing.ClassVar[bool] = True
+
+    letters: typing.List[str]
+    follow: typing.List[int]
+
+
+    def __init__(self):
+        super().__init__()
+
+        self.letters = [""]
+        self.follow = [0]
+
+    def apply(self, regex: Regex) -> _PositionInfo:
+        info: _PositionInfo = self.visit(regex)
+
+        self.follow[0] = info.first
+
+        return _PositionInfo(
+            nullable=info.nullable,
+            first=info.first,
+            last=info.last | (1 if info.nullable else 0),
+        )
+
+    def _link(self, srcs: int, dsts: int) -> None:
+        if not dsts:
+            return
+
+        follow = self.follow
+        for pos in iter_bits(srcs):
+            follow[pos] |= dsts
+
+    @TreeVisitor.handler(Letter)
+    def visit_letter(self, node: Letter, results: typing.Sequence[_PositionInfo]) -> _PositionInfo:
+        bit: int = 1 << len(self.letters)
+
+        self.letters.append(node.letter)
+        self.follow.append(0)
+
+        return _PositionInfo(nullable=False, first=bit, last=bit)
+
+    @TreeVisitor.handler(Zero)
+    def visit_zero(self, node: Zero, results: typing.Sequence[_PositionInfo]) -> _PositionInfo:
+        return _PositionInfo(nullable=False, first=0, last=0)
+
+    @TreeVisitor.handler(One)
+    def visit_one(self, node: One, results: typing.Sequence[_PositionInfo]) -> _PositionInfo:
+        return _PositionInfo(nullable=True, first=0, last=0)
+
+    @staticmethod
+    def _concat(left: _PositionInfo, right: _PositionInfo) -> _PositionInfo:
+        return _PositionInfo(
+            nullable=left.nullable and right.nullable,
+            first=left.first | (right.first if left.nullable else 0),
+            last=right.last | (left.last if right.nullable else 0),
+        )
+
+    @TreeVisitor.handler(Concat)
+    def visit_concat(self, node: Concat, results: typing.Sequence[_PositionInfo]) -> _PositionInfo:
+        result: _PositionInfo = _PositionInfo(nullable=True, first=0, last=0)
+
+        for info in results:
+            self._link(result.last, info.first)
+
+            result = self._concat(result, info)
+
+        return result
+
+    @TreeVisitor.handler(Star)
+    def visit_star(self, node: Star, results: typing.Sequence[_PositionInfo]) -> _PositionInfo:
+        info: _PositionInfo = results[0]
+
+        self._link(info.last, info.first)
+
+        return _PositionInfo(nullable=True, first=info.first, last=info.last)
+
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat, results: typing.Sequence[_PositionInfo]) -> _PositionInfo:
+        # Positions can't be shared between iterations, so every one
+        # gets a copy of its own: r^{m,n} is r^m (1+r)^(n-m),
+        # and r^{m,} is r^(m-1) r^+
+        child: Regex = node.get_children()[0]
+        count: int = node.max_count if node.max_count is not None else max(node.min_count, 1)
+
+        result: _PositionInfo = _PositionInfo(nullable=True, first=0, last=0)
+
+        for i in range(count):
+            # The first iteration is already visited
+            info: _PositionInfo = results[0] if i == 0 else self.visit(child)
+
+            if node.max_count is None and i == count - 1:
+                self._link(info.last, info.first)
+
+            if i >= node.min_count:
+                info = _PositionInfo(nullable=True, first=info.first, last=info.last)
+
+            self._link(result.last, info.first)
+
+            result = self._concat(result, info)
+
+        return result
+
+    @TreeVisitor.handler(Either)
+    def visit_either(self, node: Either, results: typing.Sequence[_PositionInfo]) -> _PositionInfo:
+        result: _PositionInfo = _PositionInfo(nullable=False, first=0, last=0)
+
+        for info in results:
+            result = _PositionInfo(
+                nullable=result.nullable or info.nullable,
+                first=result.first | info.first,
+                last=result.last | info.last,
+            )
+
+        return result
+
+
+class BitParallelMatcher:
+    """
+    Matches words against a regex by simulating its Glushkov automata
+    with the set of active positions packed into an int, Shift-And style.
+    A letter transition is two bitwise operations per chunk of
+    _CHUNK_BITS positions: the follow sets of a chunk's active positions
+    come from a precomputed table, and are then masked by the positions
+    holding that letter. No automata is ever built or determinized,
+    so construction is linear in the regex size (plus the follow tables).
+    Intended for regexes with up to a few hundred letters
+    """
+
+    alphabet: str
+    initial: int
+    _accept_mask: int
+    _letter_masks: typing.Dict[str, int]
+    # _follow_tables[k][bits] is the union of the follow sets
+    # of the positions _CHUNK_BITS * k + i for every bit i in bits
+    _follow_tables: typing.List[typing.List[int]]
+    _positions_cnt: int
+
+
+    def __init__(self, regex: Regex | str):
+        if isinstance(regex, str):
+            regex = parse_regex(regex)
+
+        builder = GlushkovBuilder()
+        info: _PositionInfo = builder.apply(regex)
+
+        self.alphabet = "".join(dict.fromkeys(builder.letters[1:]))
+        self.initial = 1
+        self._accept_mask = info.last
+        self._positions_cnt = len(builder.letters)
+
+        self._letter_masks = {}
+        for pos, letter in enumerate(builder.letters[1:], 1):
+            self._letter_masks[letter] = self._letter_masks.get(letter, 0) | (1 << pos)
+
+        self._follow_tables = []
+        follow: typing.List[int] = builder.follow
+        for lo in range(0, self._positions_cnt, _CHUNK_BITS):
+            table: typing.List[int] = [0] * (1 << _CHUNK_BITS)
+            for bits in range(1, len(table)):
+                low: int = bits & -bits
+                pos: int = lo + low.bit_length() - 1
+                table[bits] = table[bits ^ low] | (follow[pos] if pos < len(follow) else 0)
+            self._follow_tables.append(table)
+
+    def step(self, state: int, letter: str) -> int:
+        letter_mask: int = self._letter_masks.get(letter, 0)
+        if not letter_mask:
+            return 0
+
+        result: int = 0
+        for table in self._follow_tables:
+            if not state:
+                break
+            result |= table[state & _CHUNK_MASK]
+            state >>= _CHUNK_BITS
+
+        return result & letter_mask
+
+    def prefix_state(self, word: str, state: int | None = None) -> int:
+        """
+        The set of active positions after reading word, starting from state
+        (only the initial position by default). Zero means rejection
+        """
+
+        if state is None:
+            state = self.initial
+
+        letter_masks = self._letter_masks
+        tables = self._follow_tables
+
+        for letter in word:
+            letter_mask: int = letter_masks.get(letter, 0)
+            if not letter_mask:
+                return 0
+
+            result: int = 0
+            for table in tables:
+                if not state:
+                    break
+                result |= table[state & _CHUNK_MASK]
+                state >>= _CHUNK_BITS
+
+            state = result & letter_mask
+            if not state:
+                return 0
+
+        return state
+
+    def is_accepting(self, state: int) -> bool:
+        return bool(state & self._accept_mask)
+
+    def accepts(self, word: str) -> bool:
+        return self.is_accepting(self.prefix_state(word))
+
+    def accepts_many(self, words: typing.Iterable[str]) -> typing.List[bool]:
+        return [self.accepts(word) for word in words]
+
+    def __len__(self) -> int:
+        return self._positions_cnt
+
+
+def compile_bitparallel(regex: Regex | str) -> BitParallelMatcher:
+    return BitParallelMatcher(regex)
+
+
+__all__ = [
+    "iter_bits", "GlushkovBuilder", "BitParallelMatcher", "compile_bitparallel",
+]
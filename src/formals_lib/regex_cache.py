@@ -0,0 +1,208 @@
+from __future__ import annotations
+import typing
+import dataclasses
+import enum
+import threading
+from collections import OrderedDict
+
+from .regex import Regex
+from .automata import *
+from .automata_determ import make_dfa, make_full_dfa
+from .automata_minimize import minimize
+from .automata_match import DFAMatcher
+from .automata_lazy import EvictionPolicy
+from .regex_parser import parse_regex
+from .regex_automata import regex_to_automata
+
+
+class CompiledForm(enum.Enum):
+    regex = enum.auto()
+    nfa = enum.auto()
+    dfa = enum.auto()
+    full_dfa = enum.auto()
+    min_dfa = enum.auto()
+    matcher = enum.auto()
+
+
+# Every form is built from the previous one
+_SOURCE_FORM: typing.Final[typing.Mapping[CompiledForm, CompiledForm]] = {
+    CompiledForm.nfa: CompiledForm.regex,
+    CompiledForm.dfa: CompiledForm.nfa,
+    CompiledForm.full_dfa: CompiledForm.dfa,
+    CompiledForm.min_dfa: CompiledForm.full_dfa,
+    CompiledForm.matcher: CompiledForm.min_dfa,
+}
+
+
+CacheKey = typing.Tuple[typing.Union[str, Regex], typing.Optional[str], CompiledForm]
+
+
+@dataclasses.dataclass
+class CompileCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total: int = self.hits + self.misses
+        return self.hits / total if total else 0.
+
+
+class CompileCache:
+    """
+    A bounded cache of compiled patterns, keyed by the pattern
+    (its source text or a Regex), the alphabet and the target form.
+
+    Regexes and DFAMatchers are immutable, so they are shared as is.
+    Automatas are not, so the cache keeps its own and hands out copies,
+    which is linear, unlike building them again.
+
+    Every request takes up a single entry out of max_size: the forms it
+    is built from are reused if they happen to be cached, but aren't
+    cached along the way.
+
+    Safe to share between threads. The lock isn't held while compiling,
+    so racing misses may both compile the same pattern, and the first one
+    to finish wins
+    """
+
+    max_size: int
+    policy: EvictionPolicy
+    stats: CompileCacheStats
+    _entries: typing.OrderedDict[CacheKey, typing.Any]
+    _lock: threading.Lock
+
+
+    def __init__(self, max_size: int = 256, policy: EvictionPolicy = EvictionPolicy.lru):
+        assert max_size > 0
+
+        self.max_size = max_size
+        self.policy = policy
+        self.stats = CompileCacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse_regex(self, src: str | Regex) -> Regex:
+        return self.get(src, form=CompiledForm.regex)
+
+    def regex_to_automata(self, regex: str | Regex, alphabet: str | None = None,
+                          form: CompiledForm = CompiledForm.nfa) -> Automata:
+        assert form not in (CompiledForm.regex, CompiledForm.matcher)
+
+        return self.get(regex, alphabet, form)
+
+    def compile(self, regex: str | Regex, alphabet: str | None = None) -> DFAMatcher:
+        return self.get(regex, alphabet, CompiledForm.matcher)
+
+    def get(self, pattern: str | Regex, alphabet: str | None = None,
+            form: CompiledForm = CompiledForm.nfa) -> typing.Any:
+        result = self._get_shared(pattern, alphabet, form)
+
+        if isinstance(result, Automata):
+            result = result.copy()
+
+        return result
+
+    @staticmethod
+    def _key(pattern: str | Regex, alphabet: str | None, form: CompiledForm) -> CacheKey:
+        # The alphabet doesn't affect parsing
+        if form is CompiledForm.regex:
+            alphabet = None
+
+        return pattern, alphabet, form
+
+    def _get_shared(self, pattern: str | Regex, alphabet: str | None,
+                    form: CompiledForm) -> typing.Any:
+        key: CacheKey = self._key(pattern, alphabet, form)
+
+        with self._lock:
+            result = self._entries.get(key)
+
+            if result is not None:
+                self.stats.hits += 1
+                if self.policy is EvictionPolicy.lru:
+                    self._entries.move_to_end(key)
+                return result
+
+            self.stats.misses += 1
+
+        result = self._build(pattern, alphabet, form)
+
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                return existing
+
+            self._evict()
+            self._entries[key] = result
+
+        return result
+
+    def _build(self, pattern: str | Regex, alphabet: str | None, form: CompiledForm) -> typing.Any:
+        if form is CompiledForm.regex:
+            return parse_regex(pattern) if isinstance(pattern, str) else pattern
+
+        source_form: CompiledForm = _SOURCE_FORM[form]
+
+        with self._lock:
+            source = self._entries.get(self._key(pattern, alphabet, source_form))
+
+        # Only a source of our own can be changed in place
+        in_place: bool = source is None
+        if in_place:
+            source = self._build(pattern, alphabet, source_form)
+
+        if form is CompiledForm.nfa:
+            return regex_to_automata(source, alphabet=alphabet)
+        if form is CompiledForm.dfa:
+            return make_dfa(source, in_place=in_place)
+        if form is CompiledForm.full_dfa:
+            return make_full_dfa(source, in_place=in_place)
+        if form is CompiledForm.min_dfa:
+            return minimize(source, in_place=in_place)
+
+        assert form is CompiledForm.matcher
+        return DFAMatcher(source, minimal=True)
+
+    def _evict(self) -> None:
+        """
+        Makes room for one more entry
+        """
+
+        if len(self._entries) < self.max_size:
+            return
+
+        if self.policy is EvictionPolicy.clear:
+            self.stats.evictions += len(self._entries)
+            self._entries.clear()
+            return
+
+        while len(self._entries) >= self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+default_cache: typing.Final[CompileCache] = CompileCache()
+
+
+def cached_parse_regex(src: str | Regex) -> Regex:
+    return default_cache.parse_regex(src)
+
+
+def cached_regex_to_automata(regex: str | Regex, alphabet: str | None = None,
+                             form: CompiledForm = CompiledForm.nfa) -> Automata:
+    return default_cache.regex_to_automata(regex, alphabet=alphabet, form=form)
+
+
+__all__ = [
+    "CompiledForm", "CompileCacheStats", "CompileCache", "default_cache",
+    "cached_parse_regex", "cached_regex_to_automata",
+]
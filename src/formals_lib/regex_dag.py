@@ -0,0 +1,300 @@
+from __future__ import annotations
+import typing
+import dataclasses
+
+from .regex import *
+from .regex import Reconstructor
+from .itree import TreeVisitor
+
+
+ParLevel = Reconstructor.ParLevel
+
+# A piece of text to write, or a subexpression to write at a ParLevel
+_TextItem = typing.Union[str, typing.Tuple[Regex, ParLevel]]
+
+_NO_NAMES: typing.Final[typing.Mapping[Regex, str]] = {}
+
+
+def iter_regex_text(regex: Regex, names: typing.Mapping[Regex, str] = _NO_NAMES,
+                    piece_length: int = 256) -> typing.Generator[str, None, None]:
+    """
+    The text of reconstruct_regex(regex), in pieces. Shared subexpressions
+    are written out every time, but nothing is expanded in memory:
+    the stack only holds a path from the root, with the siblings along it,
+    and only the texts of the distinct subexpressions up to piece_length
+    long are kept, to be written in one piece.
+    The subexpressions in names, other than regex itself, are written as their names
+    """
+
+    lengths = _TextLength(names)
+    pieces: typing.Dict[Regex, str] = {}
+
+    stack: typing.List[_TextItem] = [(regex, ParLevel.none)]
+
+    while stack:
+        item: _TextItem = stack.pop()
+
+        if isinstance(item, str):
+            yield item
+            continue
+
+        node, level = item
+
+        name: str | None = names.get(node)
+        if name is not None and node is not regex:
+            yield name
+            continue
+
+        if Reconstructor.needs_parens(node, level):
+            yield "("
+            stack.append(")")
+            stack.append((node, ParLevel.none))
+            continue
+
+        if node is not regex and lengths.visit(node) <= piece_length:
+            piece: str | None = pieces.get(node)
+            if piece is None:
+                piece = pieces[node] = "".join(iter_regex_text(node, names, piece_length=0))
+            yield piece
+            continue
+
+        if isinstance(node, Letter):
+            yield node.letter
+        elif isinstance(node, Zero):
+            yield "0"
+        elif isinstance(node, One):
+            yield "1"
+        elif isinstance(node, Concat):
+            stack.extend((child, ParLevel.either) for child in reversed(node.get_children()))
+        elif isinstance(node, (Star, Repeat)):
+            stack.append("*" if isinstance(node, Star) else Reconstructor.repeat_suffix(node))
+            stack.append((node.get_children()[0], ParLevel.concat))
+        else:
+            assert isinstance(node, Either)
+
+            children: typing.Sequence[Regex] = node.get_children()
+            stack.append((children[-1], ParLevel.none))
+            for child in reversed(children[:-1]):
+                stack.append("+")
+                stack.append((child, ParLevel.none))
+
+
+def _write_pieces(pieces: typing.Iterable[str], stream: typing.TextIO, chunk_size: int) -> int:
+    written: int = 0
+    chunk: typing.List[str] = []
+
+    for piece in pieces:
+        chunk.append(piece)
+
+        if len(chunk) >= chunk_size:
+            written += stream.write("".join(chunk))
+            chunk.clear()
+
+    written += stream.write("".join(chunk))
+
+    return written
+
+
+def write_regex(regex: Regex, stream: typing.TextIO, names: typing.Mapping[Regex, str] = _NO_NAMES,
+                chunk_size: int = 1 << 12) -> int:
+    """
+    Writes iter_regex_text(regex, names) to stream, chunk_size pieces
+    at a time. Returns the number of characters written
+    """
+
+    return _write_pieces(iter_regex_text(regex, names), stream, chunk_size)
+
+
+class _TextLength(TreeVisitor[Regex]):
+    """
+    The length of every distinct subexpression's text, without its own
+    parentheses. Computed over the DAG, so the expanded size doesn't matter.
+    The lengths are kept across visit() calls
+    """
+
+    warn_on_generic: typing.ClassVar[bool] = True
+    post_order: typing.ClassVar[bool] = True
+    memoize: typing.ClassVar[bool] = True
+
+    _names: typing.Mapping[Regex, str]
+    _table: typing.Dict[Regex, int]
+
+
+    def __init__(self, names: typing.Mapping[Regex, str] = _NO_NAMES):
+        super().__init__()
+
+        self._names = names
+        self._table = {}
+
+    def memo_table(self) -> typing.MutableMapping[Regex, int]:
+        return self._table
+
+    def _children_length(self, node: Regex, results: typing.Sequence[int], level: ParLevel) -> int:
+        result: int = 0
+
+        for child, length in zip(node.get_children(), results):
+            name: str | None = self._names.get(child)
+            if name is not None:
+                result += len(name)
+            else:
+                result += length + 2 * Reconstructor.needs_parens(child, level)
+
+        return result
+
+    @TreeVisitor.handler(Letter)
+    @TreeVisitor.handler(Zero)
+    @TreeVisitor.handler(One)
+    def visit_leaf(self, node: Regex, results: typing.Sequence[int]) -> int:
+        return 1
+
+    @TreeVisitor.handler(Concat)
+    def visit_concat(self, node: Concat, results: typing.Sequence[int]) -> int:
+        return self._children_length(node, results, ParLevel.either)
+
+    @TreeVisitor.handler(Star)
+    def visit_star(self, node: Star, results: typing.Sequence[int]) -> int:
+        return self._children_length(node, results, ParLevel.concat) + 1
+
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat, results: typing.Sequence[int]) -> int:
+        return self._children_length(node, results, ParLevel.concat) + len(Reconstructor.repeat_suffix(node))
+
+    @TreeVisitor.handler(Either)
+    def visit_either(self, node: Either, results: typing.Sequence[int]) -> int:
+        return self._children_length(node, results, ParLevel.none) + len(results) - 1
+
+
+def regex_text_length(regex: Regex) -> int:
+    """
+    len(reconstruct_regex(regex)), without building the text
+    """
+
+    return _TextLength().visit(regex)
+
+
+def _walk_dag(regex: Regex) -> typing.Tuple[typing.List[Regex], typing.Dict[Regex, int]]:
+    """
+    The distinct subexpressions of regex, children before parents,
+    and how many times each is referred to by the others
+    """
+
+    order: typing.List[Regex] = []
+    refs: typing.Dict[Regex, int] = {regex: 0}
+    expanded: typing.Set[Regex] = set()
+    # (node, whether its children are done)
+    stack: typing.List[typing.Tuple[Regex, bool]] = [(regex, False)]
+
+    while stack:
+        node, done = stack.pop()
+
+        if done:
+            order.append(node)
+            continue
+
+        # A node may be pushed again before it's done, by a later parent
+        if node in expanded:
+            continue
+        expanded.add(node)
+
+        stack.append((node, True))
+        for child in reversed(tuple(node.get_children())):
+            refs[child] = refs.get(child, 0) + 1
+            if child not in expanded:
+                stack.append((child, False))
+
+    return order, refs
+
+
+def dag_size(regex: Regex) -> int:
+    """
+    The number of distinct subexpressions, which is what regex takes in memory
+    """
+
+    return len(_walk_dag(regex)[1])
+
+
+@dataclasses.dataclass(frozen=True)
+class LetRegex:
+    """
+    A regex with its shared subexpressions let-bound: bindings[i] is named
+    ${i + 1}, and may refer to the earlier bindings by their names,
+    as does the body. Regexes are hash-consed, so body is the whole regex
+    as is, and the bindings only decide how it's written.
+    All the sizes are computed without expanding anything
+    """
+
+    bindings: typing.Tuple[Regex, ...]
+    body: Regex
+
+    def names(self) -> typing.Dict[Regex, str]:
+        return {binding: f"${i}" for i, binding in enumerate(self.bindings, 1)}
+
+    @property
+    def expanded_size(self) -> int:
+        """
+        The number of nodes in the regex, as a tree
+        """
+
+        return self.body.size
+
+    def expanded_length(self) -> int:
+        """
+        The length of the regex's text, with nothing bound
+        """
+
+        return regex_text_length(self.body)
+
+    def dag_size(self) -> int:
+        return dag_size(self.body)
+
+    def iter_text(self) -> typing.Generator[str, None, None]:
+        """
+        One line per binding, as in "$1 = (a+b)*", and then the body
+        """
+
+        names: typing.Dict[Regex, str] = self.names()
+
+        for binding, name in names.items():
+            yield f"{name} = "
+            yield from iter_regex_text(binding, names)
+            yield "\n"
+
+        yield from iter_regex_text(self.body, names)
+
+    def text_length(self) -> int:
+        names: typing.Dict[Regex, str] = self.names()
+        lengths = _TextLength(names)
+
+        return sum(
+            len(name) + len(" = ") + lengths.visit(binding) + len("\n")
+            for binding, name in names.items()
+        ) + lengths.visit(self.body)
+
+    def write(self, stream: typing.TextIO, chunk_size: int = 1 << 12) -> int:
+        return _write_pieces(self.iter_text(), stream, chunk_size)
+
+    def __str__(self) -> str:
+        return "".join(self.iter_text())
+
+
+def share_regex(regex: Regex, min_size: int = 4) -> LetRegex:
+    """
+    Binds every subexpression that is referred to more than once,
+    and has at least min_size nodes as a tree
+    """
+
+    order, refs = _walk_dag(regex)
+
+    return LetRegex(
+        bindings=tuple(
+            node for node in order
+            if refs[node] > 1 and node.size >= min_size
+        ),
+        body=regex,
+    )
+
+
+__all__ = [
+    "LetRegex", "share_regex", "dag_size",
+    "iter_regex_text", "write_regex", "regex_text_length",
+]
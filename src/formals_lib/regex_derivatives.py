@@ -0,0 +1,194 @@
+from __future__ import annotations
+import typing
+import dataclasses
+from collections import deque
+
+from .regex import *
+from .automata import *
+from .regex_parser import parse_regex
+from .regex_optimize import RegexCanonicalizer
+
+
+class DerivativeLimitError(RuntimeError):
+    pass
+
+
+@dataclasses.dataclass
+class DerivativeStats:
+    hits: int = 0
+    misses: int = 0
+    states: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total: int = self.hits + self.misses
+        return self.hits / total if total else 0.
+
+
+class BrzozowskiDFABuilder:
+    """
+    Builds a DFA straight from a regex: every state is a normalized regex
+    (which is also its key), and the transition by a letter leads
+    to the derivative of that regex by the letter. Derivatives are memoized,
+    and normalization makes most equivalent ones coincide, so the result
+    is usually close to minimal. Transitions into Zero are left out,
+    like make_dfa does
+    """
+
+    alphabet: str | None
+    max_states: int
+    stats: DerivativeStats
+    _derivatives: typing.Dict[typing.Tuple[Regex, str], Regex]
+    _nullable: typing.Dict[Regex, bool]
+    _normalizer: RegexCanonicalizer
+
+
+    def __init__(self, alphabet: str | None = None, max_states: int = 10 ** 4):
+        assert max_states > 0
+
+        self.alphabet = alphabet
+        self.max_states = max_states
+        self.stats = DerivativeStats()
+        self._derivatives = {}
+        self._nullable = {}
+        self._normalizer = RegexCanonicalizer()
+
+    def apply(self, regex: Regex) -> Automata:
+        regex = self._normalizer.visit(regex)
+
+        letters: str = "".join(dict.fromkeys(self._iter_letters(regex)))
+        alphabet: str = letters
+        if self.alphabet is not None:
+            assert set(letters).issubset(set(self.alphabet)), "Unspecified alphabet used!"
+
+            alphabet = self.alphabet
+
+        result = Automata(alphabet)
+        result.change_key(result.start, regex)
+        result.start.is_term = self.nullable(regex)
+
+        queue: typing.Deque[Node] = deque()
+        queue.append(result.start)
+
+        while queue:
+            node: Node = queue.popleft()
+
+            # Letters absent from the regex always lead to Zero
+            for letter in letters:
+                derivative: Regex = self.derivative(node.key, letter)
+
+                if isinstance(derivative, Zero):
+                    continue
+
+                if derivative not in result:
+                    if len(result) >= self.max_states:
+                        raise DerivativeLimitError(f"More than {self.max_states} derivative states")
+
+                    result.make_node(key=derivative, term=self.nullable(derivative))
+                    queue.append(result.node(derivative))
+
+                result.link(node, result.node(derivative), letter)
+
+        self.stats.states = len(result)
+
+        return result
+
+    def nullable(self, regex: Regex) -> bool:
+        result: bool | None = self._nullable.get(regex)
+
+        if result is not None:
+            return result
+
+        if isinstance(regex, (One, Star)):
+            result = True
+        elif isinstance(regex, (Zero, Letter)):
+            result = False
+        elif isinstance(regex, Repeat):
+            result = regex.min_count == 0 or self.nullable(regex.get_children()[0])
+        elif isinstance(regex, Concat):
+            result = all(map(self.nullable, regex.get_children()))
+        else:
+            assert isinstance(regex, Either)
+            result = any(map(self.nullable, regex.get_children()))
+
+        self._nullable[regex] = result
+        return result
+
+    def derivative(self, regex: Regex, letter: str) -> Regex:
+        """
+        The normalized derivative of a normalized regex by letter
+        """
+
+        result: Regex | None = self._derivatives.get((regex, letter))
+
+        if result is not None:
+            self.stats.hits += 1
+            return result
+
+        self.stats.misses += 1
+
+        if isinstance(regex, Letter):
+            result = One() if regex.letter == letter else Zero()
+        elif isinstance(regex, (Zero, One)):
+            result = Zero()
+        elif isinstance(regex, Star):
+            result = self._concat(self.derivative(regex.get_children()[0], letter), regex)
+        elif isinstance(regex, Repeat):
+            # d(r^{m,n}) = d(r) r^{m-1,n-1}. Skipping empty iterations
+            # of a nullable r gives nothing new, since r^k is within r^(k+1)
+            child: Regex = regex.get_children()[0]
+            rest: Regex = self._repeat(
+                child, max(regex.min_count - 1, 0),
+                None if regex.max_count is None else regex.max_count - 1,
+            )
+            result = self._concat(self.derivative(child, letter), rest)
+        elif isinstance(regex, Either):
+            result = self._either(*(self.derivative(child, letter) for child in regex.get_children()))
+        else:
+            assert isinstance(regex, Concat)
+
+            head, *tail = regex.get_children()
+            rest: Regex = tail[0] if len(tail) == 1 else Concat(*tail)
+
+            result = self._concat(self.derivative(head, letter), rest)
+            if self.nullable(head):
+                result = self._either(result, self.derivative(rest, letter))
+
+        self._derivatives[(regex, letter)] = result
+        return result
+
+    # The normalizer's handlers, applied to already normalized children
+
+    def _concat(self, *children: Regex) -> Regex:
+        return self._normalizer.visit_concat(Concat(*children), children)
+
+    def _either(self, *children: Regex) -> Regex:
+        return self._normalizer.visit_either(Either(*children), children)
+
+    def _repeat(self, child: Regex, min_count: int, max_count: int | None) -> Regex:
+        return self._normalizer.visit_repeat(Repeat(child, min_count, max_count), (child,))
+
+    @staticmethod
+    def _iter_letters(regex: Regex) -> typing.Generator[str, None, None]:
+        stack: typing.List[Regex] = [regex]
+
+        while stack:
+            node: Regex = stack.pop()
+
+            if isinstance(node, Letter):
+                yield node.letter
+
+            # Reversed, to keep the letters in the order of appearance
+            stack.extend(reversed(node.get_children()))
+
+
+def regex_to_dfa_brzozowski(regex: Regex | str, alphabet: str | None = None,
+                            max_states: int = 10 ** 4) -> Automata:
+    if isinstance(regex, str):
+        regex = parse_regex(regex)
+    return BrzozowskiDFABuilder(alphabet=alphabet, max_states=max_states).apply(regex)
+
+
+__all__ = [
+    "DerivativeLimitError", "DerivativeStats", "BrzozowskiDFABuilder", "regex_to_dfa_brzozowski",
+]
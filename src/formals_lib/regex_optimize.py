@@ -7,27 +7,27 @@ from .itree import TreeVisitor
 
 class RegexOptimizer(TreeVisitor[Regex]):
     warn_on_generic: typing.ClassVar[bool] = True
+    post_order: typing.ClassVar[bool] = True
+    memoize: typing.ClassVar[bool] = True
     
 
     @TreeVisitor.handler(Letter)
-    def visit_letter(self, node: Letter) -> Regex:
+    def visit_letter(self, node: Letter, results: typing.Sequence[Regex]) -> Regex:
         return node
     
     @TreeVisitor.handler(Zero)
-    def visit_zero(self, node: Zero) -> Regex:
+    def visit_zero(self, node: Zero, results: typing.Sequence[Regex]) -> Regex:
         return node
     
     @TreeVisitor.handler(One)
-    def visit_one(self, node: One) -> Regex:
+    def visit_one(self, node: One, results: typing.Sequence[Regex]) -> Regex:
         return node
     
     @TreeVisitor.handler(Concat)
-    def visit_concat(self, node: Concat) -> Regex:
+    def visit_concat(self, node: Concat, results: typing.Sequence[Regex]) -> Regex:
         result: typing.List[Regex] = []
 
-        for child in node.get_children():
-            child_regex: Regex = self.visit(child)
-            
+        for child_regex in results:
             if isinstance(child_regex, Zero):
                 return child_regex
             
@@ -49,21 +49,38 @@ class RegexOptimizer(TreeVisitor[Regex]):
         return Concat(*result)
 
     @TreeVisitor.handler(Star)
-    def visit_star(self, node: Star) -> Regex:
-        child_regex: Regex = self.visit(node.get_children()[0])
+    def visit_star(self, node: Star, results: typing.Sequence[Regex]) -> Regex:
+        child_regex: Regex = results[0]
         
         if isinstance(child_regex, (Zero, One)):
             return One()
         
         return Star(child_regex)
 
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat, results: typing.Sequence[Regex]) -> Regex:
+        child_regex: Regex = results[0]
+        
+        if isinstance(child_regex, One) or node.max_count == 0:
+            return One()
+        
+        if isinstance(child_regex, Zero):
+            return One() if node.min_count == 0 else child_regex
+        
+        if node.min_count == 0 and node.max_count is None:
+            # The child is neither Zero nor One by now
+            return Star(child_regex)
+        
+        if node.min_count == 1 and node.max_count == 1:
+            return child_regex
+        
+        return Repeat(child_regex, node.min_count, node.max_count)
+
     @TreeVisitor.handler(Either)
-    def visit_either(self, node: Either) -> Regex:
+    def visit_either(self, node: Either, results: typing.Sequence[Regex]) -> Regex:
         result: typing.Set[Regex] = set()
 
-        for child in node.get_children():
-            child_regex: Regex = self.visit(child)
-            
+        for child_regex in results:
             if isinstance(child_regex, Zero):
                 continue
             
@@ -82,10 +99,31 @@ class RegexOptimizer(TreeVisitor[Regex]):
         return Either(*result)
 
 
+class RegexCanonicalizer(RegexOptimizer):
+    """
+    RegexOptimizer, with the alternatives also sorted, so that equal languages
+    up to associativity, commutativity and idempotence end up as equal regexes
+    """
+
+    @TreeVisitor.handler(Either)
+    def visit_either(self, node: Either, results: typing.Sequence[Regex]) -> Regex:
+        result: Regex = super().visit_either(node, results)
+
+        if not isinstance(result, Either):
+            return result
+
+        # Different regexes with equal hashes may keep their order, which only costs sharing
+        return Either(*sorted(result.get_children(), key=hash))
+
+
 def optimize_regex(regex: Regex) -> Regex:
     return RegexOptimizer().visit(regex)
 
 
+def canonicalize_regex(regex: Regex) -> Regex:
+    return RegexCanonicalizer().visit(regex)
+
+
 __all__ = [
-    "optimize_regex",
+    "RegexOptimizer", "RegexCanonicalizer", "optimize_regex", "canonicalize_regex",
 ]
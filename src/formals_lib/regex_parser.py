@@ -1,9 +1,8 @@
 from __future__ import annotations
 import typing
 import io
-import dataclasses
+import re
 import enum
-import contextlib
 
 from . import regex
 
@@ -23,182 +22,184 @@ class RegexTokenType(enum.Enum):
     eof = enum.auto()
 
 
-@dataclasses.dataclass
-class RegexToken:
+class RegexToken(typing.NamedTuple):
     token_type: RegexTokenType
     value: typing.Any = None
 
 
+# One alternative per token kind, tried at every position.
+# Whitespace and unknown characters are skipped
+_TOKEN_RE: typing.Final[re.Pattern] = re.compile(r"""
+      (?P<space>\s+)
+    | (?P<op>[*+()])
+    | (?P<digit>\d)
+    | (?P<letter>[^\W\d_])
+    | \^\s*(?:
+          (?P<plus>\+)
+        | \{\s*(?P<min>\d+)\s*(?:(?P<comma>,)\s*(?P<max>\d+)?\s*)?\}
+        | (?P<power>\d+)
+      )
+    | (?P<bad_pow>\^)
+    | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+_OP_TOKENS: typing.Final[typing.Mapping[str, RegexToken]] = {
+    "*": RegexToken(RegexTokenType.star),
+    "+": RegexToken(RegexTokenType.add),
+    "(": RegexToken(RegexTokenType.lpar),
+    ")": RegexToken(RegexTokenType.rpar),
+}
+
+
+class _Frame:
+    """
+    An open parenthesized group (or the whole regex): the finished
+    alternatives, and the items of the alternative being read
+    """
+
+    __slots__ = ("alternatives", "items")
+
+    alternatives: typing.List[regex.Regex]
+    items: typing.List[regex.Regex]
+
+
+    def __init__(self):
+        self.alternatives = []
+        self.items = []
+
+
 class RegexParser:
-    _src: io.TextIOBase
-    _tokens: typing.Tuple[RegexToken, ...]
-    _pos: int
-    
+    """
+    An LL(1) parser: the source is tokenized in one pass, and then every
+    token decides what to do by itself, so there is no backtracking.
+    Open parentheses are kept on an explicit stack, so the nesting depth
+    is only limited by memory
+    """
+
+    _src: str
+    _tokens: typing.List[RegexToken]
+
     def __init__(self, src: str | io.TextIOBase):
-        if isinstance(src, str):
-            src = io.StringIO(src)
-        
+        if not isinstance(src, str):
+            src = src.read()
+
         self._src = src
-    
+
     def tokenize(self):
         if not hasattr(self, "_tokens"):
-            self._tokens = tuple(self._tokenize())
-    
-    def _tokenize(self) -> typing.Generator[RegexToken, None, None]:
-        def next_ch():
-            nonlocal ch
-            ch = self._src.read(1)
-
-        def skip_space():
-            nonlocal ch
-            
-            while ch.isspace():
-                next_ch()
-
-        ch: str = ""
-
-        lookup: typing.Final[typing.MappingView] = {
-            "*": RegexTokenType.star,
-            "+": RegexTokenType.add,
-            "(": RegexTokenType.lpar,
-            ")": RegexTokenType.rpar,
-        }
-
-        next_ch()
-        while ch:
-            skip_space()
-            
-            if ch in lookup:
-                yield RegexToken(lookup[ch])
-            elif ch.isdigit():
-                yield RegexToken(RegexTokenType.digit, int(ch))
-            elif ch.isalpha():
-                yield RegexToken(RegexTokenType.letter, ch)
-            elif ch == "^":
-                next_ch()
-                skip_space()
-                power: int = 0
-                if not ch.isdigit():
-                    raise RegexSyntaxError("Expected a number after '^'")
-                while ch.isdigit():
-                    power = power * 10 + int(ch)
-                    next_ch()
-                yield RegexToken(RegexTokenType.pow, power)
+            self._tokens = self._tokenize()
+
+    def _tokenize(self) -> typing.List[RegexToken]:
+        result: typing.List[RegexToken] = []
+        append = result.append
+
+        for match in _TOKEN_RE.finditer(self._src):
+            kind: str = match.lastgroup
+
+            if kind == "op":
+                append(_OP_TOKENS[match.group(kind)])
+            elif kind == "letter":
+                append(RegexToken(RegexTokenType.letter, match.group(kind)))
+            elif kind == "digit":
+                append(RegexToken(RegexTokenType.digit, int(match.group(kind))))
+            elif kind in ("space", "other"):
                 continue
-            next_ch()
-        
-        yield RegexToken(RegexTokenType.eof)
-    
-    def is_eof(self) -> bool:
-        return self._pos >= len(self._tokens)
-    
-    def cur(self) -> RegexToken:
-        return self.peek(0)
-    
-    def peek(self, n: int = 1) -> RegexToken:
-        pos = self._pos + n
-        if pos not in range(len(self._tokens)):
-            pos = -1
-        return self._tokens[pos]
-    
-    def next(self) -> None:
-        self._pos += 1
-    
-    def tell(self) -> int:
-        return self._pos
-    
-    def seek(self, pos: int) -> None:
-        self._pos = pos
-    
-    @contextlib.contextmanager
-    def maybe(self):
-        pos: int = self.tell()
-        try:
-            yield
-        except RegexSyntaxError:
-            self.seek(pos)
-    
-    def require_tok(self, token_type: RegexTokenType) -> typing.Any:
-        cur: RegexToken = self.cur()
-        if cur.token_type != token_type:
-            raise RegexSyntaxError(f"Expected {token_type.name} token, got {cur.token_type.name} instead")
-        self.next()
-        return cur.value
-    
+            elif kind == "bad_pow":
+                raise RegexSyntaxError("Expected a number, '+' or '{m,n}' after '^'")
+            elif match.group("plus") is not None:
+                append(RegexToken(RegexTokenType.pow, (1, None)))
+            elif match.group("power") is not None:
+                power: int = int(match.group("power"))
+                append(RegexToken(RegexTokenType.pow, (power, power)))
+            else:
+                min_count: int = int(match.group("min"))
+                max_count: int | None = min_count
+                if match.group("comma") is not None:
+                    max_count = int(match.group("max")) if match.group("max") is not None else None
+                append(RegexToken(RegexTokenType.pow, (min_count, max_count)))
+
+        append(RegexToken(RegexTokenType.eof))
+
+        return result
+
     def parse(self) -> regex.Regex:
         self.tokenize()
-        
-        self._pos = 0
-        
-        result: regex.Regex = self.parse_either()
-
-        self.require_tok(RegexTokenType.eof)
-        assert self.is_eof()
-        
-        return result
-    
-    def parse_either(self) -> regex.Regex:
-        items: typing.List[regex.Regex] = []
-        items.append(self.parse_concat())
-        while True:
-            with self.maybe():
-                self.require_tok(RegexTokenType.add)
-                items.append(self.parse_concat())
-                continue
-            break
-        if len(items) == 1:
-            return items[0]
-        return regex.Either(*items)
-    
-    def parse_concat(self) -> regex.Regex:
-        items: typing.List[regex.Regex] = []
-        items.append(self.parse_power())
-        while True:
-            with self.maybe():
-                items.append(self.parse_power())
-                continue
-            break
+
+        stack: typing.List[_Frame] = [_Frame()]
+        # Letters are interned anyway, this just skips the lookups
+        letters: typing.Dict[str, regex.Regex] = {}
+
+        for token in self._tokens:
+            token_type: RegexTokenType = token.token_type
+            frame: _Frame = stack[-1]
+
+            if token_type is RegexTokenType.letter:
+                letter: regex.Regex | None = letters.get(token.value)
+                if letter is None:
+                    letter = letters[token.value] = regex.Letter(token.value)
+                frame.items.append(letter)
+            elif token_type is RegexTokenType.digit:
+                frame.items.append(self._make_digit(token.value))
+            elif token_type is RegexTokenType.star:
+                self._require_item(frame, token)
+                frame.items[-1] = regex.Star(frame.items[-1])
+            elif token_type is RegexTokenType.pow:
+                self._require_item(frame, token)
+                frame.items[-1] = self._make_repeat(frame.items[-1], *token.value)
+            elif token_type is RegexTokenType.add:
+                frame.alternatives.append(self._finish_concat(frame, token))
+            elif token_type is RegexTokenType.lpar:
+                stack.append(_Frame())
+            elif token_type is RegexTokenType.rpar:
+                if len(stack) == 1:
+                    raise RegexSyntaxError("Unexpected token: rpar")
+                stack.pop()
+                stack[-1].items.append(self._finish_either(frame, token))
+            else:
+                assert token_type is RegexTokenType.eof
+                if len(stack) > 1:
+                    raise RegexSyntaxError("Expected rpar token, got eof instead")
+                return self._finish_either(frame, token)
+
+        assert False, "Unreachable: the tokens always end with eof"
+
+    @staticmethod
+    def _require_item(frame: _Frame, token: RegexToken) -> None:
+        if not frame.items:
+            raise RegexSyntaxError(f"Unexpected token: {token.token_type.name}")
+
+    @classmethod
+    def _finish_concat(cls, frame: _Frame, token: RegexToken) -> regex.Regex:
+        cls._require_item(frame, token)
+
+        items: typing.List[regex.Regex] = frame.items
+        frame.items = []
+
         if len(items) == 1:
             return items[0]
         return regex.Concat(*items)
-    
-    def parse_power(self) -> regex.Regex:
-        item: regex.Regex = self.parse_atomic()
-        while True:
-            cur: RegexToken = self.cur()
-            if cur.token_type == RegexTokenType.star:
-                item = regex.Star(item)
-            elif cur.token_type == RegexTokenType.pow:
-                if cur.value not in range(20):
-                    raise RegexSyntaxError(f"Repeat count too big: {cur.value}")
-                item = item.repeat(cur.value)
-            else:
-                break
-
-            self.next()
-        return item
-    
-    def parse_atomic(self) -> regex.Regex:
-        cur: RegexToken = self.cur()
-        if cur.token_type == RegexTokenType.lpar:
-            return self.parse_par_expr()
-        if cur.token_type == RegexTokenType.letter:
-            self.next()
-            return regex.Letter(cur.value)
-        if cur.token_type != RegexTokenType.digit:
-            raise RegexSyntaxError(f"Unexpected token: {cur.token_type.name}")
-        self.next()
-        if cur.value == 0:
+
+    @classmethod
+    def _finish_either(cls, frame: _Frame, token: RegexToken) -> regex.Regex:
+        frame.alternatives.append(cls._finish_concat(frame, token))
+
+        if len(frame.alternatives) == 1:
+            return frame.alternatives[0]
+        return regex.Either(*frame.alternatives)
+
+    @staticmethod
+    def _make_digit(value: int) -> regex.Regex:
+        if value == 0:
             return regex.Zero()
-        if cur.value == 1:
+        if value == 1:
             return regex.One()
-        raise RegexSyntaxError(f"{cur.value} is not a valid digit for regex")
-    
-    def parse_par_expr(self) -> regex.Regex:
-        self.require_tok(RegexTokenType.lpar)
-        result: regex.Regex = self.parse_either()
-        self.require_tok(RegexTokenType.rpar)
-        return result
+        raise RegexSyntaxError(f"{value} is not a valid digit for regex")
+
+    @staticmethod
+    def _make_repeat(item: regex.Regex, min_count: int, max_count: int | None) -> regex.Regex:
+        if max_count is not None and max_count < min_count:
+            raise RegexSyntaxError(f"Bad repeat bounds: {{{min_count},{max_count}}}")
+        return regex.Repeat(item, min_count, max_count)
 
 
 def parse_regex(src: str | io.TextIOBase) -> regex.Regex:
@@ -0,0 +1,468 @@
+from __future__ import annotations
+import typing
+import dataclasses
+import time
+from collections import ChainMap
+
+from .regex import *
+from .itree import TreeVisitor
+from .regex_optimize import RegexCanonicalizer
+
+
+# Gets a node whose children are usually rewritten already,
+# returns an equivalent replacement, or None if it doesn't apply
+RewriteRule = typing.Callable[["RegexRewriter", Regex], typing.Optional[Regex]]
+
+
+@dataclasses.dataclass
+class RewriteStats:
+    """
+    Accumulated over all apply() calls, so running one rewriter
+    over a corpus of regexes measures the whole corpus
+    """
+
+    regexes: int = 0
+    passes: int = 0
+    rewrites: typing.Dict[str, int] = dataclasses.field(default_factory=dict)
+    out_of_budget: int = 0
+    size_before: int = 0
+    size_after: int = 0
+    seconds: float = 0.
+
+    @property
+    def reduction(self) -> float:
+        """
+        The share of the nodes that were rewritten away
+        """
+
+        return 1. - self.size_after / self.size_before if self.size_before else 0.
+
+
+def _concat_of(items: typing.Sequence[Regex]) -> Regex:
+    if len(items) == 0:
+        return One()
+
+    if len(items) == 1:
+        return items[0]
+
+    return Concat(*items)
+
+
+def _either_of(items: typing.Sequence[Regex]) -> Regex:
+    if len(items) == 0:
+        return Zero()
+
+    if len(items) == 1:
+        return items[0]
+
+    return Either(*items)
+
+
+def _unstar(item: Regex) -> Regex | None:
+    """
+    An r such that r* is item*, if item is One, r* or r^{0|1,n}.
+    One becomes None, since it adds nothing to a star
+    """
+
+    if isinstance(item, One):
+        return None
+
+    if isinstance(item, Star) or isinstance(item, Repeat) and item.min_count <= 1:
+        return item.get_children()[0]
+
+    return item
+
+
+def absorb_stars(rewriter: RegexRewriter, node: Regex) -> Regex | None:
+    """
+    (r*)* = (1 + r)* = (r^{0,n})* = r*, (r* + s*)* = (r*s*)* = (r + s)*
+    and (r*)^{m,n} = r*
+    """
+
+    if isinstance(node, Repeat):
+        child: Regex = node.get_children()[0]
+        return child if isinstance(child, Star) and node.max_count != 0 else None
+
+    if not isinstance(node, Star):
+        return None
+
+    child = node.get_children()[0]
+
+    # A concatenation of nullables is between their union and its star
+    if isinstance(child, Either) or isinstance(child, Concat) and all(map(rewriter.nullable, child.get_children())):
+        items: typing.Sequence[Regex] = child.get_children()
+    else:
+        items = (child,)
+
+    result: typing.List[Regex] = [item for item in map(_unstar, items) if item is not None]
+
+    if result == list(items):
+        return None
+
+    return Star(_either_of(result)) if result else One()
+
+
+def _factor(node: Regex, head: bool) -> Regex | None:
+    if not isinstance(node, Either):
+        return None
+
+    groups: typing.Dict[Regex, typing.List[typing.Sequence[Regex]]] = {}
+
+    for child in node.get_children():
+        items: typing.Sequence[Regex] = child.get_children() if isinstance(child, Concat) else (child,)
+        groups.setdefault(items[0] if head else items[-1], []).append(items)
+
+    if len(groups) == len(node.get_children()):
+        return None
+
+    result: typing.List[Regex] = []
+
+    for common, members in groups.items():
+        if len(members) == 1:
+            result.append(_concat_of(members[0]))
+            continue
+
+        if not head:
+            members = [items[::-1] for items in members]
+
+        # The whole common prefix goes at once: its first item alone may not shrink anything
+        common_len: int = 1
+        while all(
+            common_len < len(items) and items[common_len] is members[0][common_len]
+            for items in members
+        ):
+            common_len += 1
+
+        prefix: typing.Sequence[Regex] = members[0][:common_len]
+        rests: typing.List[Regex] = [_concat_of(items[common_len:][::1 if head else -1]) for items in members]
+
+        if head:
+            result.append(Concat(*prefix, Either(*rests)))
+        else:
+            result.append(Concat(Either(*rests), *prefix[::-1]))
+
+    return _either_of(result)
+
+
+def factor_prefixes(rewriter: RegexRewriter, node: Regex) -> Regex | None:
+    """
+    ab + ac = a(b + c)
+    """
+
+    return _factor(node, head=True)
+
+
+def factor_suffixes(rewriter: RegexRewriter, node: Regex) -> Regex | None:
+    """
+    ba + ca = (b + c)a
+    """
+
+    return _factor(node, head=False)
+
+
+def drop_subsumed(rewriter: RegexRewriter, node: Regex) -> Regex | None:
+    """
+    r + s = r if s is within r, and r*s = sr* = r* if s is also nullable,
+    as far as RegexRewriter.subsumes can tell
+    """
+
+    if isinstance(node, Either):
+        result: typing.List[Regex] = list(node.get_children())
+
+        # Out of several equal ones, the last one stays
+        for child in node.get_children():
+            if any(other is not child and rewriter.subsumes(other, child) for other in result):
+                result.remove(child)
+
+        return _either_of(result) if len(result) < len(node.get_children()) else None
+
+    if not isinstance(node, Concat):
+        return None
+
+    result = []
+
+    for child in node.get_children():
+        if result and rewriter.nullable(child) and rewriter.nullable(result[-1]):
+            if isinstance(result[-1], Star) and rewriter.subsumes(result[-1], child):
+                continue
+            if isinstance(child, Star) and rewriter.subsumes(child, result[-1]):
+                result[-1] = child
+                continue
+
+        result.append(child)
+
+    return _concat_of(result) if len(result) < len(node.get_children()) else None
+
+
+DEFAULT_RULES: typing.Final[typing.Mapping[str, RewriteRule]] = {
+    "absorb_stars": absorb_stars,
+    "drop_subsumed": drop_subsumed,
+    "factor_prefixes": factor_prefixes,
+    "factor_suffixes": factor_suffixes,
+}
+
+
+class _Nullable(TreeVisitor[Regex]):
+    warn_on_generic: typing.ClassVar[bool] = True
+    post_order: typing.ClassVar[bool] = True
+    memoize: typing.ClassVar[bool] = True
+
+    _table: typing.Dict[Regex, bool]
+
+
+    def __init__(self):
+        super().__init__()
+
+        self._table = {}
+
+    def memo_table(self) -> typing.MutableMapping[Regex, bool]:
+        return self._table
+
+    @TreeVisitor.handler(Letter)
+    @TreeVisitor.handler(Zero)
+    def visit_empty(self, node: Regex, results: typing.Sequence[bool]) -> bool:
+        return False
+
+    @TreeVisitor.handler(One)
+    @TreeVisitor.handler(Star)
+    def visit_nullable(self, node: Regex, results: typing.Sequence[bool]) -> bool:
+        return True
+
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat, results: typing.Sequence[bool]) -> bool:
+        return node.min_count == 0 or results[0]
+
+    @TreeVisitor.handler(Concat)
+    def visit_concat(self, node: Concat, results: typing.Sequence[bool]) -> bool:
+        return all(results)
+
+    @TreeVisitor.handler(Either)
+    def visit_either(self, node: Either, results: typing.Sequence[bool]) -> bool:
+        return any(results)
+
+
+class _RewritePass(RegexCanonicalizer):
+    """
+    A single bottom-up pass: the canonicalizer's rules go first at every node,
+    and then the rewriter's own, for as long as they apply
+    """
+
+    _rewriter: RegexRewriter
+    _memo: typing.MutableMapping[Regex, Regex]
+
+
+    def __init__(self, rewriter: RegexRewriter, memo: typing.MutableMapping[Regex, Regex]):
+        super().__init__()
+
+        self._rewriter = rewriter
+        self._memo = memo
+
+    def memo_table(self) -> typing.MutableMapping[Regex, Regex]:
+        return self._memo
+
+    @TreeVisitor.handler(Concat)
+    def visit_concat(self, node: Concat, results: typing.Sequence[Regex]) -> Regex:
+        return self._rewriter.rewrite_node(super().visit_concat(node, results))
+
+    @TreeVisitor.handler(Star)
+    def visit_star(self, node: Star, results: typing.Sequence[Regex]) -> Regex:
+        return self._rewriter.rewrite_node(super().visit_star(node, results))
+
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat, results: typing.Sequence[Regex]) -> Regex:
+        return self._rewriter.rewrite_node(super().visit_repeat(node, results))
+
+    @TreeVisitor.handler(Either)
+    def visit_either(self, node: Either, results: typing.Sequence[Regex]) -> Regex:
+        return self._rewriter.rewrite_node(super().visit_either(node, results))
+
+
+class RegexRewriter:
+    """
+    Shrinks regexes by rewriting them to a fixpoint: bottom-up passes
+    of canonicalize_regex with the rules on top are repeated until one
+    changes nothing. A rule's replacement is only taken if it's strictly
+    smaller, so this always terminates.
+
+    The pass results are memoized by subtree, both across the passes
+    and across apply() calls. Once the budget (the number of rewrites or
+    the time per apply() call) runs out, the current pass finishes without
+    the rules, and its result is returned: smaller, if not the smallest.
+    Such passes aren't memoized
+    """
+
+    rules: typing.Mapping[str, RewriteRule]
+    max_rewrites: int | None
+    time_budget: float | None
+    max_passes: int
+    max_depth: int
+    stats: RewriteStats
+    _memo: typing.Dict[Regex, Regex]
+    _nullable: _Nullable
+    _subsumes: typing.Dict[typing.Tuple[Regex, Regex], bool]
+    _rewrites_left: int | None
+    _deadline: float | None
+    _out_of_budget: bool
+
+
+    def __init__(self, rules: typing.Mapping[str, RewriteRule] = DEFAULT_RULES,
+                 max_rewrites: int | None = None, time_budget: float | None = None,
+                 max_passes: int = 100, max_depth: int = 16):
+        """
+        max_depth bounds the recursion of subsumes(), which gives up beyond it
+        """
+
+        assert max_passes > 0
+
+        self.rules = rules
+        self.max_rewrites = max_rewrites
+        self.time_budget = time_budget
+        self.max_passes = max_passes
+        self.max_depth = max_depth
+        self.stats = RewriteStats()
+        self._memo = {}
+        self._nullable = _Nullable()
+        self._subsumes = {}
+        self._rewrites_left = None
+        self._deadline = None
+        self._out_of_budget = False
+
+    def apply(self, regex: Regex) -> Regex:
+        started: float = time.perf_counter()
+
+        self._rewrites_left = self.max_rewrites
+        self._deadline = None if self.time_budget is None else started + self.time_budget
+        self._out_of_budget = False
+
+        result: Regex = regex
+
+        for _ in range(self.max_passes):
+            memo: typing.Dict[Regex, Regex] = {}
+            rewritten: Regex = _RewritePass(self, ChainMap(memo, self._memo)).visit(result)
+            self.stats.passes += 1
+
+            if self._out_of_budget:
+                result = rewritten
+                break
+
+            self._memo.update(memo)
+
+            if rewritten is result:
+                break
+            result = rewritten
+
+        if not self._out_of_budget:
+            self._memo[regex] = result
+
+        self.stats.regexes += 1
+        self.stats.out_of_budget += self._out_of_budget
+        self.stats.size_before += regex.size
+        self.stats.size_after += result.size
+        self.stats.seconds += time.perf_counter() - started
+
+        return result
+
+    def rewrite_node(self, node: Regex) -> Regex:
+        """
+        Applies the rules at the root of node, for as long as they shrink it
+        """
+
+        changed: bool = True
+
+        while changed and not self._check_budget():
+            changed = False
+
+            for name, rule in self.rules.items():
+                result: Regex | None = rule(self, node)
+                if result is None or result.size >= node.size:
+                    continue
+
+                self.stats.rewrites[name] = self.stats.rewrites.get(name, 0) + 1
+                if self._rewrites_left is not None:
+                    self._rewrites_left -= 1
+
+                node = result
+                changed = True
+                break
+
+        return node
+
+    def _check_budget(self) -> bool:
+        if not self._out_of_budget:
+            self._out_of_budget = (
+                self._rewrites_left is not None and self._rewrites_left <= 0
+                or self._deadline is not None and time.perf_counter() > self._deadline
+            )
+
+        return self._out_of_budget
+
+    def nullable(self, regex: Regex) -> bool:
+        return self._nullable.visit(regex)
+
+    def subsumes(self, big: Regex, small: Regex) -> bool:
+        """
+        Whether small's language is within big's. Only a syntactic check,
+        so False means "don't know"
+        """
+
+        return self._subsumes_rec(big, small, self.max_depth)
+
+    def _subsumes_rec(self, big: Regex, small: Regex, depth: int) -> bool:
+        if big is small or isinstance(small, Zero):
+            return True
+
+        if isinstance(small, One):
+            return self.nullable(big)
+
+        if depth == 0:
+            return False
+
+        result: bool | None = self._subsumes.get((big, small))
+        if result is not None:
+            return result
+
+        depth -= 1
+
+        if isinstance(small, Either):
+            result = all(self._subsumes_rec(big, child, depth) for child in small.get_children())
+        elif isinstance(big, Either):
+            result = any(self._subsumes_rec(child, small, depth) for child in big.get_children())
+        elif isinstance(big, Star):
+            result = self._subsumes_rec(big.get_children()[0], small, depth)
+
+            # big is closed under concatenation, so it holds any iteration of its subsets
+            if not result and isinstance(small, (Star, Repeat)):
+                result = self._subsumes_rec(big, small.get_children()[0], depth)
+            elif not result and isinstance(small, Concat):
+                result = all(self._subsumes_rec(big, child, depth) for child in small.get_children())
+        elif isinstance(big, Concat) and isinstance(small, Concat) \
+                and len(big.get_children()) == len(small.get_children()):
+            result = all(
+                self._subsumes_rec(big_child, small_child, depth)
+                for big_child, small_child in zip(big.get_children(), small.get_children())
+            )
+        else:
+            result = False
+
+        self._subsumes[(big, small)] = result
+        return result
+
+    def clear(self) -> None:
+        """
+        Forgets the memoized results
+        """
+
+        self._memo.clear()
+        self._subsumes.clear()
+        self._nullable = _Nullable()
+
+
+def rewrite_regex(regex: Regex, **kwargs) -> Regex:
+    return RegexRewriter(**kwargs).apply(regex)
+
+
+__all__ = [
+    "RewriteRule", "RewriteStats", "RegexRewriter", "DEFAULT_RULES",
+    "absorb_stars", "factor_prefixes", "factor_suffixes", "drop_subsumed",
+    "rewrite_regex",
+]
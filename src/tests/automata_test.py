@@ -8,16 +8,31 @@ import string
 import itertools
 import re
 import sys
+import tempfile
+import os
+import gc
 
 import utils
 from formals_lib.regex import *
 from formals_lib.automata import *
 from formals_lib.automata_ops import *
 from formals_lib.automata_determ import *
+from formals_lib.automata_determ import MakeDeterministic, MakeFullDFA
 from formals_lib.automata_minimize import *
 from formals_lib.regex_automata import *
+from formals_lib.regex_automata import AutomataToRegexConverter
+from formals_lib.regex_dag import LetRegex
+from formals_lib.regex_derivatives import BrzozowskiDFABuilder
+from formals_lib.regex_optimize import canonicalize_regex
 from formals_lib.regex_parser import parse_regex
 from formals_lib.automata_cmp import compare_automatas
+from formals_lib.automata_compact import *
+from formals_lib.automata_match import *
+from formals_lib import automata_batch
+from formals_lib.automata_search import *
+from formals_lib.automata_nfa import *
+from formals_lib.automata_lazy import *
+from formals_lib.automata_multi import *
 
 from regex_to_re import regex_to_re
 
@@ -234,6 +249,129 @@ class AutomataTest(unittest.TestCase):
                 
                 func(self.aut1, word)
     
+    def test_step(self):
+        aut: Automata = self.aut1
+        
+        self.assertTrue(aut.is_deterministic())
+        self.assertIs(aut.step((0, 0), "a"), aut[1, 0])
+        self.assertIs(aut[1, 1].step("b"), aut[1, 0])
+        self.assertIsNone(aut[1, 1].step("c", or_none=True))
+        self.assertRaises(LookupError, aut[1, 1].step, "c")
+        
+        extra: Edge = aut.link((0, 0), (0, 0), "a")
+        self.assertFalse(aut[0, 0].is_deterministic())
+        self.assertFalse(aut.is_deterministic())
+        self.assertRaises(LookupError, aut.step, (0, 0), "a")
+        
+        aut.unlink(extra)
+        self.assertTrue(aut.is_deterministic())
+        self.assertIs(aut.step((0, 0), "a"), aut[1, 0])
+        
+        aut.link((0, 0), (1, 1), "ab")
+        self.assertFalse(aut.is_deterministic())
+    
+    def test_slots(self):
+        aut: Automata = self.aut1
+        node: Node = aut.make_node()
+        
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertEqual(len(node.out), 0)
+        self.assertEqual(len(node.inc), 0)
+        # Nothing is allocated for the edges until there are some
+        self.assertIsNone(node._out)
+        self.assertIsNone(node._inc)
+        self.assertIsNone(node._by_label)
+        
+        other: Node = aut.make_node()
+        edge: Edge = aut.link(node, other, "".join(["a", "b"]))
+        self.assertFalse(hasattr(edge, "__dict__"))
+        self.assertIs(edge.label, "ab")
+        self.assertIsNotNone(node._out)
+        self.assertIsNotNone(other._inc)
+        self.assertIsNone(node._inc)
+        self.assertIsNone(other._out)
+        # Labels are interned, so equal ones are the same object
+        self.assertIs(aut.link(other, node, "".join(["a", "b"])).label, edge.label)
+        self.assertEqual(edge, Edge("ab", node, other))
+        self.assertRaises(dataclasses.FrozenInstanceError, setattr, edge, "label", "b")
+        
+        # Only suspends the collector when asked to
+        self.assertEqual(len(aut.copy().get_edges()), len(aut.get_edges()))
+        self.assertTrue(gc.isenabled())
+        
+        with bulk_build():
+            self.assertFalse(gc.isenabled())
+            self.assertTrue(self.check_word(regex_to_automata("(a+b)*c"), "abc"))
+        self.assertTrue(gc.isenabled())
+    
+    def test_indexes(self):
+        aut: Automata = self.aut1
+        
+        self.assertEqual(set(aut.get_terms()), {aut[0, 1]})
+        self.assertEqual(
+            {e.src.key for e in aut.get_in_edges((0, 0))},
+            {(0, 1), (1, 0)}
+        )
+        
+        aut[1, 1].is_term = True
+        aut[0, 1].is_term = False
+        self.assertEqual(set(aut.get_terms()), {aut[1, 1]})
+        
+        aut.remove_nodes([(1, 1), aut[1, 1]])
+        self.assertEqual(set(aut.get_terms()), set())
+        self.assertEqual(len(aut.get_edges()), 4)
+        self.assertEqual(
+            {e.src.key for e in aut.get_in_edges((1, 0))},
+            {(0, 0)}
+        )
+        
+        for edge in aut.get_edges():
+            self.assertIn(edge, edge.src.out)
+            self.assertIn(edge, edge.dst.inc)
+    
+    def test_copy(self):
+        for i in range(3):
+            with self.subTest(i=i):
+                aut: Automata = getattr(self, f"aut{i}")
+                aut_copy: Automata = aut.copy()
+                
+                self.assertEqual(aut_copy.start.key, aut.start.key)
+                self.assertEqual(
+                    {(n.key, n.is_term) for n in aut_copy.get_nodes()},
+                    {(n.key, n.is_term) for n in aut.get_nodes()},
+                )
+                self.assertEqual(
+                    {(e.src.key, e.dst.key, e.label) for e in aut_copy.get_edges()},
+                    {(e.src.key, e.dst.key, e.label) for e in aut.get_edges()},
+                )
+        
+        aut = Automata("a")
+        aut.make_node(1)
+        self.assertNotIn(aut.make_node().key, (0, 1))
+    
+    def test_in_place(self):
+        aut: Automata = self.aut2
+        edges_cnt: int = len(aut.get_edges())
+        
+        self.assertIsNot(make_edges_01(aut), aut)
+        self.assertEqual(len(aut.get_edges()), edges_cnt)
+        
+        self.assertIs(aut_star(aut, in_place=True), aut)
+        self.assertEquivAutomatas(
+            aut_star(self.define_aut2()),
+            aut,
+            wordlist=self.basic_wordlist,
+            rand_wl_size=50,
+            name="aut2 aut_star in place"
+        )
+        
+        expected: Automata = minimize(self.define_aut2())
+        self.assertTrue(compare_automatas(minimize(self.aut1, in_place=True), self.define_aut1()))
+        self.assertTrue(compare_automatas(
+            minimize(make_dfa(self.define_aut2(), in_place=True), in_place=True),
+            expected
+        ))
+    
     def test_transform_edges_01(self):
         self.assertEquivAutomatas(
             self.aut2,
@@ -294,6 +432,59 @@ class AutomataTest(unittest.TestCase):
         for word in self.random_wordlist(fdfa.alphabet, size=50):
             self.assertAccepts(fdfa, word)
 
+    def test_dfa_subsets(self):
+        dfa: Automata = make_dfa(self.aut2)
+        
+        self.assertEqual(sorted(node.key for node in dfa.get_nodes()), list(range(len(dfa))))
+        self.assertEqual(dfa.start.key, 0)
+        
+        # Preparing adds no nodes to it, so both runs number the same keys
+        aut: Automata = regex_to_automata("(ab+ba)*(1+a+ba)")
+        
+        for full in (False, True):
+            with self.subTest(full=full):
+                make: typing.Type[MakeDeterministic] = MakeFullDFA if full else MakeDeterministic
+                by_id = make(aut)
+                by_subset = make(aut, subset_keys=True)
+                ids: Automata = by_id.apply()
+                subsets: Automata = by_subset.apply()
+                
+                self.assertEqual(len(ids), len(subsets))
+                self.assertIn(aut.start.key, by_id.members(ids.start.key))
+                self.assertTrue(all(isinstance(node.key, frozenset) for node in subsets.get_nodes()))
+                
+                # The same subsets are reached by the same words
+                queue: typing.Deque[typing.Tuple[Node, Node]] = deque([(ids.start, subsets.start)])
+                seen: typing.Set[Node] = {ids.start}
+                
+                while queue:
+                    node, other = queue.popleft()
+                    
+                    self.assertEqual(by_id.members(node.key), other.key)
+                    self.assertEqual(by_subset.members(other.key), other.key)
+                    self.assertEqual(node.is_term, other.is_term)
+                    
+                    for letter in ids.alphabet:
+                        dst: Node | None = node.step(letter, or_none=True)
+                        other_dst: Node | None = other.step(letter, or_none=True)
+                        
+                        self.assertEqual(dst is None, other_dst is None)
+                        if dst is not None and dst not in seen:
+                            seen.add(dst)
+                            queue.append((dst, other_dst))
+                
+                self.assertEqual(len(seen), len(ids))
+                self.assertEqual(full, frozenset() in subsets)
+        
+        # The minimal DFA remembers the last 11 letters
+        aut = regex_to_automata("(a+b)*a(a+b)^10")
+        dfa = make_dfa(aut)
+        self.assertGreaterEqual(len(dfa), 2 ** 11)
+        self.assertEqual(len(minimize(dfa)), 2 ** 11)
+        
+        words: typing.List[str] = list(self.random_wordlist("ab", size=50, wordlen=15))
+        self.assertEqual(compile_automata(dfa).accepts_many(words), compile_nfa(aut).accepts_many(words))
+
     def test_regex(self):
         common_wordlist: typing.Final[typing.Tuple[str, ...]] = (
             "", "a", "b", "ab", "ba", "abc", "cab", "a+b", "0", "a b",
@@ -303,7 +494,9 @@ class AutomataTest(unittest.TestCase):
         regexes: typing.Final[typing.Tuple[Regex, ...]] = (
             "0", "1", "a", "ab", "a+b", "a*", "(a)", "(ab)", "(a+b)",
             "(a)*", "(a*)", "(a + b) c", "(a + b)^3", "(a + b)*",
-            "a(b*a)^2*",
+            "a(b*a)^2*", "(a*b)*", "((a+1)*b*)*c", "(1+a)(b+1)*",
+            "(ab+b)^{1,3}", "(a+1)^{2,}b", "(a*b)^+", "(ab)^{0,2}", "(a^+b)^+",
+            "(ab*)^2", "(ca*)^{0,2}b",
         )
         
         for regex in regexes:
@@ -316,6 +509,70 @@ class AutomataTest(unittest.TestCase):
                 self.assertEquivRegex(regex,   aut, wordlist=common_wordlist, rand_wl_size=25)
                 self.assertEquivRegex(regex_2, aut, wordlist=common_wordlist, rand_wl_size=25)
     
+    def test_regex_linear(self):
+        size: int = 1000
+        regex: Regex = Concat(*(Star(Either(Letter("a"), Letter("b"))) for _ in range(size)))
+        
+        aut: Automata = regex_to_automata(regex)
+        
+        # Linear in the regex size, which is 5 nodes per term here
+        self.assertLessEqual(len(aut), 7 * size + 1)
+        self.assertLessEqual(len(list(aut.get_edges())), 9 * size + 1)
+        self.assertTrue(all(isinstance(node.key, int) for node in aut.get_nodes()))
+        # Python's re backtracks exponentially on this one, so no assertEquivRegex
+        for word in ("", "ab", "ba" * 10, "a" * 20):
+            self.assertTrue(self.check_word(aut, word))
+    
+    def test_regex_repeat(self):
+        aut: Automata = regex_to_automata("(a+b)^1000c^{2,}")
+        
+        # Still linear: the 1000 copies are stamped out of a single fragment
+        self.assertLessEqual(len(aut), 6 * 1000 + 10)
+        self.assertTrue(self.check_word(aut, "ab" * 500 + "cc"))
+        self.assertTrue(self.check_word(aut, "a" * 1000 + "ccccc"))
+        self.assertFalse(self.check_word(aut, "a" * 999 + "cc"))
+        self.assertFalse(self.check_word(aut, "a" * 1000 + "c"))
+        for word in ("c", "abc", "b" * 20 + "c"):
+            self.assertFalse(self.check_word(aut, word))
+        
+        # r^{0,0} leaves nothing of r behind
+        aut = regex_to_automata("(abc)^{0,0}d")
+        self.assertEqual(len(aut), len(aut_trim(aut)))
+        self.assertTrue(self.check_word(aut, "d"))
+        self.assertFalse(self.check_word(aut, "abcd"))
+    
+    def test_glushkov(self):
+        common_wordlist: typing.Final[typing.Tuple[str, ...]] = (
+            "", "a", "b", "ab", "ba", "abc", "cab", "aaab", "abab", "bbba", "abba", "ac", "ca",
+        )
+
+        regexes: typing.Final[typing.Tuple[Regex, ...]] = (
+            "0", "1", "a", "ab", "a+b", "a*", "(a + b) c", "(a + b)^3", "(a + b)*",
+            "a(b*a)^2*", "(a*b)*", "((a+1)*b*)*c", "(1+a)(b+1)*", "0*a + 0b",
+            "(ab+b)^{1,3}", "(a+1)^{2,}b", "(a*b)^+", "(a^+b)^+",
+            "(ab*)^2", "(ca*)^{0,2}b",
+        )
+
+        def count_letters(regex: Regex) -> int:
+            if isinstance(regex, Letter):
+                return 1
+            if isinstance(regex, Repeat):
+                # Every iteration gets positions of its own
+                return count_letters(regex.get_children()[0]) * (regex.max_count or max(regex.min_count, 1))
+            return sum(map(count_letters, regex.get_children()))
+
+        for regex in regexes:
+            with self.subTest(regex=regex):
+                regex = parse_regex(regex)
+
+                aut: Automata = regex_to_glushkov(regex)
+
+                self.assertEqual(len(aut), count_letters(regex) + 1)
+                self.assertTrue(all(edge.is_letter() for edge in aut.get_edges()))
+                self.assertEquivRegex(regex, aut, wordlist=common_wordlist, rand_wl_size=25)
+                self.assertTrue(compare_automatas(aut, regex_to_automata(regex)))
+                self.assertEquivRegex(regex, make_dfa(aut), wordlist=common_wordlist, rand_wl_size=25)
+
     def test_regex_2(self):
         for i in range(2):
             with self.subTest(i=i):
@@ -324,16 +581,73 @@ class AutomataTest(unittest.TestCase):
         
                 self.assertEquivRegex(regex, aut, rand_wl_size=500)
     
-    @unittest.skip
-    def test_regex_3(self):
-        # Debugging shows that it does work, albeit slowly, with ~60 nodes
-        # and god knows how many edges. It appears to have issues related to
-        # memory usage. I decided to just skip the test with this one
+    def test_regex_orders(self):
+        orders: typing.List[EliminationOrder] = [
+            QueueOrder(), MinDegreeOrder(), MinWeightOrder(),
+            DelayHighFanOrder(), DelayHighFanOrder(MinDegreeOrder(), max_fan=1),
+        ]
+        auts: typing.List[Automata] = [self.aut0, self.aut1]
+        auts.extend(map(regex_to_automata, ("(a+b)*a(a+b)^3", "(ab+ba)*(a+1)b*", "0", "1", "a")))
+        
+        # A terminal that can't be reached, which leaves no terminal after trimming
+        aut = Automata("a")
+        aut.link(aut.start, aut.make_node(), "a")
+        aut.make_node(term=True)
+        auts.append(aut)
+        
+        for i, aut in enumerate(auts):
+            for order in orders:
+                with self.subTest(i=i, order=order):
+                    regex: Regex = automata_to_regex(aut, order=order)
+                    self.assertTrue(compare_automatas(aut, regex_to_automata(regex, alphabet=aut.alphabet)))
         
+        # The states go strictly by priority
+        class KeyOrder(EliminationOrder):
+            def priority(self, node: Node) -> str:
+                return str(node.key)
+        
+        converter = AutomataToRegexConverter(regex_to_automata("(a+b)*a(a+b)^3"), order=KeyOrder())
+        popped: typing.List[Node] = []
+        find_target = converter._find_target
+        converter._find_target = lambda: popped.append(find_target()) or popped[-1]
+        
+        self.assertTrue(compare_automatas(regex_to_automata(converter.apply()), regex_to_automata("(a+b)*a(a+b)^3")))
+        self.assertGreater(len(popped), 2)
+        self.assertEqual([node.key for node in popped], sorted((node.key for node in popped), key=str))
+    
+    def test_regex_3(self):
+        # About 4 million nodes as a tree, but only a few hundred distinct ones.
+        # The expanded text is too long for re, so the words are checked
+        # with derivatives, which work on the DAG as is
         aut: Automata = self.aut2
-        regex: Regex = automata_to_regex(aut)
-
-        self.assertEquivRegex(regex, aut, rand_wl_size=100)
+        let: LetRegex = automata_to_let_regex(aut)
+        
+        self.assertLess(let.dag_size(), 10 ** 3)
+        self.assertLess(let.text_length(), 10 ** 4)
+        self.assertGreater(let.expanded_length(), 10 ** 6)
+        
+        words: typing.List[str] = list(self.basic_wordlist)
+        words.extend(self.random_wordlist(aut.alphabet, size=100, wordlen=7))
+        # Random walks, for some accepted words too
+        for _ in range(100):
+            node, word = aut.start, ""
+            for _ in range(int(random.expovariate(1 / 3))):
+                edges: typing.List[Edge] = list(node.out)
+                if not edges:
+                    break
+                edge: Edge = random.choice(edges)
+                node, word = edge.dst, word + edge.label
+            words.append(word)
+        
+        builder = BrzozowskiDFABuilder()
+        regex: Regex = canonicalize_regex(let.body)
+        
+        for word in words:
+            derivative: Regex = regex
+            for letter in word:
+                derivative = builder.derivative(derivative, letter)
+            
+            self.assertEqual(builder.nullable(derivative), self.check_word(aut, word), f"Disagreed on '{word}'")
     
     def test_minimize(self):
         for i in range(3):
@@ -356,7 +670,7 @@ class AutomataTest(unittest.TestCase):
         regexes: typing.Final[typing.Tuple[Regex, ...]] = (
             "0", "1", "a", "ab", "a+b", "a*", "(a)", "(ab)", "(a+b)",
             "(a)*", "(a*)", "(a + b) c", "(a + b)^3", "(a + b)*",
-            "a(b*a)^2*",
+            "a(b*a)^2*", "(a*b)*", "((a+1)*b*)*c", "(1+a)(b+1)*",
         )
         
         for regex in regexes:
@@ -366,6 +680,242 @@ class AutomataTest(unittest.TestCase):
                 
                 self.assertTrue(compare_automatas(aut, aut2))
 
+    
+    def test_compact(self):
+        for i in range(3):
+            with self.subTest(i=i):
+                aut: Automata = getattr(self, f"aut{i}")
+                compact: CompactAutomata = compact_automata(aut)
+                
+                self.assertEqual(len(compact), len(aut))
+                self.assertEqual(compact.edge_count(), len(aut.get_edges()))
+                self.assertEquivAutomatas(
+                    aut, compact.to_automata(), self.basic_wordlist, rand_wl_size=50
+                )
+                
+                dfa: CompactAutomata = make_dfa(compact)
+                self.assertTrue(dfa.is_deterministic())
+                self.assertEquivAutomatas(
+                    aut, dfa.to_automata(), self.basic_wordlist, rand_wl_size=50
+                )
+                
+                min_aut: CompactAutomata = minimize(compact)
+                self.assertEqual(len(min_aut), len(minimize(aut)))
+                self.assertEquivAutomatas(
+                    aut, min_aut.to_automata(), self.basic_wordlist, rand_wl_size=50
+                )
+                
+                self.assertEqual(len(aut_trim(compact)), len(aut_trim(aut)))
+                self.assertTrue(compare_automatas(compact, aut))
+                self.assertTrue(compare_automatas(min_aut, dfa))
+        
+        self.assertFalse(compare_automatas(
+            compact_automata(self.aut0), compact_automata(self.aut1)
+        ))
+
+    
+    def test_compile(self):
+        for i in range(3):
+            with self.subTest(i=i):
+                aut: Automata = getattr(self, f"aut{i}")
+                matcher: DFAMatcher = aut.compile()
+                
+                words: typing.List[str] = list(self.basic_wordlist)
+                words.extend(self.random_wordlist(aut.alphabet, size=100, wordlen=7))
+                
+                self.assertEqual(
+                    matcher.accepts_many(words),
+                    [self.check_word(aut, word) for word in words]
+                )
+                
+                for word in words:
+                    half: int = len(word) // 2
+                    state: int = matcher.prefix_state(word[:half])
+                    self.assertEqual(matcher.accepts(word[half:], state), self.check_word(aut, word))
+        
+        matcher: DFAMatcher = compile_automata(regex_to_automata("a(b+c)*"))
+        self.assertTrue(matcher.accepts("abcb"))
+        self.assertFalse(matcher.accepts("abd"))
+        self.assertFalse(matcher.accepts("ba"))
+        self.assertRaises(dataclasses.FrozenInstanceError, setattr, matcher, "start", 1)
+
+    
+    def test_nfa(self):
+        auts: typing.List[Automata] = [self.aut0, self.aut1, self.aut2]
+        auts.extend(map(regex_to_automata, ("a(b*a)^2*", "(a + b)*a(a + b)^5", "1", "0")))
+        
+        for i, aut in enumerate(auts):
+            with self.subTest(i=i):
+                matcher: NFAMatcher = compile_nfa(aut)
+                
+                words: typing.List[str] = list(self.basic_wordlist)
+                words.extend(self.random_wordlist(aut.alphabet or "a", size=100, wordlen=7))
+                
+                self.assertEqual(
+                    matcher.accepts_many(words),
+                    [self.check_word(aut, word) for word in words]
+                )
+                
+                # The visited stamps must not leak between steps
+                for word in words[:20]:
+                    states = matcher.initial_states()
+                    for letter in word:
+                        states = matcher.step(states, letter)
+                    self.assertEqual(states, matcher.prefix_states(word))
+        
+        # A long epsilon chain is closed in one linear pass per step
+        aut = Automata("a")
+        nodes: typing.List[Node] = [aut.start] + [aut.make_node() for _ in range(10**4)]
+        for src, dst in zip(nodes, nodes[1:]):
+            aut.link(src, dst, "")
+        aut.link(nodes[-1], aut.start, "a")
+        nodes[-1].is_term = True
+        
+        matcher = compile_nfa(aut)
+        self.assertEqual(len(matcher.initial_states()), len(nodes))
+        self.assertTrue(matcher.accepts("a" * 100))
+    
+    def test_lazy_dfa(self):
+        for i in range(3):
+            with self.subTest(i=i):
+                aut: Automata = getattr(self, f"aut{i}")
+                matcher: LazyDFAMatcher = compile_lazy_dfa(aut)
+                
+                words: typing.List[str] = list(self.basic_wordlist)
+                words.extend(self.random_wordlist(aut.alphabet, size=100, wordlen=7))
+                
+                self.assertEqual(
+                    matcher.accepts_many(words),
+                    [self.check_word(aut, word) for word in words]
+                )
+                self.assertGreater(matcher.stats.hits, 0)
+        
+        aut: Automata = regex_to_automata("(a+b)*a(a+b)^10")
+        words = list(self.random_wordlist("ab", size=50, wordlen=40))
+        expected: typing.List[bool] = compile_nfa(aut).accepts_many(words)
+        
+        for policy in EvictionPolicy:
+            with self.subTest(policy=policy):
+                matcher = compile_lazy_dfa(aut, max_states=4, policy=policy)
+                
+                self.assertEqual(matcher.accepts_many(words), expected)
+                self.assertLessEqual(matcher.cached_states_cnt(), 4)
+                self.assertGreater(matcher.stats.evictions, 0)
+        
+        matcher = LazyDFAMatcher(aut, max_states=2, thrash_ratio=0.)
+        self.assertTrue(matcher.accepts("b" * 5 + "a" * 11))
+        self.assertFalse(matcher.accepts("a" + "b" * 15))
+        self.assertGreater(matcher.stats.fallback_steps, 0)
+    
+    def test_multi(self):
+        patterns: typing.List[Automata | str] = [
+            self.aut0, self.aut1, self.aut2,
+            "a*", "(a+b)*b", "ab+ba", "1", "a(a+b)*a+a",
+        ]
+        matchers: typing.List[DFAMatcher] = [
+            compile_automata(pattern if isinstance(pattern, Automata) else regex_to_automata(pattern))
+            for pattern in patterns
+        ]
+        matcher: MultiPatternMatcher = compile_patterns(patterns)
+        
+        self.assertEqual(matcher.patterns_cnt, len(patterns))
+        
+        words: typing.List[str] = list(self.basic_wordlist)
+        words.extend(self.random_wordlist(matcher.alphabet + "z", size=300, wordlen=7))
+        
+        for word in words:
+            with self.subTest(word=word):
+                self.assertEqual(
+                    matcher.match(word),
+                    {i for i, single in enumerate(matchers) if single.accepts(word)}
+                )
+        
+        self.assertEqual(compile_patterns(["a", "a"]).match("a"), {0, 1})
+        self.assertEqual(compile_patterns([]).match(""), frozenset())
+        
+        # Both matchers walk the same kind of table
+        self.assertIsInstance(matcher, TableMatcher)
+        self.assertEqual(matcher.prefix_state("z"), matcher.sink)
+        self.assertEqual(matcher.matching(matcher.sink), frozenset())
+        self.assertRaises(dataclasses.FrozenInstanceError, setattr, matcher, "patterns_cnt", 1)
+    
+    @unittest.skipIf(automata_batch.np is None, "numpy is not available")
+    def test_batch(self):
+        for i in range(3):
+            with self.subTest(i=i):
+                aut: Automata = getattr(self, f"aut{i}")
+                matcher = automata_batch.compile_batch_matcher(aut, chunk_size=64)
+                
+                words: typing.List[str] = list(self.basic_wordlist)
+                words.extend(self.random_wordlist(aut.alphabet + "z", size=300, wordlen=7))
+                
+                self.assertEqual(
+                    matcher.accepts_batch(words).tolist(),
+                    [self.check_word(aut, word) for word in words]
+                )
+        
+        # The alphabet doesn't fit into latin-1, while the words do
+        aut = regex_to_automata("aā*")
+        matcher = automata_batch.compile_batch_matcher(aut)
+        words = ["a", "", "b", "aā", "aāā", "āa", "ÿ"]
+        self.assertEqual(matcher.accepts_batch(words).tolist(), [self.check_word(aut, word) for word in words])
+        self.assertEqual(matcher.accepts_batch(["a", "ab"]).tolist(), [True, False])
+
+    
+    @staticmethod
+    def brute_find_all(matcher: DFAMatcher, buffer: bytes) -> typing.List[typing.Tuple[int, int]]:
+        result: typing.List[typing.Tuple[int, int]] = []
+        pos: int = 0
+        
+        while pos <= len(buffer):
+            match: typing.Tuple[int, int] | None = None
+            
+            for start in range(pos, len(buffer) + 1):
+                ends: typing.List[int] = [
+                    end for end in range(start, len(buffer) + 1)
+                    if matcher.accepts(buffer[start:end].decode("latin-1"))
+                ]
+                
+                if ends:
+                    match = (start, ends[-1])
+                    break
+            
+            if match is None:
+                break
+            
+            result.append(match)
+            pos = match[1] if match[1] > match[0] else match[1] + 1
+        
+        return result
+    
+    def test_search(self):
+        patterns: typing.Final[typing.Tuple[str, ...]] = (
+            "ab", "a*b", "(ab+ba)*", "a(b+c)*d + bc", "abcd + c", "(a+b)*c(a+b)^2", "0", "1",
+        )
+        
+        for pattern in patterns:
+            with self.subTest(pattern=pattern):
+                searcher = AutomataSearcher(pattern)
+                matcher: DFAMatcher = regex_to_automata(pattern).compile()
+                
+                for word in self.random_wordlist("abcdx", size=50, wordlen=10):
+                    buffer: bytes = word.encode("latin-1")
+                    
+                    self.assertEqual(
+                        list(searcher.finditer(buffer)),
+                        self.brute_find_all(matcher, buffer),
+                        f"Mismatch on '{word}'"
+                    )
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path: str = os.path.join(tmp_dir, "haystack.txt")
+            with open(path, "wb") as f:
+                f.write(b"xx abab x ba abba\n" * 100)
+            
+            spans = list(find_all_in_file("(ab+ba)(ab+ba)*", path))
+            self.assertEqual(len(spans), 300)
+            self.assertEqual(spans[:4], [(3, 7), (10, 12), (13, 17), (21, 25)])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,9 +1,18 @@
 from __future__ import annotations
 import typing
 import unittest
+import itertools
+import io
+import sys
 
 import utils
-from formals_lib import regex, regex_parser
+from formals_lib import regex, regex_parser, regex_automata, regex_bitparallel, regex_derivatives, regex_cache, \
+    regex_rewrite, regex_dag
+from formals_lib.automata_lazy import EvictionPolicy
+from formals_lib.regex_optimize import optimize_regex
+from formals_lib.automata_minimize import minimize
+from formals_lib.automata_match import compile_automata
+from formals_lib.automata_cmp import compare_automatas
 
 
 class RegexTest(unittest.TestCase):
@@ -32,6 +41,20 @@ class RegexTest(unittest.TestCase):
         self.assertNotEqual(self.regex1_tree, self.regex2)
         self.assertNotEqual(self.regex1, self.regex2)
 
+    def test_hash_consing(self):
+        self.assertIs(self.regex1_tree, self.regex1)
+        self.assertIs(regex.Letter("a") * regex.Letter("b"), regex_parser.parse_regex("ab"))
+        self.assertIs(regex.Zero(), regex.Zero())
+        self.assertIsNot(regex.Zero(), regex.One())
+        self.assertIsNot(regex.Concat(regex.Letter("a")), regex.Either(regex.Letter("a")))
+
+        self.assertEqual(self.regex1.size, 7)
+        self.assertEqual((self.regex1 ** 3).size, 7 + 1)
+        self.assertEqual(len({self.regex1, self.regex1_tree, self.regex2}), 2)
+
+        with self.assertRaises(AttributeError):
+            self.regex1.letter = "a"
+
     def test_parse_reconstruct(self):
         parse = regex_parser.parse_regex
         reconstruct = regex.reconstruct_regex
@@ -72,18 +95,288 @@ class RegexTest(unittest.TestCase):
             regex.Either(regex.Letter("a"), regex.Letter("b")), regex.Letter("c")
         ))
 
-        self.assertEqual(parse("a^2"), regex.Concat(
-            regex.Letter("a"),
-            regex.Letter("a"),
-        ))
+        self.assertEqual(parse("a^2"), regex.Repeat(regex.Letter("a"), 2, 2))
+        self.assertEqual(parse("a^+"), regex.Repeat(regex.Letter("a"), 1, None))
+        self.assertEqual(parse("a^{2, 5}"), regex.Repeat(regex.Letter("a"), 2, 5))
+        self.assertEqual(parse("a^{2,}"), regex.Repeat(regex.Letter("a"), 2, None))
+        self.assertEqual(parse("a^1000"), regex.Letter("a") ** 1000)
+        self.assertRaises(regex_parser.RegexSyntaxError, parse, "a^{5,2}")
+        self.assertRaises(regex_parser.RegexSyntaxError, parse, "a^{2")
+        self.assertRaises(regex_parser.RegexSyntaxError, parse, "a^")
+
+        for bad in ("", "()", "a+", "+a", "(a", "a)", "*a", "a(*b)", "(a+)b"):
+            with self.subTest(bad=bad):
+                self.assertRaises(regex_parser.RegexSyntaxError, parse, bad)
+
+        # No recursion, so the depth is unlimited
+        depth: int = 10 ** 5
+        self.assertIs(parse("(" * depth + "a" + ")" * depth), regex.Letter("a"))
+        self.assertEqual(parse("(" * depth + "a" + ")*" * depth).size, depth + 1)
 
         for re in ("(a+b)c", "a", "b*", "ac*", "(ac)*", "01", "1a0"):
             with self.subTest(re=re):
                 self.assertEqual(parse_back(re), re)
         
-        self.assertEqual(parse_back("(a+0)^2"), "(a+0)(a+0)")
-        self.assertEqual(parse_back("(a+0)^2*"), "((a+0)(a+0))*")
+        for re in ("(a+0)^{2}", "(a+0)^{2}*", "a^+b", "(ab)^{2,3}", "a^{3,}", "a^+^{2}", "a^{2}1b", "a^{2}0*"):
+            with self.subTest(re=re):
+                self.assertEqual(parse_back(re), re)
+        
+        # A digit after the count isn't read as a part of it
+        for re in ("a^2 1b", "a^2 0*", "(a^3)0"):
+            with self.subTest(re=re):
+                self.assertEqual(parse(parse_back(re)), parse(re))
+
+    def test_bitparallel(self):
+        words: typing.List[str] = [
+            "".join(word)
+            for length in range(7)
+            for word in itertools.product("abcd", repeat=length)
+        ]
+
+        for src in (
+            "a(b+c)*d", "a((b+1)^2d)*", "0", "1", "(a+1)*", "a0+b",
+            "((ab)*+c)*(1+d)", "(a+b)*a(a+b)^3", "(a*b*)*c",
+            "(ab+c)^{1,3}d", "(a+1)^{2,}b", "(a*b)^+", "(a+b)^{0,2}", "(1+a)^3b^0",
+        ):
+            with self.subTest(re=src):
+                matcher = regex_bitparallel.compile_bitparallel(src)
+                expected = compile_automata(regex_automata.regex_to_automata(src))
+
+                self.assertEqual(matcher.accepts_many(words), expected.accepts_many(words))
+
+        # Positions span many follow table chunks
+        matcher = regex_bitparallel.compile_bitparallel(self.regex1 ** 40)
+        self.assertEqual(len(matcher), 40 * 4 + 1)
+        self.assertTrue(matcher.accepts("abcd" * 40))
+        self.assertTrue(matcher.accepts("ad" * 39 + "acbbd"))
+        self.assertFalse(matcher.accepts("ad" * 39))
+        self.assertFalse(matcher.accepts("ad" * 39 + "ae"))
+
+    def test_brzozowski(self):
+        words: typing.List[str] = [
+            "".join(word)
+            for length in range(7)
+            for word in itertools.product("abcd", repeat=length)
+        ]
+
+        for src in (
+            "a(b+c)*d", "a((b+1)^2d)*", "0", "1", "(a+1)*", "a0+b",
+            "((ab)*+c)*(1+d)", "(a+b)*a(a+b)^3", "(a*b*)*c",
+            "(ab+c)^{1,3}d", "(a+1)^{2,}b", "(a*b)^+", "(a+b)^{0,2}", "(1+a)^3b^0",
+        ):
+            with self.subTest(re=src):
+                builder = regex_derivatives.BrzozowskiDFABuilder()
+                dfa = builder.apply(regex_parser.parse_regex(src))
+                expected = compile_automata(regex_automata.regex_to_automata(src))
+
+                self.assertTrue(dfa.is_deterministic())
+                self.assertEqual(compile_automata(dfa).accepts_many(words), expected.accepts_many(words))
+                # Only the dead state may be missing, the rest stays close to minimal
+                self.assertLessEqual(len(minimize(dfa)), len(dfa) + 1)
+                self.assertLessEqual(len(dfa), 2 * len(minimize(dfa)))
+
+        # Equivalent derivatives coincide after normalization
+        builder = regex_derivatives.BrzozowskiDFABuilder()
+        dfa = builder.apply(regex_parser.parse_regex("(a+b)*a(a+b)^3"))
+        self.assertEqual(len(dfa), len(minimize(dfa)))
+        self.assertEqual(builder.stats.states, len(dfa))
+        self.assertGreater(builder.stats.hits, 0)
+
+        # The states are optimize_regex's output, with the alternatives in a canonical order
+        for first, second in (("(b+a+0)c*", "(a+b)1c*"), ("((a+b)+c)^{2,}", "(c+(b+a))^{2,}")):
+            with self.subTest(first=first):
+                key = regex_derivatives.regex_to_dfa_brzozowski(first).start.key
+                self.assertIs(key, regex_derivatives.regex_to_dfa_brzozowski(second).start.key)
+                self.assertEqual(key.size, optimize_regex(regex_parser.parse_regex(first)).size)
+
+        self.assertRaises(
+            regex_derivatives.DerivativeLimitError,
+            regex_derivatives.regex_to_dfa_brzozowski, "(a+b)*a(a+b)^10", max_states=100,
+        )
+
+
+    def test_deep_visitors(self):
+        def make_deep(depth: int) -> regex.Regex:
+            result: regex.Regex = regex.Letter("a")
+            for i in range(depth):
+                result = regex.Star(result) if i % 2 else result * regex.Letter("b")
+            return result
+
+        # The visitors don't recurse, so the depth is unlimited
+        depth: int = 10 ** 5
+        deep: regex.Regex = make_deep(depth)
+
+        self.assertGreater(depth, sys.getrecursionlimit())
+
+        text: str = regex.reconstruct_regex(deep)
+        self.assertIs(regex_parser.parse_regex(text), deep)
+        self.assertIs(optimize_regex(optimize_regex(deep)), optimize_regex(deep))
+        self.assertLessEqual(len(regex_automata.regex_to_automata(deep)), 2 * depth)
+
+        builder = regex_bitparallel.GlushkovBuilder()
+        self.assertTrue(builder.apply(deep).nullable)
+        self.assertEqual(len(builder.letters), depth // 2 + 2)
+
+        # Determinizing the nested stars blows up with the depth, so matching is checked on a shallow one
+        shallow: regex.Regex = make_deep(12)
+        words: typing.List[str] = [
+            "".join(word)
+            for length in range(7)
+            for word in itertools.product("ab", repeat=length)
+        ]
+        self.assertEqual(
+            regex_bitparallel.compile_bitparallel(shallow).accepts_many(words),
+            compile_automata(regex_automata.regex_to_automata(shallow)).accepts_many(words),
+        )
+
+    def test_compile_cache(self):
+        Form = regex_cache.CompiledForm
+        cache = regex_cache.CompileCache(max_size=4)
+
+        self.assertIs(cache.parse_regex("a(b+c)*d"), self.regex1)
+        self.assertIs(cache.compile("a(b+c)*d"), cache.compile("a(b+c)*d"))
+        self.assertTrue(cache.compile("a(b+c)*d").accepts("abcbd"))
+
+        # Only the regex and the matcher: the forms in between aren't cached
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats.misses, 2)
+
+        dfa = cache.regex_to_automata("a(b+c)*d", form=Form.min_dfa)
+        self.assertEqual(cache.stats.misses, 3)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(len(dfa), len(minimize(regex_automata.regex_to_automata("a(b+c)*d"))))
+
+        # Changing a result doesn't change the cached one
+        dfa.make_node()
+        self.assertEqual(len(cache.regex_to_automata("a(b+c)*d", form=Form.min_dfa)), len(dfa) - 1)
+
+        # Different alphabets compile separately
+        self.assertEqual(cache.regex_to_automata("a", alphabet="ab", form=Form.full_dfa).alphabet, "ab")
+        self.assertEqual(cache.regex_to_automata("a", form=Form.full_dfa).alphabet, "a")
+
+        self.assertLessEqual(len(cache), 4)
+        self.assertGreater(cache.stats.evictions, 0)
+        self.assertGreater(cache.stats.hit_rate, 0.)
+
+        cache = regex_cache.CompileCache(max_size=2, policy=EvictionPolicy.clear)
+        cache.parse_regex("a")
+        cache.parse_regex("b")
+        self.assertEqual(len(cache), 2)
+        cache.parse_regex("c")
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.stats.evictions, 2)
+
+        # A matcher takes up a single entry, so building it evicts nothing
+        cache = regex_cache.CompileCache(max_size=1, policy=EvictionPolicy.clear)
+        self.assertTrue(cache.compile("a(b+c)*d").accepts("abd"))
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.stats.evictions, 0)
+        self.assertIs(cache.compile("a(b+c)*d"), cache.compile("a(b+c)*d"))
+
+    def test_rewrite(self):
+        parse = regex_parser.parse_regex
+
+        for src, expected in (
+            ("(a*)*", "a*"), ("(1+a)*", "a*"), ("(a*b*)*", "(a+b)*"), ("(a^{0,2}+b*)*", "(a+b)*"),
+            ("(a*)^3", "a*"), ("aab+aac", "aa(b+c)"), ("bca+ca", "(b+1)ca"),
+            ("a+a*", "a*"), ("a*(a+b)*", "(a+b)*"), ("(a+b)*(ab)*", "(a+b)*"), ("ab+(ab)*", "(ab)*"),
+            ("1+(a+b)*", "(a+b)*"), ("ab+abb*", "abb*"), ("(ab)*a+b", "(ab)*a+b"),
+        ):
+            with self.subTest(src=src):
+                result = regex_rewrite.rewrite_regex(parse(src))
+                self.assertIs(result, regex_rewrite.rewrite_regex(parse(expected)))
+                self.assertTrue(compare_automatas(
+                    regex_automata.regex_to_automata(src), regex_automata.regex_to_automata(result),
+                ))
+
+        # Only the chosen rules apply
+        rewriter = regex_rewrite.RegexRewriter(rules={"absorb_stars": regex_rewrite.absorb_stars})
+        self.assertIs(rewriter.apply(parse("(a*)*+ab+ac")), rewriter.apply(parse("a*+ab+ac")))
+        self.assertEqual(rewriter.stats.rewrites, {"absorb_stars": 1})
+
+        # Running out of budget still gives an equivalent, canonicalized regex
+        src = regex_automata.automata_to_regex(minimize(regex_automata.regex_to_automata("(a+b)*a(a+b)^2")))
+        for budget in ({"max_rewrites": 0}, {"max_rewrites": 3}, {"time_budget": 0.}):
+            with self.subTest(budget=budget):
+                rewriter = regex_rewrite.RegexRewriter(**budget)
+                result = rewriter.apply(src)
+
+                self.assertEqual(rewriter.stats.out_of_budget, 1)
+                self.assertLessEqual(sum(rewriter.stats.rewrites.values()), budget.get("max_rewrites", 0))
+                self.assertLessEqual(result.size, src.size)
+                self.assertTrue(compare_automatas(
+                    regex_automata.regex_to_automata(src), regex_automata.regex_to_automata(result),
+                ))
+
+        # The metrics add up over a corpus, and the results are memoized
+        rewriter = regex_rewrite.RegexRewriter()
+        corpus = [
+            regex_automata.automata_to_regex(minimize(regex_automata.regex_to_automata(src)))
+            for src in ("(a+b)*a(a+b)^2", "(ab+ba)*(a+b)^2", "a(b*a)^2*")
+        ]
+        results = list(map(rewriter.apply, corpus))
+
+        self.assertEqual(rewriter.stats.regexes, 3)
+        self.assertEqual(rewriter.stats.out_of_budget, 0)
+        self.assertEqual(rewriter.stats.size_before, sum(regex.size for regex in corpus))
+        self.assertEqual(rewriter.stats.size_after, sum(regex.size for regex in results))
+        self.assertGreater(rewriter.stats.reduction, 0.)
+
+        passes: int = rewriter.stats.passes
+        self.assertIs(rewriter.apply(corpus[0]), results[0])
+        self.assertLessEqual(rewriter.stats.passes - passes, 2)
+
+        aut = regex_automata.regex_to_automata("(ab+ba)*(a+b)^2")
+        self.assertTrue(compare_automatas(
+            aut, regex_automata.regex_to_automata(regex_automata.automata_to_regex(aut, rewriter=rewriter)),
+        ))
+
+    def test_regex_dag(self):
+        for src in (
+            "a(b+c)*d", "a((b+1)^2d)*", "0", "1", "((ab)*+c)*(1+d)", "(ab+c)^{1,3}d",
+            "(a+1)^{2,}b", "(a*b)^+", "(1+a)^3b^0", "((a+b)c)*+d(e+f)", "(ab)^2 1b",
+        ):
+            with self.subTest(src=src):
+                parsed = regex_parser.parse_regex(src)
+                text: str = regex.reconstruct_regex(parsed)
+
+                for piece_length in (0, 3, 256):
+                    self.assertEqual("".join(regex_dag.iter_regex_text(parsed, piece_length=piece_length)), text)
+
+                stream = io.StringIO()
+                self.assertEqual(regex_dag.write_regex(parsed, stream, chunk_size=2), len(text))
+                self.assertEqual(stream.getvalue(), text)
+                self.assertEqual(regex_dag.regex_text_length(parsed), len(text))
+
+        shared = regex_parser.parse_regex("(a+b)*c")
+        twice = regex.Concat(shared, regex.Letter("d"), shared)
+        parsed = regex.Either(regex.Concat(twice, twice), regex.Concat(shared, shared))
+
+        let = regex_dag.share_regex(parsed)
+        self.assertEqual(str(let), "$1 = (a+b)*c\n$2 = $1d$1\n$2$2+$1$1")
+        self.assertEqual(let.text_length(), len(str(let)))
+        self.assertEqual(let.expanded_length(), len(regex.reconstruct_regex(parsed)))
+        self.assertEqual(let.expanded_size, parsed.size)
+        self.assertEqual(let.dag_size(), 11)
+        self.assertEqual(str(regex_dag.share_regex(parsed, min_size=20)), regex.reconstruct_regex(parsed))
+
+        stream = io.StringIO()
+        self.assertEqual(let.write(stream), len(str(let)))
+        self.assertEqual(stream.getvalue(), str(let))
+
+        # 2 ** 60 nodes as a tree: all the sizes are known up front, and the text streams
+        doubled: regex.Regex = regex_parser.parse_regex("a+b")
+        for _ in range(60):
+            doubled = regex.Concat(doubled, regex.Star(doubled))
 
+        let = regex_dag.share_regex(doubled)
+        self.assertGreater(let.expanded_size, 2 ** 60)
+        self.assertGreater(let.expanded_length(), 2 ** 60)
+        self.assertEqual(let.dag_size(), 3 + 2 * 60)
+        # All but the last level, and a+b, which is too small
+        self.assertEqual(len(let.bindings), 59)
+        self.assertEqual(let.text_length(), len(str(let)))
+        self.assertEqual("".join(itertools.islice(regex_dag.iter_regex_text(doubled, piece_length=0), 4)), "(a+b")
 
 
 if __name__ == "__main__":
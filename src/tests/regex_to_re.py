@@ -9,7 +9,8 @@ from formals_lib.regex import Reconstructor
 from formals_lib.itree import TreeVisitor
 
 
-# Not the best practive, but we'll reuse the reconstructor's code this way
+# Not the best practive, but we'll reuse the reconstructor's code this way.
+# Letters, Concats and Stars look the same, so their handlers are inherited
 class RegexToRe(Reconstructor):
     warn_on_generic: typing.ClassVar[bool] = True
     
@@ -17,50 +18,24 @@ class RegexToRe(Reconstructor):
     def apply(self, regex: Regex) -> re.Pattern:
         return re.compile(self.visit(regex))
     
-    @TreeVisitor.handler(Letter)
-    def visit_letter(self, node: Letter) -> str:
-        return node.letter
-    
     @TreeVisitor.handler(Zero)
-    def visit_zero(self, node: Zero) -> str:
+    def visit_zero(self, node: Zero, results: typing.Sequence[str]) -> str:
         return "(?!)"
     
     @TreeVisitor.handler(One)
-    def visit_one(self, node: One) -> str:
+    def visit_one(self, node: One, results: typing.Sequence[str]) -> str:
         return ""
-    
-    @TreeVisitor.handler(Concat)
-    def visit_concat(self, node: Concat) -> str:
-        result: typing.List[str] = []
 
-        with self._set_par_level(self.ParLevel.either):
-            for child in node.get_children():
-                result.append(self.visit(child))
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat, results: typing.Sequence[str]) -> str:
+        max_count: str = "" if node.max_count is None else str(node.max_count)
         
-        result: str = "".join(result)
-        if self._par_level >= self.ParLevel.concat:
-            result = f"({result})"
-        
-        return result
-
-    @TreeVisitor.handler(Star)
-    def visit_star(self, node: Star) -> str:
-        with self._set_par_level(self.ParLevel.concat):
-            return self.visit(node.get_children()[0]) + "*"
+        # Python's re doesn't allow stacking repeats, hence the outer group
+        return f"(?:(?:{results[0]}){{{node.min_count},{max_count}}})"
 
     @TreeVisitor.handler(Either)
-    def visit_either(self, node: Either) -> str:
-        result: typing.List[str] = []
-
-        with self._set_par_level(self.ParLevel.none):
-            for child in node.get_children():
-                result.append(self.visit(child))
-        
-        result: str = "|".join(result)
-        if self._par_level >= self.ParLevel.either:
-            result = f"({result})"
-        
-        return result
+    def visit_either(self, node: Either, results: typing.Sequence[str]) -> str:
+        return "|".join(self._wrap_all(node, results, self.ParLevel.none))
 
 
 def regex_to_re(regex: Regex) -> re.Pattern: